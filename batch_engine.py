@@ -0,0 +1,631 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Parallel Batch Transfer Engine
+
+Runs many ModelTransfer jobs at once through a worker pool. Concurrency is
+capped per source host and per target host, and jobs are only admitted when
+enough temporary disk space is free. Reads the same config format as
+batch_transfer_optimized.sh (``source|target`` or ``source`` + --target-base).
+"""
+
+import os
+import sys
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+from urllib.parse import urlparse
+
+from dotenv import load_dotenv
+
+import rate_control
+from transfer import (MirrorConfigurationError, ModelTransfer, check_git_lfs, concurrency_spec,
+                      configure_mirrors, uses_git_lfs)
+from download_backends import BACKENDS
+from path_filter import PathFilter, split_patterns
+from hub_plan import HubPlanError, build_plan, print_plan
+from lfs_api import format_bytes
+
+HF_BASE_URL = "https://huggingface.co"
+GB = 1024 ** 3
+MAX_RETRY_DELAY = 600.0
+
+
+class BatchConfigError(Exception):
+    """Raised when the batch config file cannot be used."""
+
+
+class BatchJob:
+    """A single source → target transfer tracked by the scheduler."""
+
+    def __init__(self, index: int, source: str, target: str, download_backend: str = None):
+        self.index = index
+        self.source = source
+        self.target = target
+        self.download_backend = download_backend
+        self.attempts = 0
+        self.status = "pending"
+        self.error = None
+        self.not_before = 0.0
+        self.started_at = None
+        self.duration = 0.0
+        self.disk_reservation = 0
+        self.disk_needed = 0
+        self.temp_dir = None
+
+    @property
+    def source_host(self) -> str:
+        return urlparse(self.source).hostname or ""
+
+    @property
+    def target_host(self) -> str:
+        return urlparse(self.target).hostname or ""
+
+
+def parse_batch_config(path: str, target_base: str = None) -> list:
+    """Parse a batch config file into (source_url, target_url, download_backend) tuples.
+
+    Same rules as batch_transfer_optimized.sh: ``source|target`` lines, or a
+    bare ``org/model`` that is combined with target_base. Sources that are
+    not full URLs are resolved against huggingface.co. An optional third
+    field selects the job's download backend (``source|target|hub``).
+    """
+    if not os.path.exists(path):
+        raise BatchConfigError(f"Config file not found: {path}")
+
+    pairs = []
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            backend = None
+            if "|" in line:
+                source, target, *rest = (part.strip() for part in line.split("|", 2))
+                backend = rest[0] if rest and rest[0] else None
+                if backend and backend not in BACKENDS:
+                    raise BatchConfigError(f"Unknown download backend '{backend}' for {source} "
+                                           f"(choose from {', '.join(BACKENDS)})")
+            else:
+                source = line
+                if not target_base:
+                    print(f"❌ No target URL specified for {source} and no target-base set")
+                    continue
+                target = f"{target_base.rstrip('/')}/{os.path.basename(source.rstrip('/'))}.git"
+            if not source.startswith(("http://", "https://")):
+                source = f"{HF_BASE_URL}/{source.strip('/')}"
+            pairs.append((source, target, backend))
+    return pairs
+
+
+class BatchScheduler:
+    """Admit and run transfer jobs concurrently under host and disk limits."""
+
+    def __init__(self, jobs: list, transfer_options: dict, workers: int = 4,
+                 per_source_host: int = 2, per_target_host: int = 2,
+                 temp_root: str = None, min_free_disk_gb: float = 5.0,
+                 disk_per_job_gb: float = 0.0, max_retries: int = 2,
+                 retry_delay: float = 5.0, start_delay: float = 0.0,
+                 continue_on_error: bool = False, cleanup: bool = True,
+                 verify_only: bool = False):
+        self.jobs = jobs
+        self.transfer_options = transfer_options
+        self.workers = max(1, workers)
+        self.per_source_host = max(1, per_source_host)
+        self.per_target_host = max(1, per_target_host)
+        self.temp_root = temp_root or tempfile.gettempdir()
+        self.min_free_disk = int(min_free_disk_gb * GB)
+        self.disk_per_job = int(disk_per_job_gb * GB)
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.start_delay = start_delay
+        self.continue_on_error = continue_on_error
+        self.cleanup = cleanup
+        # Audits read metadata only and need no disk
+        self.verify_only = verify_only
+
+        self._lock = threading.Condition()
+        self._running = []
+        self._source_slots = {}
+        self._target_slots = {}
+        self._last_start = 0.0
+        self._stopped = False
+
+    # ------------------------------------------------------------------
+    # Admission control
+    # ------------------------------------------------------------------
+
+    def _reserved_disk(self) -> int:
+        return sum(job.disk_reservation for job in self._running)
+
+    def _disk_fits(self, job: BatchJob) -> bool:
+        free = shutil.disk_usage(self.temp_root).free
+        needed = self.min_free_disk + (job.disk_needed or self.disk_per_job)
+        if free - self._reserved_disk() >= needed:
+            return True
+        if not self._running:
+            print(f"⚠️  Low disk space in {self.temp_root} "
+                  f"({free / GB:.1f} GB free); starting job {job.index} anyway")
+            return True
+        return False
+
+    def _can_start(self, job: BatchJob, now: float) -> bool:
+        if job.not_before > now:
+            return False
+        if len(self._running) >= self.workers:
+            return False
+        if self._source_slots.get(job.source_host, 0) >= self.per_source_host:
+            return False
+        if self._target_slots.get(job.target_host, 0) >= self.per_target_host:
+            return False
+        if rate_control.limiter_for(job.source).paused_for() or \
+                rate_control.limiter_for(job.target).paused_for():
+            return False  # the host asked us to back off (429 / Retry-After)
+        if self.start_delay and now - self._last_start < self.start_delay:
+            return False
+        return self.verify_only or self._disk_fits(job)
+
+    def _admit(self, job: BatchJob):
+        job.status = "running"
+        job.attempts += 1
+        job.started_at = time.time()
+        job.disk_reservation = job.disk_needed or self.disk_per_job
+        self._running.append(job)
+        self._source_slots[job.source_host] = self._source_slots.get(job.source_host, 0) + 1
+        self._target_slots[job.target_host] = self._target_slots.get(job.target_host, 0) + 1
+        self._last_start = time.time()
+
+    def _release(self, job: BatchJob):
+        self._running.remove(job)
+        self._source_slots[job.source_host] -= 1
+        self._target_slots[job.target_host] -= 1
+        job.disk_reservation = 0
+        job.duration += time.time() - job.started_at
+
+    # ------------------------------------------------------------------
+    # Execution
+    # ------------------------------------------------------------------
+
+    def _run_job(self, job: BatchJob):
+        print(f"\n▶️  [{job.index}/{len(self.jobs)}] Starting (attempt {job.attempts}): {job.source}")
+        error = None
+        # Retries reuse the previous attempt's temp dir and resume from its journal
+        resume = job.temp_dir is not None and os.path.isdir(job.temp_dir)
+        if not resume:
+            job.temp_dir = tempfile.mkdtemp(prefix="hf_transfer_", dir=self.temp_root)
+        try:
+            options = dict(self.transfer_options)
+            if job.download_backend:
+                options['download_backend'] = job.download_backend
+            transfer = ModelTransfer(
+                source_url=job.source,
+                target_url=job.target,
+                temp_dir=job.temp_dir,
+                resume=resume,
+                **options
+            )
+            if self.verify_only:
+                transfer.verify_targets()
+            else:
+                transfer.transfer(cleanup=self.cleanup)
+        except Exception as exc:
+            error = exc
+        if self.verify_only:
+            shutil.rmtree(job.temp_dir, ignore_errors=True)
+
+        discard_temp = False
+        with self._lock:
+            self._release(job)
+            if error is None:
+                job.status = "success"
+                print(f"✅ [{job.index}/{len(self.jobs)}] "
+                      f"{'Verified' if self.verify_only else 'Transferred'}: {job.source}")
+            elif job.attempts <= self.max_retries and not self._stopped:
+                job.status = "pending"
+                # Exponential backoff with jitter so failed jobs do not retry in lockstep
+                delay = min(MAX_RETRY_DELAY, self.retry_delay * 2 ** (job.attempts - 1))
+                job.not_before = time.time() + random.uniform(delay / 2, delay)
+                print(f"⚠️  [{job.index}/{len(self.jobs)}] Failed, retrying "
+                      f"({job.attempts}/{self.max_retries}): {error}")
+            else:
+                job.status = "failed"
+                job.error = str(error)
+                discard_temp = self.cleanup
+                print(f"❌ [{job.index}/{len(self.jobs)}] Failed after {job.attempts} attempts: {error}")
+                if not self.continue_on_error:
+                    self._stopped = True
+                    print("❌ Stopping due to failure (use --continue-on-error to continue)")
+            self._lock.notify_all()
+
+        # Failed jobs would otherwise pile up and starve disk admission
+        if discard_temp and os.path.exists(job.temp_dir):
+            shutil.rmtree(job.temp_dir, ignore_errors=True)
+
+    def run(self) -> list:
+        """Run all jobs and return them with their final status."""
+        threads = []
+        with self._lock:
+            while True:
+                pending = [job for job in self.jobs if job.status == "pending"]
+                if self._stopped:
+                    for job in pending:
+                        job.status = "skipped"
+                    pending = []
+                if not pending and not self._running:
+                    break
+
+                now = time.time()
+                started = False
+                for job in pending:
+                    if self._can_start(job, now):
+                        self._admit(job)
+                        thread = threading.Thread(target=self._run_job, args=(job,), daemon=True)
+                        thread.start()
+                        threads.append(thread)
+                        started = True
+                        break
+                if not started:
+                    self._lock.wait(timeout=1.0)
+
+        for thread in threads:
+            thread.join()
+        return self.jobs
+
+
+def print_summary(jobs: list) -> int:
+    """Print the aggregated summary and return the process exit code."""
+    succeeded = [job for job in jobs if job.status == "success"]
+    failed = [job for job in jobs if job.status == "failed"]
+    skipped = [job for job in jobs if job.status == "skipped"]
+
+    print("\n" + "=" * 70)
+    print("📊 Batch Transfer Summary")
+    print("=" * 70)
+    for job in jobs:
+        icon = {"success": "✅", "failed": "❌", "skipped": "⏭️ "}.get(job.status, "•")
+        print(f"{icon} [{job.index}] {job.source} → {job.target} "
+              f"({job.status}, {job.attempts} attempt(s), {job.duration:.0f}s)")
+    print("-" * 70)
+    print(f"Total models:     {len(jobs)}")
+    print(f"Successful:       {len(succeeded)}")
+    print(f"Failed:           {len(failed)}")
+    if skipped:
+        print(f"Skipped:          {len(skipped)}")
+
+    throttled = rate_control.default_controller().stats()
+    if throttled:
+        print("\n🚦 Hosts that throttled or failed requests:")
+        for host, stats in throttled.items():
+            rate = f"{stats['rate']}/s" if stats['rate'] else "unlimited"
+            print(f"  - {host}: {stats['throttles']} throttled, {stats['errors']} errors "
+                  f"(now {rate}, {stats['concurrency']} concurrent)")
+
+    if failed:
+        print("\nFailed models:")
+        for job in failed:
+            print(f"  - {job.source}: {job.error}")
+
+    if failed or skipped:
+        return 1 if not succeeded else 2
+    print("\n🎉 All transfers completed successfully!")
+    return 0
+
+
+def plan_jobs(jobs: list, args):
+    """Size jobs from Hub metadata, then order them largest first.
+
+    Each planned job reserves its own disk estimate instead of
+    --disk-per-job. Jobs whose plan fails keep the default reservation.
+    """
+    print("\n📋 Planning transfers from Hub metadata...")
+    path_filter = PathFilter(split_patterns(args.include), split_patterns(args.exclude))
+    if args.stream_lfs or args.ignore_lfs:
+        mode = 'stream'
+    elif args.pipeline_lfs:
+        mode = 'pipeline'
+    else:
+        mode = 'standard'
+    sizes = {}
+    for job in jobs:
+        try:
+            plan = build_plan(job.source, path_filter=path_filter, mode=mode,
+                              max_disk_bytes=int(args.max_disk * GB))
+        except HubPlanError as exc:
+            print(f"⚠️  [{job.index}] No plan for {job.source}: {exc}")
+            continue
+        job.disk_needed = plan['disk_bytes']
+        sizes[job.index] = plan['totals']['bytes']
+        if args.dry_run:
+            print_plan(plan, top=5)
+    # Longest jobs first keeps the tail of the batch short
+    jobs.sort(key=lambda job: -sizes.get(job.index, 0))
+    total = sum(sizes.values())
+    print(f"📊 Planned {len(sizes)}/{len(jobs)} jobs: {format_bytes(total)} to move")
+
+
+def provision_remote_mirrors(pairs: list, args) -> int:
+    """Configure a GitLab pull mirror per config line. Returns the exit code."""
+    print("\n" + "=" * 70)
+    print("🪞 Bulk GitLab Remote Mirror Setup")
+    print("=" * 70)
+    print(f"Projects:         {len(pairs)}")
+    print(f"Workers:          {args.mirror_workers}")
+    if args.dry_run:
+        for source, target, _ in pairs:
+            print(f"  Would mirror: {source} → {target}")
+        return 0
+
+    started = time.time()
+    try:
+        results = configure_mirrors([(source, target) for source, target, _ in pairs],
+                                    workers=args.mirror_workers)
+    except MirrorConfigurationError as exc:
+        print(f"❌ {exc}")
+        return 1
+    failed = [result for result in results if result[3]]
+    created = sum(1 for result in results if result[2] == "created")
+    print("\n" + "=" * 70)
+    print(f"📊 {len(results) - len(failed)} configured ({created} created, "
+          f"{len(results) - len(failed) - created} updated), {len(failed)} failed "
+          f"in {time.time() - started:.1f}s")
+    for source, target, _, error in failed:
+        print(f"  ❌ {target}: {error}")
+    print("=" * 70)
+    return 1 if failed else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Transfer many model repositories in parallel',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # 4 transfers at once, at most 2 per host
+  python batch_engine.py --config batch_config.txt \\
+    --target-base https://nm.aihuanxin.cn/qdlake/repo/llm_model/maoxin \\
+    --workers 4 --continue-on-error
+
+  # Only start a job when 60 GB of temp disk is free for it
+  python batch_engine.py --config batch_config.txt --disk-per-job 60
+
+  # Reserve each job's estimated disk from Hub metadata, largest first
+  python batch_engine.py --config batch_config.txt --plan
+
+  # Point every target project at its source with a GitLab pull mirror
+  python batch_engine.py --config batch_config.txt --use-remote-mirror --mirror-workers 32
+        """
+    )
+    parser.add_argument('--config', default='batch_config.txt',
+                        help='Path to config file (default: batch_config.txt)')
+    parser.add_argument('--target-base', default=os.getenv('TARGET_BASE_URL'),
+                        help='Base URL for targets of lines without an explicit target')
+    parser.add_argument('--env-file', default='.env', help='Path to .env file (default: .env)')
+    parser.add_argument('--workers', type=int, default=4,
+                        help='Maximum concurrent transfers (default: 4)')
+    parser.add_argument('--per-source-host', type=int, default=2,
+                        help='Maximum concurrent transfers per source host (default: 2)')
+    parser.add_argument('--per-target-host', type=int, default=2,
+                        help='Maximum concurrent transfers per target host (default: 2)')
+    parser.add_argument('--temp-root', help='Directory for per-job temp dirs (default: system temp)')
+    parser.add_argument('--min-free-disk', type=float, default=5.0,
+                        help='Free disk (GB) to keep in reserve in --temp-root (default: 5)')
+    parser.add_argument('--disk-per-job', type=float, default=0.0,
+                        help='Disk (GB) to reserve for each running job (default: 0)')
+    parser.add_argument('--max-retries', type=int, default=2,
+                        help='Maximum retry attempts per model (default: 2)')
+    parser.add_argument('--retry-delay', type=float, default=5.0,
+                        help='Base seconds before a failed model is retried; doubles per attempt, '
+                             'with jitter (default: 5)')
+    parser.add_argument('--rate-limit',
+                        help='Per-host request rate "host=rps[:burst],..." (default: $RATE_LIMITS); '
+                             'hosts answering 429/503 are slowed down automatically')
+    parser.add_argument('--delay', type=float, default=0.0,
+                        help='Minimum seconds between job starts (default: 0)')
+    parser.add_argument('--continue-on-error', action='store_true',
+                        help='Keep scheduling models after a model fails')
+    parser.add_argument('--mirror', action='store_true', help='Enable mirror mode (sync all refs)')
+    parser.add_argument('--use-remote-mirror', action='store_true',
+                        help='Configure GitLab pull mirrors for every model instead of transferring')
+    parser.add_argument('--mirror-workers', type=int, default=16,
+                        help='Concurrent GitLab API requests with --use-remote-mirror (default: 16)')
+    parser.add_argument('--no-xget', action='store_true', help='Disable Xget acceleration')
+    parser.add_argument('--source-endpoints',
+                        help='Candidate source endpoints probed per job, e.g. "origin,xget,https://hf-mirror.com"; '
+                             'Xget is included unless --no-xget (default: $SOURCE_ENDPOINTS)')
+    parser.add_argument('--endpoint-ttl', type=float,
+                        help='Seconds endpoint probe results are cached (default: $ENDPOINT_TTL or 600)')
+    parser.add_argument('--no-hf-transfer', action='store_true', help='Disable HF-Transfer acceleration')
+    parser.add_argument('--no-cleanup', action='store_true', help='Keep temporary files')
+    parser.add_argument('--ignore-lfs', action='store_true', help='Ignore ALL LFS files')
+    parser.add_argument('--skip-lfs-errors', action='store_true', help='Continue even if LFS push fails')
+    parser.add_argument('--skip-refs', action='append', metavar='PATTERN',
+                        help='Ref globs never pushed to or deleted on targets; "none" pushes every ref '
+                             '(default: $SKIP_REFS, else refs/pr/* and GitLab-reserved namespaces)')
+    parser.add_argument('--stream-lfs', action='store_true',
+                        help='Relay LFS objects from source to target without local storage')
+    parser.add_argument('--lfs-cache-dir',
+                        help='Persistent LFS object cache shared by all jobs (default: $LFS_CACHE_DIR)')
+    parser.add_argument('--lfs-cache-max-gb', type=float,
+                        help='Byte budget of the LFS object cache in GB (default: 100)')
+    parser.add_argument('--mirror-cache-dir',
+                        help='Bare source mirror cache shared by all jobs (default: $MIRROR_CACHE_DIR)')
+    parser.add_argument('--mirror-cache-max-gb', type=float,
+                        help='Byte budget of the mirror cache in GB (default: 200)')
+    parser.add_argument('--mirror-cache-max-age-days', type=float,
+                        help='Evict mirrors unused for this many days (default: 30, 0 disables)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Skip unchanged pairs and transfer only what changed since the last sync')
+    parser.add_argument('--state-file', help='Sync state file for --incremental')
+    parser.add_argument('--lfs-preflight', action='store_true',
+                        help='Skip LFS objects the target already has and report bytes to move')
+    parser.add_argument('--parallel-ranges', action='store_true',
+                        help='Download large LFS objects over parallel HTTP Range connections')
+    parser.add_argument('--range-config',
+                        help='Per-host range settings "host=part_mb:connections,..." (default: $LFS_RANGE_CONFIG)')
+    parser.add_argument('--pipeline-lfs', action='store_true',
+                        help='Upload each LFS object as soon as it is downloaded')
+    parser.add_argument('--max-disk', type=float, default=10.0,
+                        help='Per-job disk budget in GB for --pipeline-lfs (default: 10)')
+    parser.add_argument('--lfs-client', choices=['git-lfs', 'native'],
+                        help='LFS transfer implementation (default: $LFS_CLIENT or git-lfs)')
+    parser.add_argument('--download-backend', choices=BACKENDS,
+                        help='Default LFS download backend; a third "|" field in the config '
+                             'overrides it per job (default: $DOWNLOAD_BACKEND)')
+    parser.add_argument('--lfs-concurrency', type=concurrency_spec,
+                        help='Concurrent object transfers per job for --lfs-client native: '
+                             'N or "host=N,*=N" (default: $LFS_CONCURRENCY or 8)')
+    parser.add_argument('--metrics-file',
+                        help='Append JSON-lines transfer events of every job to this file')
+    parser.add_argument('--prometheus-textfile',
+                        help='Directory for per-repo node_exporter textfile metrics')
+    parser.add_argument('--history-depth', type=int,
+                        help='Transfer only the last N commits per ref')
+    parser.add_argument('--squash', action='store_true',
+                        help='Transfer each default branch as one orphan snapshot commit')
+    parser.add_argument('--include', action='append', metavar='GLOB',
+                        help='Transfer only paths matching these globs (repeatable or comma-separated)')
+    parser.add_argument('--exclude', action='append', metavar='GLOB',
+                        help='Drop paths matching these globs before LFS objects are fetched')
+    parser.add_argument('--command-timeout', type=float,
+                        help='Stop any git / git-lfs command running longer than this many seconds')
+    parser.add_argument('--idle-timeout', type=float,
+                        help='Stop any git / git-lfs command silent for this many seconds')
+    parser.add_argument('--verify', action='store_true',
+                        help='After each transfer, compare refs and LFS objects of source and target '
+                             'through metadata APIs and fail the job if they differ')
+    parser.add_argument('--verify-only', action='store_true',
+                        help='Only audit every target against its source (no transfers, no disk)')
+    parser.add_argument('--plan', action='store_true',
+                        help='Size every job from Hub metadata first: reserve its estimated disk '
+                             'and start the largest jobs first (see hub_plan.py)')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Show what would be transferred without doing it')
+    args = parser.parse_args()
+    if args.mirror and args.squash:
+        parser.error('--squash cannot be used with --mirror')
+    if args.incremental and (args.history_depth or args.squash or args.include or args.exclude):
+        parser.error('--incremental cannot be combined with --history-depth, --squash, --include or --exclude')
+
+    if os.path.exists(args.env_file):
+        load_dotenv(args.env_file)
+    try:
+        rate_control.configure(args.rate_limit or os.getenv('RATE_LIMITS'))
+    except rate_control.RateControlError as exc:
+        parser.error(str(exc))
+    try:
+        concurrency_spec(args.lfs_concurrency or os.getenv('LFS_CONCURRENCY'))
+    except argparse.ArgumentTypeError as exc:
+        parser.error(f"LFS_CONCURRENCY: {exc}")
+
+    try:
+        pairs = parse_batch_config(args.config, args.target_base)
+    except BatchConfigError as exc:
+        print(f"❌ {exc}")
+        sys.exit(1)
+    if not pairs:
+        print("❌ No valid models found in config file")
+        sys.exit(1)
+
+    if args.use_remote_mirror:
+        sys.exit(provision_remote_mirrors(pairs, args))
+
+    jobs = [BatchJob(index, source, target, backend)
+            for index, (source, target, backend) in enumerate(pairs, 1)]
+
+    print("\n" + "=" * 70)
+    print("🚀 Parallel Batch Transfer")
+    print("=" * 70)
+    print(f"Models:           {len(jobs)}")
+    print(f"Workers:          {args.workers} "
+          f"(≤{args.per_source_host}/source host, ≤{args.per_target_host}/target host)")
+    print(f"Xget accel:       {not args.no_xget}")
+    if args.source_endpoints or os.getenv('SOURCE_ENDPOINTS'):
+        print(f"Source endpoints: {args.source_endpoints or os.getenv('SOURCE_ENDPOINTS')}")
+    print(f"HF-Transfer:      {not args.no_hf_transfer}")
+    print(f"Mirror mode:      {args.mirror}")
+    if args.verify or args.verify_only:
+        print(f"Verify:           {'audit only' if args.verify_only else 'after each transfer'}")
+    print(f"Max retries:      {args.max_retries}")
+
+    if args.plan:
+        plan_jobs(jobs, args)
+
+    if args.dry_run:
+        for job in jobs:
+            backend = f" [{job.download_backend}]" if job.download_backend else ""
+            print(f"  Would transfer: {job.source} → {job.target}{backend}")
+        return
+
+    if args.no_hf_transfer:
+        os.environ.pop('HF_HUB_ENABLE_HF_TRANSFER', None)
+    else:
+        os.environ['HF_HUB_ENABLE_HF_TRANSFER'] = '1'
+
+    lfs_client = args.lfs_client or os.getenv('LFS_CLIENT', 'git-lfs')
+    download_backend = args.download_backend or os.getenv('DOWNLOAD_BACKEND')
+    backends = {job.download_backend or download_backend for job in jobs}
+    if (not args.verify_only and uses_git_lfs(lfs_client, backends, args.ignore_lfs)
+            and not check_git_lfs()):
+        print("❌ Error: git-lfs is not installed or not in PATH")
+        sys.exit(1)
+
+    scheduler = BatchScheduler(
+        jobs,
+        transfer_options={
+            'mirror_mode': args.mirror,
+            'use_xget': not args.no_xget,
+            'ignore_lfs_files': args.ignore_lfs,
+            'skip_lfs_errors': args.skip_lfs_errors,
+            'stream_lfs': args.stream_lfs,
+            'lfs_cache_dir': args.lfs_cache_dir or os.getenv('LFS_CACHE_DIR'),
+            'lfs_cache_max_gb': args.lfs_cache_max_gb or float(os.getenv('LFS_CACHE_MAX_GB', '100')),
+            'mirror_cache_dir': args.mirror_cache_dir or os.getenv('MIRROR_CACHE_DIR'),
+            'mirror_cache_max_gb': args.mirror_cache_max_gb or float(os.getenv('MIRROR_CACHE_MAX_GB', '200')),
+            'mirror_cache_max_age_days': (args.mirror_cache_max_age_days
+                                          if args.mirror_cache_max_age_days is not None
+                                          else float(os.getenv('MIRROR_CACHE_MAX_AGE_DAYS', '30'))),
+            'incremental': args.incremental,
+            'state_file': args.state_file,
+            'lfs_preflight': args.lfs_preflight,
+            'parallel_ranges': args.parallel_ranges,
+            'range_config': args.range_config or os.getenv('LFS_RANGE_CONFIG'),
+            'pipeline_lfs': args.pipeline_lfs,
+            'max_disk_gb': args.max_disk,
+            'metrics_file': args.metrics_file,
+            'prometheus_textfile': args.prometheus_textfile,
+            'lfs_client': lfs_client,
+            'lfs_concurrency': args.lfs_concurrency or os.getenv('LFS_CONCURRENCY'),
+            'history_depth': args.history_depth,
+            'squash': args.squash,
+            'download_backend': download_backend,
+            'skip_refs': args.skip_refs or ([os.getenv('SKIP_REFS')] if os.getenv('SKIP_REFS') else None),
+            'include_paths': split_patterns(args.include),
+            'exclude_paths': split_patterns(args.exclude),
+            'source_endpoints': args.source_endpoints or os.getenv('SOURCE_ENDPOINTS'),
+            'endpoint_ttl': args.endpoint_ttl or float(os.getenv('ENDPOINT_TTL', '600')),
+            'verify': args.verify,
+            'command_timeout': args.command_timeout or float(os.getenv('COMMAND_TIMEOUT', '0')) or None,
+            'idle_timeout': args.idle_timeout or float(os.getenv('COMMAND_IDLE_TIMEOUT', '0')) or None,
+        },
+        workers=args.workers,
+        per_source_host=args.per_source_host,
+        per_target_host=args.per_target_host,
+        temp_root=args.temp_root,
+        min_free_disk_gb=args.min_free_disk,
+        disk_per_job_gb=args.disk_per_job or (args.max_disk if args.pipeline_lfs else 0.0),
+        max_retries=args.max_retries,
+        retry_delay=args.retry_delay,
+        start_delay=args.delay,
+        continue_on_error=args.continue_on_error,
+        cleanup=not args.no_cleanup,
+        verify_only=args.verify_only,
+    )
+    scheduler.run()
+    sys.exit(print_summary(jobs))
+
+
+if __name__ == '__main__':
+    main()
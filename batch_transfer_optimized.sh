@@ -129,10 +129,12 @@ parse_config_line() {
     # Skip empty lines and comments
     [[ -z "$line" || "$line" =~ ^[[:space:]]*# ]] && return 1
     
-    # Parse source|target format
+    # Parse source|target[|download_backend] format
+    JOB_BACKEND=""
     if [[ "$line" =~ \| ]]; then
         SOURCE_URL="https://huggingface.co/$(echo "$line" | cut -d'|' -f1 | xargs)"
         TARGET_URL="$(echo "$line" | cut -d'|' -f2 | xargs)"
+        JOB_BACKEND="$(echo "$line" | cut -s -d'|' -f3 | xargs)"
     else
         # Single repo name, construct URLs
         REPO_NAME="$(echo "$line" | xargs)"
@@ -154,6 +156,8 @@ transfer_model() {
     local source="$1"
     local target="$2"
     local attempt="$3"
+    local work_dir="$4"
+    local backend="$5"
     
     print_info "Attempting transfer (attempt $attempt)"
     print_info "  Source: $source"
@@ -170,6 +174,16 @@ transfer_model() {
     [[ "$NO_CLEANUP" == "true" ]] && cmd="$cmd --no-cleanup"
     [[ "$IGNORE_LFS" == "true" ]] && cmd="$cmd --ignore-lfs"
     [[ "$SKIP_LFS_ERRORS" == "true" ]] && cmd="$cmd --skip-lfs-errors"
+    [[ -n "$backend" ]] && cmd="$cmd --download-backend '$backend'"
+    
+    # Retries continue from the checkpoint journal of the previous attempt
+    if [[ -n "$work_dir" ]]; then
+        if [[ "$attempt" -gt 1 ]]; then
+            cmd="$cmd --resume '$work_dir'"
+        else
+            cmd="$cmd --temp-dir '$work_dir'"
+        fi
+    fi
     
     # Execute
     if [[ "$DRY_RUN" == "true" ]]; then
@@ -324,7 +338,7 @@ fi
 declare -a MODELS
 while IFS= read -r line || [[ -n "$line" ]]; do
     if parse_config_line "$line" "$TARGET_BASE_URL"; then
-        MODELS+=("$SOURCE_URL|$TARGET_URL")
+        MODELS+=("$SOURCE_URL|$TARGET_URL|$JOB_BACKEND")
     fi
 done < "$CONFIG_FILE"
 
@@ -345,7 +359,7 @@ SKIPPED_COUNT=0
 declare -a FAILED_MODELS
 
 for i in "${!MODELS[@]}"; do
-    IFS='|' read -r SOURCE TARGET <<< "${MODELS[$i]}"
+    IFS='|' read -r SOURCE TARGET BACKEND <<< "${MODELS[$i]}"
     
     MODEL_NUM=$((i + 1))
     
@@ -354,16 +368,24 @@ for i in "${!MODELS[@]}"; do
     # Try transfer with retries
     RETRY_COUNT=0
     TRANSFER_SUCCESS=false
+    WORK_DIR=""
+    if [[ "$USE_REMOTE_MIRROR" != "true" && "$DRY_RUN" != "true" ]]; then
+        WORK_DIR="${TMPDIR:-/tmp}/hf_transfer_batch_$$_${MODEL_NUM}"
+    fi
     
     while [[ $RETRY_COUNT -le $MAX_RETRIES ]]; do
-        if transfer_model "$SOURCE" "$TARGET" $((RETRY_COUNT + 1)); then
+        if transfer_model "$SOURCE" "$TARGET" $((RETRY_COUNT + 1)) "$WORK_DIR" "$BACKEND"; then
             TRANSFER_SUCCESS=true
             break
         else
             RETRY_COUNT=$((RETRY_COUNT + 1))
             if [[ $RETRY_COUNT -le $MAX_RETRIES ]]; then
-                print_warning "Transfer failed, retrying ($RETRY_COUNT/$MAX_RETRIES)..."
-                sleep 5
+                # Exponential backoff (5s, 10s, 20s, ... up to 10 min) with jitter
+                BACKOFF=$(( 5 << (RETRY_COUNT - 1) ))
+                (( BACKOFF > 600 )) && BACKOFF=600
+                BACKOFF=$(( BACKOFF / 2 + RANDOM % (BACKOFF / 2 + 1) ))
+                print_warning "Transfer failed, retrying ($RETRY_COUNT/$MAX_RETRIES) in ${BACKOFF}s..."
+                sleep "$BACKOFF"
             fi
         fi
     done
@@ -374,6 +396,9 @@ for i in "${!MODELS[@]}"; do
         ((SUCCESS_COUNT++))
     else
         print_error "Model $MODEL_NUM transfer failed after $((RETRY_COUNT)) attempts"
+        if [[ -n "$WORK_DIR" && "$NO_CLEANUP" != "true" ]]; then
+            rm -rf "$WORK_DIR"
+        fi
         ((FAILED_COUNT++))
         FAILED_MODELS+=("$SOURCE")
         
@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Local Git + LFS server for benchmarks
+
+Serves bare repositories under <root>/repos through ``git http-backend`` (smart
+HTTP, push enabled) and a minimal LFS Batch API whose objects live in
+<root>/lfs/<repo>/. Every request can be delayed by a fixed latency and all
+response/upload bodies share one bandwidth limit, to imitate a remote link.
+Paths under /xget/hf/ are served like the plain ones, so Xget-style rewritten
+URLs can be pointed here with ``url.<base>.insteadOf``. A stub of the Hub's
+``/api/models/<repo>/tree|revision/<rev>`` endpoints (paginated like the
+real one) and of ``/<repo>/resolve/<rev>/<path>`` lets hub_plan.py and the
+huggingface_hub download backend run against the same repos.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import tempfile
+import threading
+import subprocess
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlencode, urlsplit
+
+from synthetic_repo import lfs_object_path
+
+LFS_MEDIA_TYPE = "application/vnd.git-lfs+json"
+CHUNK_SIZE = 64 * 1024
+XGET_PREFIX = "/xget/hf"
+TREE_PAGE_SIZE = 50
+
+
+class Throttle:
+    """Token bucket shared by all connections of a server (0 = unlimited)."""
+
+    def __init__(self, bytes_per_second: float):
+        self.rate = bytes_per_second
+        self._lock = threading.Lock()
+        self._next_free = time.monotonic()
+
+    def consume(self, count: int):
+        if not self.rate:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_free)
+            self._next_free = start + count / self.rate
+            delay = self._next_free - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+class BenchServer:
+    """Threaded HTTP server hosting benchmark repositories."""
+
+    def __init__(self, root: str, latency_ms: float = 0.0, bandwidth_mbps: float = 0.0,
+                 host: str = "127.0.0.1", port: int = 0):
+        self.root = os.path.abspath(root)
+        self.repos_dir = os.path.join(self.root, "repos")
+        self.lfs_dir = os.path.join(self.root, "lfs")
+        self.latency = latency_ms / 1000.0
+        self.throttle = Throttle(bandwidth_mbps * 1_000_000 / 8)
+        os.makedirs(self.repos_dir, exist_ok=True)
+        os.makedirs(self.lfs_dir, exist_ok=True)
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def lfs_store(self, repo: str) -> str:
+        """LFS object directory of a repo given as 'org/name' (with or without .git)."""
+        repo = repo[:-4] if repo.endswith(".git") else repo
+        return os.path.join(self.lfs_dir, repo)
+
+    def resolve_repo(self, segments: list):
+        """Split URL path segments into (repo dir relative to repos/, remaining path)."""
+        for index in range(1, len(segments) + 1):
+            candidate = "/".join(segments[:index])
+            for name in (candidate, f"{candidate}.git"):
+                if name.endswith(".git") and os.path.isdir(os.path.join(self.repos_dir, name)):
+                    return name, segments[index:]
+        return None, segments
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            # -- plumbing ------------------------------------------------
+
+            def _route(self):
+                time.sleep(server.latency)
+                parts = urlsplit(self.path)
+                path = parts.path
+                if path.startswith(XGET_PREFIX + "/"):
+                    path = path[len(XGET_PREFIX):]
+                segments = [segment for segment in path.split("/") if segment]
+                if segments[:1] == ["lfs-objects"]:
+                    return self._lfs_object(segments[1:])
+                if segments[:1] == ["lfs-verify"]:
+                    return self._lfs_verify(segments[1:])
+                if segments[:1] == ["api"]:
+                    return self._hub_api(segments[2:], parts.query)
+                repo, rest = server.resolve_repo(segments)
+                if repo is None:
+                    return self._send_json(404, {"message": "repository not found"})
+                if rest[:2] == ["info", "lfs"]:
+                    return self._lfs_api(repo, rest[2:])
+                if rest[:1] == ["resolve"] and len(rest) > 2:
+                    return self._hub_resolve(repo, unquote(rest[1]), unquote("/".join(rest[2:])))
+                return self._git_backend(repo, rest, parts.query)
+
+            do_GET = do_HEAD = do_POST = do_PUT = _route
+
+            def _read_body(self):
+                """Yield the request body, decoding chunked transfer encoding."""
+                if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+                    while True:
+                        size = int(self.rfile.readline().split(b";")[0].strip() or b"0", 16)
+                        if not size:
+                            self.rfile.readline()
+                            return
+                        remaining = size
+                        while remaining:
+                            data = self.rfile.read(min(CHUNK_SIZE, remaining))
+                            server.throttle.consume(len(data))
+                            remaining -= len(data)
+                            yield data
+                        self.rfile.readline()
+                remaining = int(self.headers.get("Content-Length") or 0)
+                while remaining > 0:
+                    data = self.rfile.read(min(CHUNK_SIZE, remaining))
+                    if not data:
+                        return
+                    server.throttle.consume(len(data))
+                    remaining -= len(data)
+                    yield data
+
+            def _write_body(self, stream):
+                for data in stream:
+                    server.throttle.consume(len(data))
+                    self.wfile.write(data)
+
+            def _send_json(self, status: int, payload: dict):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", LFS_MEDIA_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            # -- git smart HTTP ------------------------------------------
+
+            def _git_backend(self, repo: str, rest: list, query: str):
+                env = {
+                    **os.environ,
+                    "GIT_PROJECT_ROOT": server.repos_dir,
+                    "GIT_HTTP_EXPORT_ALL": "1",
+                    "PATH_INFO": "/" + "/".join([repo, *rest]),
+                    "REQUEST_METHOD": self.command,
+                    "QUERY_STRING": query,
+                    "CONTENT_TYPE": self.headers.get("Content-Type", ""),
+                    "REMOTE_USER": "bench",
+                    "REMOTE_ADDR": self.client_address[0],
+                    "GATEWAY_INTERFACE": "CGI/1.1",
+                }
+                for header in ("Content-Encoding", "Git-Protocol"):
+                    if self.headers.get(header):
+                        env["HTTP_" + header.upper().replace("-", "_")] = self.headers[header]
+                if self.headers.get("Content-Length"):
+                    env["CONTENT_LENGTH"] = self.headers["Content-Length"]
+
+                process = subprocess.Popen(["git", "http-backend"], env=env, stdin=subprocess.PIPE,
+                                           stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+                def feed():
+                    try:
+                        for data in self._read_body():
+                            process.stdin.write(data)
+                    except BrokenPipeError:
+                        pass
+                    finally:
+                        process.stdin.close()
+
+                feeder = threading.Thread(target=feed, daemon=True)
+                feeder.start()
+
+                status, headers = 200, []
+                for line in iter(process.stdout.readline, b""):
+                    line = line.rstrip(b"\r\n")
+                    if not line:
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    if name.lower() == "status":
+                        status = int(value.strip().split()[0])
+                    else:
+                        headers.append((name, value.strip()))
+                self.send_response(status)
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self._write_body(iter(lambda: process.stdout.read(CHUNK_SIZE), b""))
+                feeder.join()
+                process.wait()
+                self.close_connection = True
+
+            # -- LFS -----------------------------------------------------
+
+            def _base_url(self) -> str:
+                return f"http://{self.headers.get('Host')}"
+
+            def _lfs_api(self, repo: str, rest: list):
+                if rest != ["objects", "batch"] or self.command != "POST":
+                    # e.g. locks/verify: a 404 tells git-lfs the server has no locking
+                    return self._send_json(404, {"message": "not supported"})
+                request = json.loads(b"".join(self._read_body()) or b"{}")
+                store = server.lfs_store(repo)
+                repo_key = repo[:-4]
+                objects = []
+                for obj in request.get("objects", []):
+                    oid, size = obj["oid"], obj["size"]
+                    path = lfs_object_path(store, oid)
+                    present = os.path.exists(path) and os.path.getsize(path) == size
+                    entry = {"oid": oid, "size": size, "authenticated": True}
+                    href = f"{self._base_url()}/lfs-objects/{repo_key}/{oid}"
+                    if request.get("operation") == "download":
+                        if present:
+                            entry["actions"] = {"download": {"href": href}}
+                        else:
+                            entry["error"] = {"code": 404, "message": "Object does not exist"}
+                    elif not present:
+                        entry["actions"] = {
+                            "upload": {"href": href},
+                            "verify": {"href": f"{self._base_url()}/lfs-verify/{repo_key}/{oid}"},
+                        }
+                    objects.append(entry)
+                self._send_json(200, {"transfer": "basic", "objects": objects})
+
+            def _lfs_object(self, segments: list):
+                repo, oid = "/".join(segments[:-1]), segments[-1] if segments else ""
+                path = lfs_object_path(server.lfs_store(repo), oid)
+                if self.command == "PUT":
+                    return self._lfs_put(path, oid)
+                if not os.path.exists(path):
+                    return self._send_json(404, {"message": "Object does not exist"})
+                size = os.path.getsize(path)
+                start, end = 0, size - 1
+                range_header = self.headers.get("Range", "")
+                if range_header.startswith("bytes="):
+                    first, _, last = range_header[6:].partition("-")
+                    start, end = int(first or 0), min(int(last or size - 1), size - 1)
+                    self.send_response(206)
+                    self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+                else:
+                    self.send_response(200)
+                self.send_header("Content-Type", "application/octet-stream")
+                self.send_header("Content-Length", str(end - start + 1))
+                self.end_headers()
+                with open(path, "rb") as handle:
+                    handle.seek(start)
+                    remaining = end - start + 1
+
+                    def chunks():
+                        nonlocal remaining
+                        while remaining:
+                            data = handle.read(min(CHUNK_SIZE, remaining))
+                            if not data:
+                                return
+                            remaining -= len(data)
+                            yield data
+
+                    self._write_body(chunks())
+
+            def _lfs_put(self, path: str, oid: str):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                digest = hashlib.sha256()
+                fd, tmp_path = tempfile.mkstemp(prefix=".upload-", dir=os.path.dirname(path))
+                with os.fdopen(fd, "wb") as handle:
+                    for data in self._read_body():
+                        digest.update(data)
+                        handle.write(data)
+                if digest.hexdigest() != oid:
+                    os.remove(tmp_path)
+                    return self._send_json(422, {"message": "sha256 mismatch"})
+                os.replace(tmp_path, path)
+                self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def _lfs_verify(self, segments: list):
+                repo, oid = "/".join(segments[:-1]), segments[-1] if segments else ""
+                request = json.loads(b"".join(self._read_body()) or b"{}")
+                path = lfs_object_path(server.lfs_store(repo), oid)
+                if os.path.exists(path) and os.path.getsize(path) == request.get("size"):
+                    return self._send_json(200, {"message": "ok"})
+                self._send_json(404, {"message": "Object does not exist"})
+
+            # -- Hub API stub -------------------------------------------
+
+            def _hub_api(self, segments: list, query: str):
+                for index, segment in enumerate(segments):
+                    if segment in ("tree", "revision"):
+                        break
+                else:
+                    return self._send_json(404, {"error": "not found"})
+                repo, _ = server.resolve_repo(segments[:index])
+                revision = unquote("/".join(segments[index + 1:]))
+                if repo is None or not revision:
+                    return self._send_json(404, {"error": "Repository not found"})
+                git_dir = os.path.join(server.repos_dir, repo)
+                resolved = subprocess.run(["git", "rev-parse", "--verify", "--quiet", f"{revision}^{{commit}}"],
+                                          cwd=git_dir, capture_output=True, text=True)
+                if resolved.returncode:
+                    return self._send_json(404, {"error": "Revision not found"})
+                sha = resolved.stdout.strip()
+                if segments[index] == "revision":
+                    return self._send_json(200, {"id": repo[:-4], "sha": sha})
+
+                entries = hub_tree(git_dir, sha)
+                cursor = int(parse_qs(query).get("cursor", ["0"])[0])
+                page = entries[cursor:cursor + TREE_PAGE_SIZE]
+                body = json.dumps(page).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                if cursor + TREE_PAGE_SIZE < len(entries):
+                    next_query = urlencode({"recursive": "true", "cursor": cursor + TREE_PAGE_SIZE})
+                    self.send_header("Link", f'<{self._base_url()}{urlsplit(self.path).path}?{next_query}>; rel="next"')
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _hub_resolve(self, repo: str, revision: str, path: str):
+                """Serve a file of a revision like huggingface.co/<repo>/resolve/<rev>/<path>."""
+                git_dir = os.path.join(server.repos_dir, repo)
+                resolved = subprocess.run(["git", "rev-parse", "--verify", "--quiet", f"{revision}^{{commit}}"],
+                                          cwd=git_dir, capture_output=True, text=True)
+                blob = subprocess.run(["git", "cat-file", "blob", f"{resolved.stdout.strip()}:{path}"],
+                                      cwd=git_dir, capture_output=True)
+                if resolved.returncode or blob.returncode:
+                    return self._send_json(404, {"error": "Entry not found"})
+                entry = {"oid": hashlib.sha1(b"blob %d\0" % len(blob.stdout) + blob.stdout).hexdigest()}
+                fields = dict(line.split(" ", 1) for line in blob.stdout.decode("utf-8", "replace").splitlines()
+                              if " " in line)
+                data_path = None
+                if blob.stdout.startswith(b"version https://git-lfs") and "oid" in fields:
+                    entry["oid"] = fields["oid"].split(":", 1)[1]
+                    data_path = lfs_object_path(server.lfs_store(repo), entry["oid"])
+                    if not os.path.exists(data_path):
+                        return self._send_json(404, {"error": "LFS object missing"})
+                size = os.path.getsize(data_path) if data_path else len(blob.stdout)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/octet-stream")
+                self.send_header("Content-Length", str(size))
+                self.send_header("ETag", f'"{entry["oid"]}"')
+                self.send_header("X-Repo-Commit", resolved.stdout.strip())
+                self.end_headers()
+                if self.command == "HEAD":
+                    return
+                if data_path is None:
+                    return self._write_body([blob.stdout])
+                with open(data_path, "rb") as handle:
+                    self._write_body(iter(lambda: handle.read(CHUNK_SIZE), b""))
+
+        return Handler
+
+    def create_empty_repo(self, repo: str):
+        """Create an empty bare repo that accepts pushes (replacing any previous one)."""
+        path = os.path.join(self.repos_dir, repo if repo.endswith(".git") else f"{repo}.git")
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        shutil.rmtree(self.lfs_store(repo), ignore_errors=True)
+        subprocess.run(["git", "init", "-q", "--bare", path], check=True)
+        subprocess.run(["git", "config", "http.receivepack", "true"], cwd=path, check=True)
+        return path
+
+
+def hub_tree(git_dir: str, sha: str) -> list:
+    """Hub-style recursive tree entries of a commit, with LFS metadata for pointers."""
+    listing = subprocess.run(["git", "ls-tree", "-r", "-l", sha], cwd=git_dir,
+                             check=True, capture_output=True, text=True).stdout
+    entries = []
+    for line in listing.splitlines():
+        meta, _, path = line.partition("\t")
+        _, kind, oid, size = meta.split()
+        if kind != "blob":
+            continue
+        entry = {"type": "file", "oid": oid, "size": int(size), "path": path}
+        if int(size) <= 1024:
+            data = subprocess.run(["git", "cat-file", "blob", oid], cwd=git_dir,
+                                  check=True, capture_output=True).stdout.decode("utf-8", "replace")
+            fields = dict(line.split(" ", 1) for line in data.splitlines() if " " in line)
+            if data.startswith("version https://git-lfs") and "oid" in fields:
+                lfs_size = int(fields["size"])
+                entry["lfs"] = {"oid": fields["oid"].split(":", 1)[1], "size": lfs_size,
+                                "pointerSize": int(size)}
+                entry["size"] = lfs_size
+        entries.append(entry)
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve benchmark repositories over HTTP')
+    parser.add_argument('root', help='Server root (contains repos/ and lfs/)')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Delay added to every request')
+    parser.add_argument('--bandwidth-mbps', type=float, default=0.0,
+                        help='Shared bandwidth limit in Mbit/s (default: unlimited)')
+    args = parser.parse_args()
+
+    server = BenchServer(args.root, args.latency_ms, args.bandwidth_mbps, port=args.port)
+    print(f"🌐 Serving {server.repos_dir} at {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Offline end-to-end benchmarks for transfer.py / simple_transfer.py
+
+Generates a synthetic model repository, serves it from a local Git + LFS
+server (optionally with latency and bandwidth limits) and runs the transfer
+tool in every mode against fresh target repositories. Wall time, peak disk,
+peak RSS and throughput are appended to a JSON-lines results file and each
+run is compared with the previous run of the same scenario.
+"""
+
+import os
+import sys
+import json
+import time
+import shlex
+import shutil
+import argparse
+import subprocess
+import tempfile
+import threading
+from datetime import datetime, timezone
+
+from synthetic_repo import MB, generate_repo, lfs_object_path
+from fake_server import BenchServer, XGET_PREFIX
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_RESULTS = os.path.join(REPO_ROOT, 'benchmarks', 'results.jsonl')
+
+MODES = ['standard', 'mirror', 'ignore-lfs', 'pointer-only', 'xget', 'hub']
+# hub needs huggingface_hub installed, so it only runs when asked for
+DEFAULT_MODES = [mode for mode in MODES if mode != 'hub']
+SIMPLE_MODES = ['standard']
+SOURCE_REPO = 'bench/model'
+XGET_BASE = 'https://xget.xi-xu.me/hf/'
+
+# Credentials in the caller's environment must not leak into local runs
+CREDENTIAL_VARS = ('HF_USERNAME', 'HF_TOKEN', 'TARGET_USERNAME', 'TARGET_TOKEN',
+                   'GIT_LFS_SKIP_SMUDGE', 'GIT_CONFIG_COUNT')
+
+
+def git_lfs_available() -> bool:
+    try:
+        subprocess.run(['git', 'lfs', 'version'], capture_output=True, check=True)
+        return True
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return False
+
+
+def directory_size(path: str) -> int:
+    """Allocated bytes below path (like du)."""
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.lstat(os.path.join(dirpath, name)).st_blocks * 512
+            except FileNotFoundError:
+                pass
+    return total
+
+
+class DiskSampler(threading.Thread):
+    """Polls the size of a directory and remembers the peak."""
+
+    def __init__(self, path: str, interval: float = 0.2):
+        super().__init__(daemon=True)
+        self.path = path
+        self.interval = interval
+        self.peak = 0
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.is_set():
+            self.peak = max(self.peak, directory_size(self.path))
+            self._done.wait(self.interval)
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        self.peak = max(self.peak, directory_size(self.path))
+
+
+def current_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return 'unknown'
+
+
+def ls_remote(url: str) -> dict:
+    result = subprocess.run(['git', 'ls-remote', url], capture_output=True, text=True)
+    refs = {}
+    for line in result.stdout.splitlines():
+        sha, _, ref = line.partition('\t')
+        if ref and not ref.endswith('^{}'):
+            refs[ref] = sha
+    return refs
+
+
+class BenchmarkRunner:
+    """Runs one scenario in several modes against a local BenchServer."""
+
+    def __init__(self, args):
+        self.args = args
+        self.workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix='hf_bench_'))
+        self.server = BenchServer(os.path.join(self.workdir, 'server'),
+                                  args.latency_ms, args.bandwidth_mbps)
+        self.scenario = {
+            'lfs_files': args.lfs_files,
+            'lfs_size_mb': args.lfs_size_mb,
+            'small_files': args.small_files,
+            'history': args.history,
+            'lfs_updates': args.lfs_updates,
+            'latency_ms': args.latency_ms,
+            'bandwidth_mbps': args.bandwidth_mbps,
+            'extra_args': args.extra_args,
+        }
+        self.repo_stats = None
+        self.expected_oids = []
+
+    def prepare(self):
+        print(f"🧪 Generating synthetic repo in {self.workdir}")
+        bare = os.path.join(self.server.repos_dir, f'{SOURCE_REPO}.git')
+        self.repo_stats = generate_repo(
+            bare, self.server.lfs_store(SOURCE_REPO),
+            lfs_files=self.args.lfs_files, lfs_size=int(self.args.lfs_size_mb * MB),
+            small_files=self.args.small_files, history=self.args.history,
+            lfs_updates=self.args.lfs_updates, seed=self.args.seed,
+        )
+        self.repo_stats['git_bytes'] = directory_size(os.path.join(bare, 'objects'))
+        self.expected_oids = [oid for _, _, filenames in os.walk(self.server.lfs_store(SOURCE_REPO))
+                              for oid in filenames]
+        self.server.start()
+        print(f"🌐 Local Git/LFS server at {self.server.url} "
+              f"(latency {self.args.latency_ms:g} ms, bandwidth "
+              f"{self.args.bandwidth_mbps or 'unlimited'} Mbit/s)")
+
+    def _seed_target_lfs(self, target_repo: str):
+        """Pointer-only pushes need the target to already hold the objects."""
+        source_store = self.server.lfs_store(SOURCE_REPO)
+        target_store = self.server.lfs_store(target_repo)
+        for dirpath, _, filenames in os.walk(source_store):
+            for oid in filenames:
+                dest = lfs_object_path(target_store, oid)
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                os.link(os.path.join(dirpath, oid), dest)
+
+    def _command(self, mode: str, source: str, target: str, metrics_file: str) -> list:
+        if self.args.tool == 'simple':
+            return [sys.executable, os.path.join(REPO_ROOT, 'simple_transfer.py'), source, target]
+        cmd = [sys.executable, os.path.join(REPO_ROOT, 'transfer.py'),
+               '--source', source, '--target', target,
+               '--env-file', os.devnull, '--metrics-file', metrics_file]
+        if mode == 'mirror':
+            cmd.append('--mirror')
+        elif mode == 'ignore-lfs':
+            cmd.append('--ignore-lfs')
+        elif mode == 'pointer-only':
+            cmd.append('--skip-lfs-errors')
+        elif mode == 'xget':
+            cmd.append('--use-xget')
+        elif mode == 'hub':
+            cmd += ['--download-backend', 'hub']
+        return cmd + shlex.split(self.args.extra_args or '')
+
+    def run_mode(self, mode: str, iteration: int) -> dict:
+        target_repo = f'bench/target-{mode}-{iteration}'
+        self.server.create_empty_repo(target_repo)
+        if mode == 'pointer-only':
+            self._seed_target_lfs(target_repo)
+
+        run_dir = os.path.join(self.workdir, 'runs', f'{mode}-{iteration}')
+        shutil.rmtree(run_dir, ignore_errors=True)
+        tmp_dir = os.path.join(run_dir, 'tmp')
+        os.makedirs(tmp_dir)
+        metrics_file = os.path.join(run_dir, 'events.jsonl')
+        log_path = os.path.join(run_dir, 'output.log')
+
+        source = f'{self.server.url}/{SOURCE_REPO}'
+        target = f'{self.server.url}/{target_repo}.git'
+        env = {key: value for key, value in os.environ.items() if key not in CREDENTIAL_VARS}
+        env.update({'TMPDIR': tmp_dir, 'GIT_TERMINAL_PROMPT': '0', 'PYTHONUNBUFFERED': '1'})
+        if mode == 'pointer-only':
+            env['GIT_LFS_SKIP_SMUDGE'] = '1'
+        if mode == 'hub':
+            env['HF_ENDPOINT'] = self.server.url
+        if mode == 'xget':
+            # Keep the real Xget rewrite but resolve the accelerated URL locally
+            source = f'https://huggingface.co/{SOURCE_REPO}'
+            env.update({
+                'GIT_CONFIG_COUNT': '1',
+                'GIT_CONFIG_KEY_0': f'url.{self.server.url}{XGET_PREFIX}/.insteadOf',
+                'GIT_CONFIG_VALUE_0': XGET_BASE,
+            })
+
+        cmd = self._command(mode, source, target, metrics_file)
+        print(f"\n▶️  {mode} #{iteration}: {' '.join(shlex.quote(part) for part in cmd[1:])}")
+        sampler = DiskSampler(tmp_dir)
+        sampler.start()
+        started = time.monotonic()
+        with open(log_path, 'wb') as log:
+            process = subprocess.Popen(cmd, cwd=run_dir, env=env, stdout=log, stderr=subprocess.STDOUT)
+            _, status, usage = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(status)
+        wall = time.monotonic() - started
+        sampler.stop()
+
+        rss = usage.ru_maxrss if sys.platform == 'darwin' else usage.ru_maxrss * 1024
+        source_refs = ls_remote(f'{self.server.url}/{SOURCE_REPO}')
+        target_refs = ls_remote(target)
+        expected = {ref: sha for ref, sha in source_refs.items()
+                    if ref.startswith(('refs/heads/', 'refs/tags/')) or (mode == 'mirror' and ref != 'HEAD')}
+        if mode == 'ignore-lfs':
+            # History is rewritten without LFS files, so only ref names can match
+            verified = process.returncode == 0 and set(expected) <= set(target_refs)
+        else:
+            verified = process.returncode == 0 and all(target_refs.get(ref) == sha
+                                                       for ref, sha in expected.items())
+        if verified and mode not in ('ignore-lfs', 'pointer-only'):
+            missing = self._missing_target_objects(target_repo)
+            if missing:
+                print(f"   ⚠️  Target is missing {missing} LFS objects")
+                verified = False
+
+        moved = self.repo_stats['git_bytes']
+        if mode not in ('ignore-lfs', 'pointer-only'):
+            moved += self.repo_stats['lfs_bytes']
+        record = {
+            'ts': datetime.now(timezone.utc).isoformat(),
+            'commit': current_commit(),
+            'label': self.args.label,
+            'tool': self.args.tool,
+            'mode': mode,
+            'iteration': iteration,
+            'scenario': self.scenario,
+            'returncode': process.returncode,
+            'verified': verified,
+            'wall_seconds': round(wall, 3),
+            'peak_disk_bytes': sampler.peak,
+            'peak_rss_bytes': rss,
+            'bytes_moved': moved,
+            'throughput_bytes_per_s': round(moved / wall, 1) if wall else 0.0,
+            'phases': self._phases(metrics_file),
+        }
+        status = '✅' if verified else '❌'
+        print(f"   {status} {wall:.2f}s, peak disk {sampler.peak / MB:.1f} MB, "
+              f"peak RSS {rss / MB:.1f} MB, {record['throughput_bytes_per_s'] / MB:.1f} MB/s")
+        if not verified:
+            with open(log_path, encoding='utf-8', errors='replace') as log:
+                tail = log.read().splitlines()[-15:]
+            print("   Last output lines:")
+            for line in tail:
+                print(f"   | {line}")
+        return record
+
+    def _missing_target_objects(self, target_repo: str) -> int:
+        """Count source LFS objects that did not arrive in the target store."""
+        target_store = self.server.lfs_store(target_repo)
+        return sum(1 for oid in self.expected_oids
+                   if not os.path.exists(lfs_object_path(target_store, oid)))
+
+    @staticmethod
+    def _phases(metrics_file: str) -> dict:
+        """Per-phase seconds from the transfer's own --metrics-file record."""
+        try:
+            with open(metrics_file, encoding='utf-8') as handle:
+                for line in handle:
+                    event = json.loads(line)
+                    if event.get('event') == 'transfer_complete':
+                        return event.get('phases', {})
+        except (FileNotFoundError, ValueError):
+            pass
+        return {}
+
+    def cleanup(self):
+        self.server.stop()
+        if not self.args.keep:
+            shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+def load_results(path: str) -> list:
+    try:
+        with open(path, encoding='utf-8') as handle:
+            return [json.loads(line) for line in handle if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def compare(previous: list, current: list, threshold: float) -> int:
+    """Print current results next to the previous run of the same scenario. Returns regressions."""
+    regressions = 0
+    print("\n" + "=" * 70)
+    print("📊 Benchmark Results")
+    print("=" * 70)
+    print(f"{'mode':<14}{'wall s':>10}{'Δ wall':>10}{'disk MB':>10}{'Δ disk':>10}{'RSS MB':>10}{'MB/s':>8}")
+    for record in current:
+        key = (record['tool'], record['mode'], json.dumps(record['scenario'], sort_keys=True))
+        baseline = None
+        for old in reversed(previous):
+            if (old['tool'], old['mode'], json.dumps(old['scenario'], sort_keys=True)) == key \
+                    and old.get('verified'):
+                baseline = old
+                break
+
+        def delta(field):
+            if not baseline or not baseline.get(field):
+                return '—', False
+            change = (record[field] - baseline[field]) / baseline[field] * 100
+            return f"{change:+.0f}%", change > threshold
+
+        wall_delta, wall_worse = delta('wall_seconds')
+        disk_delta, disk_worse = delta('peak_disk_bytes')
+        flag = ''
+        if not record['verified']:
+            flag = '  ❌ failed'
+        elif wall_worse or disk_worse:
+            flag = '  ⚠️  regression'
+            regressions += 1
+        print(f"{record['mode']:<14}{record['wall_seconds']:>10.2f}{wall_delta:>10}"
+              f"{record['peak_disk_bytes'] / MB:>10.1f}{disk_delta:>10}"
+              f"{record['peak_rss_bytes'] / MB:>10.1f}{record['throughput_bytes_per_s'] / MB:>8.1f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Offline end-to-end benchmarks with synthetic repos and a local Git/LFS server'
+    )
+    parser.add_argument('--tool', choices=['transfer', 'simple'], default='transfer',
+                        help='Tool to benchmark (default: transfer)')
+    parser.add_argument('--modes', default=','.join(DEFAULT_MODES),
+                        help=f'Comma-separated modes of {",".join(MODES)} (default: {",".join(DEFAULT_MODES)})')
+    parser.add_argument('--lfs-files', type=int, default=4, help='LFS shards (default: 4)')
+    parser.add_argument('--lfs-size-mb', type=float, default=16, help='Size of each shard in MB (default: 16)')
+    parser.add_argument('--small-files', type=int, default=10, help='Regular files (default: 10)')
+    parser.add_argument('--history', type=int, default=5, help='Number of commits (default: 5)')
+    parser.add_argument('--lfs-updates', type=int, default=0,
+                        help='Shards replaced in every later commit (default: 0)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Per-request latency (default: 0)')
+    parser.add_argument('--bandwidth-mbps', type=float, default=0.0,
+                        help='Server bandwidth in Mbit/s (default: unlimited)')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per mode (default: 1)')
+    parser.add_argument('--extra-args', default='',
+                        help='Extra transfer.py arguments, e.g. "--stream-lfs"')
+    parser.add_argument('--label', default='', help='Free-form label stored with the results')
+    parser.add_argument('--results', default=DEFAULT_RESULTS,
+                        help='JSON-lines results file (default: benchmarks/results.jsonl)')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help='Percent slowdown / disk growth flagged as regression (default: 10)')
+    parser.add_argument('--fail-on-regression', action='store_true',
+                        help='Exit with status 1 if a regression or failure is detected')
+    parser.add_argument('--workdir', help='Working directory (default: a new temp directory)')
+    parser.add_argument('--keep', action='store_true', help='Keep the working directory')
+    args = parser.parse_args()
+
+    modes = [mode.strip() for mode in args.modes.split(',') if mode.strip()]
+    supported = SIMPLE_MODES if args.tool == 'simple' else MODES
+    unknown = [mode for mode in modes if mode not in supported]
+    if unknown:
+        parser.error(f"unsupported modes for {args.tool}: {', '.join(unknown)}")
+    if not git_lfs_available():
+        print("❌ Error: git-lfs is not installed or not in PATH (the tools under test need it)")
+        return 1
+
+    runner = BenchmarkRunner(args)
+    previous = load_results(args.results)
+    current = []
+    try:
+        runner.prepare()
+        for iteration in range(1, args.repeat + 1):
+            for mode in modes:
+                current.append(runner.run_mode(mode, iteration))
+    finally:
+        runner.cleanup()
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.results)), exist_ok=True)
+    with open(args.results, 'a', encoding='utf-8') as handle:
+        for record in current:
+            handle.write(json.dumps(record, sort_keys=True) + '\n')
+
+    regressions = compare(previous, current, args.threshold)
+    failures = sum(1 for record in current if not record['verified'])
+    print(f"\n💾 Results appended to {args.results}")
+    if args.fail_on_regression and (regressions or failures):
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
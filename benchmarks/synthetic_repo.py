@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Synthetic HuggingFace-style model repositories for benchmarks
+
+Builds a bare repository whose LFS files are committed as pointers while the
+object contents go straight into a local LFS store, so no git-lfs install is
+needed to create a benchmark fixture. Content is deterministic per seed.
+"""
+
+import os
+import sys
+import json
+import random
+import shutil
+import hashlib
+import argparse
+import subprocess
+import tempfile
+
+MB = 1024 * 1024
+
+# Keep a locally installed git-lfs from filtering the pointer files we commit
+GIT_NO_LFS = ['-c', 'filter.lfs.process=', '-c', 'filter.lfs.clean=cat',
+              '-c', 'filter.lfs.smudge=cat', '-c', 'filter.lfs.required=false']
+
+GITATTRIBUTES = """*.safetensors filter=lfs diff=lfs merge=lfs -text
+*.bin filter=lfs diff=lfs merge=lfs -text
+"""
+
+
+def lfs_object_path(lfs_store: str, oid: str) -> str:
+    """Location of an object inside a benchmark LFS store."""
+    return os.path.join(lfs_store, oid[0:2], oid[2:4], oid)
+
+
+def write_lfs_object(lfs_store: str, size: int, seed: int) -> str:
+    """Write size deterministic pseudo-random bytes into the store. Returns the OID."""
+    rng = random.Random(seed)
+    digest = hashlib.sha256()
+    os.makedirs(lfs_store, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".obj-", dir=lfs_store)
+    with os.fdopen(fd, 'wb') as handle:
+        remaining = size
+        while remaining:
+            chunk = rng.randbytes(min(MB, remaining))
+            digest.update(chunk)
+            handle.write(chunk)
+            remaining -= len(chunk)
+    oid = digest.hexdigest()
+    path = lfs_object_path(lfs_store, oid)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    os.replace(tmp_path, path)
+    return oid
+
+
+def pointer_text(oid: str, size: int) -> str:
+    return f"version https://git-lfs.github.com/spec/v1\noid sha256:{oid}\nsize {size}\n"
+
+
+def _git(args: list, cwd: str):
+    env = {**os.environ,
+           'GIT_AUTHOR_NAME': 'bench', 'GIT_AUTHOR_EMAIL': 'bench@example.com',
+           'GIT_COMMITTER_NAME': 'bench', 'GIT_COMMITTER_EMAIL': 'bench@example.com'}
+    subprocess.run(['git', *GIT_NO_LFS, *args], cwd=cwd, check=True,
+                   capture_output=True, env=env)
+
+
+def generate_repo(bare_path: str, lfs_store: str, lfs_files: int = 4, lfs_size: int = 8 * MB,
+                  small_files: int = 10, history: int = 5, lfs_updates: int = 0,
+                  seed: int = 0) -> dict:
+    """Create a bare repo at bare_path with LFS objects in lfs_store.
+
+    Args:
+        lfs_files: Number of LFS-tracked weight shards
+        lfs_size: Size of each shard in bytes
+        small_files: Number of regular (non-LFS) files
+        history: Number of commits
+        lfs_updates: Shards replaced by new content in every commit after the first
+        seed: Seed for deterministic content
+    """
+    worktree = tempfile.mkdtemp(prefix="bench_worktree_")
+    stats = {"commits": 0, "lfs_objects": 0, "lfs_bytes": 0}
+    try:
+        _git(['init', '-q', '-b', 'main'], worktree)
+        with open(os.path.join(worktree, '.gitattributes'), 'w') as handle:
+            handle.write(GITATTRIBUTES)
+
+        for commit in range(max(1, history)):
+            if commit == 0:
+                shards = range(lfs_files)
+            else:
+                shards = [(commit * lfs_updates + i) % lfs_files for i in range(lfs_updates)] if lfs_files else []
+            for shard in shards:
+                oid = write_lfs_object(lfs_store, lfs_size, seed * 1_000_003 + commit * 1009 + shard)
+                name = f"model-{shard + 1:05d}-of-{lfs_files:05d}.safetensors"
+                with open(os.path.join(worktree, name), 'w') as handle:
+                    handle.write(pointer_text(oid, lfs_size))
+                stats["lfs_objects"] += 1
+                stats["lfs_bytes"] += lfs_size
+
+            for index in range(small_files):
+                with open(os.path.join(worktree, f"config_{index}.json"), 'w') as handle:
+                    json.dump({"revision": commit, "index": index, "seed": seed}, handle)
+            with open(os.path.join(worktree, 'README.md'), 'w') as handle:
+                handle.write(f"# Synthetic benchmark model\n\nRevision {commit}\n")
+
+            _git(['add', '-A'], worktree)
+            _git(['commit', '-q', '-m', f"Revision {commit}"], worktree)
+            stats["commits"] += 1
+
+        _git(['tag', 'v1.0'], worktree)
+        if os.path.exists(bare_path):
+            shutil.rmtree(bare_path)
+        os.makedirs(os.path.dirname(bare_path) or '.', exist_ok=True)
+        _git(['clone', '-q', '--bare', worktree, bare_path], worktree)
+        _git(['config', 'http.receivepack', 'true'], bare_path)
+    finally:
+        shutil.rmtree(worktree, ignore_errors=True)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic model repository')
+    parser.add_argument('bare_path', help='Path of the bare repository to create')
+    parser.add_argument('lfs_store', help='Directory that receives the LFS objects')
+    parser.add_argument('--lfs-files', type=int, default=4)
+    parser.add_argument('--lfs-size-mb', type=float, default=8)
+    parser.add_argument('--small-files', type=int, default=10)
+    parser.add_argument('--history', type=int, default=5)
+    parser.add_argument('--lfs-updates', type=int, default=0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    stats = generate_repo(args.bare_path, args.lfs_store, args.lfs_files,
+                          int(args.lfs_size_mb * MB), args.small_files, args.history,
+                          args.lfs_updates, args.seed)
+    print(json.dumps(stats))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Asynchronous command runner
+
+Every git / git-lfs process runs on one asyncio event loop in a background
+thread, however many transfers or targets are active. Stdout and stderr are
+read as they are produced and handed to callbacks line by line (``\\r``
+progress redraws count as lines), so large listings never sit in memory as
+one string. Each command can have a wall-clock timeout and an idle timeout
+(no output on either stream). A command that exceeds one is terminated
+together with its helpers (``git-remote-https``, ``git-lfs``) and fails with
+CommandTimeout. ``cancel()`` stops every running command.
+
+Without timeouts, commands keep this process's stdin and session, so git
+can still ask for credentials or confirm an SSH host key on the terminal.
+With a timeout they run in their own process group, where nobody could
+answer a prompt: terminal and SSH prompts are disabled, and a command that
+needed one fails with CommandNeedsCredentials.
+
+Blocking code calls ``run()``; coroutines await ``run_async()`` to drive
+many processes at once from the loop.
+"""
+
+import os
+import re
+import sys
+import time
+import codecs
+import signal
+import asyncio
+import threading
+import subprocess
+from collections import deque
+
+READ_SIZE = 65536
+# Seconds a terminated process group gets before it is killed
+KILL_GRACE = 5.0
+# Lines of stderr kept for error messages and throttling checks
+STDERR_TAIL_LINES = 200
+# How often running commands are checked against their timeouts
+WATCH_INTERVAL = 1.0
+
+PROGRESS_FLAG_COMMANDS = {"clone", "fetch", "push"}
+# stderr of git / ssh when a prompt was needed but prompting is disabled
+CREDENTIAL_PROMPT_ERRORS = ("terminal prompts disabled", "could not read Username",
+                            "could not read Password", "Host key verification failed",
+                            "Permission denied (publickey")
+
+
+class CommandTimeout(subprocess.CalledProcessError):
+    """Raised when a command runs too long or stops producing output."""
+
+    def __init__(self, returncode: int, cmd: list, reason: str, output=None, stderr=None):
+        super().__init__(returncode, cmd, output, stderr)
+        self.reason = reason
+
+    def __str__(self):
+        # Only the subcommand: arguments may carry credentials
+        return f"Command '{' '.join(self.cmd[:2])}' {self.reason}"
+
+
+class CommandCancelled(subprocess.CalledProcessError):
+    """Raised for a command stopped by CommandRunner.cancel()."""
+
+    def __str__(self):
+        return f"Command '{' '.join(self.cmd[:2])}' was cancelled"
+
+
+class CommandNeedsCredentials(subprocess.CalledProcessError):
+    """Raised when a non-interactive command stopped at a credential or host-key prompt."""
+
+    def __str__(self):
+        return (f"Command '{' '.join(self.cmd[:2])}' runs non-interactively (a timeout is set): "
+                f"credentials required. Put them in the URL or .env, or accept the SSH host key first")
+
+
+def non_interactive_env(env: dict = None) -> dict:
+    """Environment in which git and ssh fail instead of prompting."""
+    env = dict(os.environ if env is None else env)
+    env["GIT_TERMINAL_PROMPT"] = "0"
+    ssh = env.get("GIT_SSH_COMMAND") or "ssh"
+    if "BatchMode" not in ssh:
+        env["GIT_SSH_COMMAND"] = f"{ssh} -o BatchMode=yes"
+    return env
+
+
+def with_progress_flag(cmd: list) -> list:
+    """Add --progress to git clone/fetch/push so progress is printed to a pipe."""
+    if len(cmd) > 1 and cmd[0] == "git" and cmd[1] in PROGRESS_FLAG_COMMANDS and "--progress" not in cmd:
+        return cmd[:2] + ["--progress"] + cmd[2:]
+    return cmd
+
+
+class _LineSplitter:
+    """Decode a byte stream incrementally and pass non-empty lines to a callback."""
+
+    def __init__(self, callback):
+        self.callback = callback
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._buffer = ""
+
+    def feed(self, data: bytes, final: bool = False):
+        self._buffer += self._decoder.decode(data, final)
+        *lines, self._buffer = re.split(r"[\r\n]", self._buffer)
+        if final:
+            lines.append(self._buffer)
+            self._buffer = ""
+        for line in lines:
+            if line:
+                self.callback(line)
+
+
+class CommandRunner:
+    """Runs subprocesses on a shared event loop with streaming output and timeouts."""
+
+    def __init__(self):
+        self._loop = None
+        self._lock = threading.Lock()
+        self._processes = set()
+        # Processes started in their own process group (non-interactive)
+        self._groups = set()
+        self._cancelled = set()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="command-runner",
+                                 daemon=True).start()
+            return self._loop
+
+    def submit(self, cmd: list, **kwargs):
+        """Start cmd on the loop; returns a concurrent.futures.Future of run_async()."""
+        return asyncio.run_coroutine_threadsafe(self.run_async(cmd, **kwargs), self._ensure_loop())
+
+    def run(self, cmd: list, **kwargs) -> subprocess.CompletedProcess:
+        """Run cmd and block until it finished. Ctrl-C stops the command as well."""
+        future = self.submit(cmd, **kwargs)
+        try:
+            return future.result()
+        except KeyboardInterrupt:
+            future.cancel()
+            raise
+
+    def cancel(self):
+        """Stop every running command; each fails with CommandCancelled."""
+        loop = self._ensure_loop()
+        for process in list(self._processes):
+            self._cancelled.add(process)
+            loop.call_soon_threadsafe(self._signal, process, signal.SIGTERM)
+
+    async def run_async(self, cmd: list, cwd: str = None, env: dict = None, on_stdout=None,
+                        on_stderr=None, capture_stdout: bool = False, echo: bool = False,
+                        echo_stderr: bool = None, timeout: float = None,
+                        idle_timeout: float = None, check: bool = True) -> subprocess.CompletedProcess:
+        """Run cmd, streaming its output. Returns a CompletedProcess.
+
+        on_stdout(line) / on_stderr(line) receive every output line. stdout
+        is only kept in the result with capture_stdout; the last lines of
+        stderr always are. echo copies the output to this process's
+        stdout/stderr as it arrives; echo_stderr overrides it for stderr. timeout limits the total run time and
+        idle_timeout the time without any output (seconds, None = no limit).
+        Without either limit the command may prompt on the terminal.
+        """
+        interactive = not (timeout or idle_timeout)
+        if not interactive:
+            env = non_interactive_env(env)
+        stdout_lines = [] if capture_stdout else None
+        stderr_tail = deque(maxlen=STDERR_TAIL_LINES)
+
+        def stdout_line(line):
+            if stdout_lines is not None:
+                stdout_lines.append(line)
+            if on_stdout:
+                on_stdout(line)
+
+        def stderr_line(line):
+            stderr_tail.append(line)
+            if on_stderr:
+                on_stderr(line)
+
+        own_group = not interactive and os.name == "posix"
+        process = await asyncio.create_subprocess_exec(
+            *cmd, cwd=cwd, env=env, stdin=None if interactive else subprocess.DEVNULL,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            # Own process group, so helpers git spawns are stopped with it
+            start_new_session=own_group
+        )
+        self._processes.add(process)
+        if own_group:
+            self._groups.add(process)
+        last_output = [time.monotonic()]
+        if echo_stderr is None:
+            echo_stderr = echo
+        pumps = asyncio.gather(
+            self._pump(process.stdout, _LineSplitter(stdout_line), sys.stdout if echo else None, last_output),
+            self._pump(process.stderr, _LineSplitter(stderr_line), sys.stderr if echo_stderr else None, last_output),
+        )
+        reason = None
+        try:
+            reason = await self._watch(pumps, time.monotonic(), last_output, timeout, idle_timeout)
+            if reason:
+                await self._stop(process, pumps)
+            returncode = await process.wait()
+        except BaseException:
+            # Cancelled, or a callback failed: do not leave the process behind
+            await self._stop(process, pumps)
+            raise
+        finally:
+            self._processes.discard(process)
+            self._groups.discard(process)
+
+        stdout = "\n".join(stdout_lines) + "\n" if stdout_lines else ("" if capture_stdout else None)
+        stderr = "\n".join(stderr_tail)
+        if process in self._cancelled:
+            self._cancelled.discard(process)
+            raise CommandCancelled(returncode, cmd, stdout, stderr)
+        if reason:
+            raise CommandTimeout(returncode, cmd, reason, stdout, stderr)
+        if check and returncode:
+            if not interactive and any(text in stderr for text in CREDENTIAL_PROMPT_ERRORS):
+                raise CommandNeedsCredentials(returncode, cmd, stdout, stderr)
+            raise subprocess.CalledProcessError(returncode, cmd, stdout, stderr)
+        return subprocess.CompletedProcess(cmd, returncode, stdout, stderr)
+
+    @staticmethod
+    async def _pump(stream, splitter: _LineSplitter, echo_to, last_output: list):
+        raw = getattr(echo_to, "buffer", None)
+        while True:
+            data = await stream.read(READ_SIZE)
+            if not data:
+                break
+            last_output[0] = time.monotonic()
+            if raw is not None:
+                echo_to.flush()
+                raw.write(data)
+                raw.flush()
+            elif echo_to is not None:
+                echo_to.write(data.decode("utf-8", errors="replace"))
+                echo_to.flush()
+            splitter.feed(data)
+        splitter.feed(b"", final=True)
+
+    @staticmethod
+    async def _watch(pumps, started: float, last_output: list, timeout: float,
+                     idle_timeout: float) -> str:
+        """Wait until the output streams close. Returns why the command must stop, if it must."""
+        while True:
+            done, _ = await asyncio.wait({pumps}, timeout=WATCH_INTERVAL)
+            if done:
+                pumps.result()
+                return None
+            now = time.monotonic()
+            if timeout and now - started > timeout:
+                return f"timed out after {timeout:g}s"
+            if idle_timeout and now - last_output[0] > idle_timeout:
+                return f"produced no output for {idle_timeout:g}s"
+
+    async def _stop(self, process, pumps):
+        """Terminate the process group, kill it after KILL_GRACE, then drop its streams."""
+        self._signal(process, signal.SIGTERM)
+        try:
+            await asyncio.wait_for(process.wait(), KILL_GRACE)
+        except asyncio.TimeoutError:
+            self._signal(process, signal.SIGKILL if hasattr(signal, "SIGKILL") else signal.SIGTERM)
+            await process.wait()
+        # A helper that escaped the group may keep the pipes open
+        try:
+            await asyncio.wait_for(asyncio.shield(pumps), KILL_GRACE)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            pumps.cancel()
+
+    def _signal(self, process, signum):
+        if process.returncode is not None:
+            return
+        try:
+            if process in self._groups:
+                os.killpg(process.pid, signum)
+            elif signum == signal.SIGTERM:
+                process.terminate()
+            else:
+                process.kill()
+        except ProcessLookupError:
+            pass
+
+
+_default = CommandRunner()
+
+
+def default_runner() -> CommandRunner:
+    return _default
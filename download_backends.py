@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LFS download backends
+
+A backend fills the local LFS store of a clone with the objects a transfer
+pushes afterwards:
+
+- git-lfs: ``git lfs fetch --all`` (every object of every ref)
+- native: the built-in Batch API client with pooled, concurrent transfers
+- hub: downloads files by path with huggingface_hub, which moves bytes with
+  hf_xet (chunk-level dedup) or hf_transfer when they are installed. Each
+  file is checked against its sha256 OID and moved into the LFS store, so it
+  is pushed like any other LFS object. Objects not found at a ref tip, or
+  whose download does not match, go through the native client instead.
+"""
+
+import os
+import shutil
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from lfs_api import LFS_POINTER_MAX_SIZE, LFSError, parse_lfs_pointer
+from hub_plan import parse_repo_url
+from integrity import hash_file
+from path_filter import unquote_path
+
+BACKENDS = ("git-lfs", "native", "hub")
+
+
+class DownloadBackendError(LFSError):
+    """Raised when a download backend cannot be used or fails."""
+
+
+class DownloadBackend:
+    """Downloads LFS objects to path_for(oid)."""
+
+    name = None
+    # Whether download() fetches exactly the given objects (git-lfs fetches by ref)
+    fetches_subsets = True
+
+    def describe(self) -> str:
+        return self.name
+
+    def download(self, objects: list, path_for, on_complete=None) -> int:
+        """Download objects, calling on_complete({'oid', 'size'}) per object. Returns bytes moved."""
+        raise NotImplementedError
+
+
+class GitLFSBackend(DownloadBackend):
+    name = "git-lfs"
+    fetches_subsets = False
+
+    def __init__(self, repo_path: str, run_command):
+        self.repo_path = repo_path
+        self.run_command = run_command
+
+    def download(self, objects: list, path_for, on_complete=None) -> int:
+        # git-lfs skips objects already in the local store; its bytes are counted from its progress output
+        self.run_command(['git', 'lfs', 'fetch', '--all'], cwd=self.repo_path)
+        if on_complete:
+            for obj in objects:
+                if os.path.exists(path_for(obj.oid)):
+                    on_complete({"oid": obj.oid, "size": obj.size})
+        return 0
+
+
+class NativeBackend(DownloadBackend):
+    name = "native"
+
+    def __init__(self, client):
+        self.client = client
+
+    def describe(self) -> str:
+        return f"native Batch API client, {self.client.concurrency} at a time"
+
+    def download(self, objects: list, path_for, on_complete=None) -> int:
+        return self.client.download_many(objects, path_for, on_complete=on_complete)
+
+
+def locate_lfs_objects(repo_path: str, refs: dict) -> dict:
+    """Map LFS OIDs to a (revision, path) where the source serves them.
+
+    refs maps local refs to the revision name to ask the source for. Only
+    ref tips are searched; objects that exist only deeper in the history
+    are not located.
+    """
+    blobs = {}
+    for ref, revision in refs.items():
+        listing = subprocess.run(
+            ["git", "-c", "core.quotePath=false", "ls-tree", "-r", "-l", ref],
+            cwd=repo_path, check=True, capture_output=True
+        ).stdout
+        for line in listing.splitlines():
+            meta, _, raw_path = line.partition(b"\t")
+            _, kind, sha, size = meta.decode().split()
+            if kind == "blob" and int(size) <= LFS_POINTER_MAX_SIZE and sha not in blobs:
+                blobs[sha] = (revision, unquote_path(raw_path))
+    if not blobs:
+        return {}
+
+    shas = list(blobs)
+    contents = subprocess.run(
+        ["git", "cat-file", "--batch"], cwd=repo_path, check=True, capture_output=True,
+        input=("\n".join(shas) + "\n").encode()
+    ).stdout
+    located = {}
+    offset = 0
+    for sha in shas:
+        header_end = contents.index(b"\n", offset)
+        size = int(contents[offset:header_end].split()[2])
+        parsed = parse_lfs_pointer(contents[header_end + 1:header_end + 1 + size])
+        offset = header_end + 1 + size + 1
+        if parsed and parsed[0] not in located:
+            located[parsed[0]] = blobs[sha]
+    return located
+
+
+class HubBackend(DownloadBackend):
+    """Downloads files through huggingface_hub and converts them into LFS objects."""
+
+    name = "hub"
+
+    def __init__(self, source_url: str, repo_path: str, staging_dir: str, refs: dict,
+                 fallback: DownloadBackend, concurrency: int = 8, token: str = None):
+        try:
+            import huggingface_hub
+        except ImportError as exc:
+            raise DownloadBackendError(
+                "The hub download backend needs huggingface_hub "
+                "(pip install huggingface_hub hf_xet)") from exc
+        self._hub = huggingface_hub
+        self.endpoint, repo_type, self.repo_id, _ = parse_repo_url(source_url)
+        self.repo_type = repo_type.rstrip("s")
+        self.repo_path = repo_path
+        self.staging_dir = staging_dir
+        self.refs = refs
+        self.fallback = fallback
+        self.concurrency = max(1, concurrency)
+        self.token = token or os.getenv("HF_TOKEN") or None
+        self._lock = threading.Lock()
+
+    def describe(self) -> str:
+        engines = [name for name in ("hf_xet", "hf_transfer") if _installed(name)]
+        return (f"huggingface_hub ({', '.join(engines) or 'plain HTTP'}) for {self.repo_id}, "
+                f"{self.concurrency} files at a time")
+
+    def download(self, objects: list, path_for, on_complete=None) -> int:
+        located = locate_lfs_objects(self.repo_path, self.refs)
+        by_hub = [obj for obj in objects if obj.oid in located]
+        leftovers = [obj for obj in objects if obj.oid not in located]
+        moved = 0
+        failed = []
+
+        def fetch(obj):
+            nonlocal moved
+            revision, path = located[obj.oid]
+            staging = os.path.join(self.staging_dir, obj.oid)
+            try:
+                local = self._hub.hf_hub_download(
+                    self.repo_id, path, repo_type=self.repo_type, revision=revision,
+                    local_dir=staging, endpoint=self.endpoint, token=self.token
+                )
+                if os.path.getsize(local) != obj.size or hash_file(local) != obj.oid:
+                    raise DownloadBackendError(f"{path}@{revision} does not match LFS object {obj.oid[:12]}")
+                dest = path_for(obj.oid)
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                os.replace(local, dest)
+            except Exception as exc:
+                print(f"   ⚠️  Hub download of {path} failed, using the LFS Batch API instead: {exc}")
+                with self._lock:
+                    failed.append(obj)
+                return
+            finally:
+                shutil.rmtree(staging, ignore_errors=True)
+            with self._lock:
+                moved += obj.size
+                if on_complete:
+                    on_complete({"oid": obj.oid, "size": obj.size})
+
+        if by_hub:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                list(pool.map(fetch, by_hub))
+        leftovers += failed
+        if leftovers:
+            print(f"   Downloading {len(leftovers)} LFS objects not available by path at a ref tip "
+                  f"with the {self.fallback.name} backend")
+            moved += self.fallback.download(leftovers, path_for, on_complete=on_complete)
+        return moved
+
+
+def _installed(module: str) -> bool:
+    try:
+        __import__(module)
+        return True
+    except ImportError:
+        return False
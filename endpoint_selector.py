@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fastest source endpoint selection
+
+A HuggingFace repository can be read from several endpoints serving the same
+paths: the origin, Xget (``https://xget.xi-xu.me/hf``), other HF mirrors or
+an internal proxy. Before cloning, every candidate is probed with a smart
+HTTP ref advertisement, which gives latency and health. Before LFS objects
+are downloaded, they are probed again with a short ranged read of the
+largest object, which gives throughput. Results are cached on disk with a
+TTL, so batch jobs probe at most once per TTL. The transfer uses the best
+healthy endpoint. If it fails or stalls mid-transfer, it switches to the
+next one and marks the failed endpoint unhealthy for everyone else.
+"""
+
+import os
+import json
+import time
+import tempfile
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import rate_control
+from file_lock import FileLock
+from lfs_api import LFSBatchClient, LFSError, format_bytes, split_credentials
+
+HF_ORIGIN = "https://huggingface.co"
+XGET_ENDPOINT = "https://xget.xi-xu.me/hf"
+ALIASES = {"origin": HF_ORIGIN, "hf": HF_ORIGIN, "xget": XGET_ENDPOINT}
+DEFAULT_ENDPOINTS = (HF_ORIGIN, XGET_ENDPOINT)
+DEFAULT_CACHE = os.path.join("~", ".cache", "hf_transfer", "endpoints.json")
+DEFAULT_TTL = 600.0
+# Failed endpoints are retried sooner than healthy ones are re-measured
+FAILED_TTL = 120.0
+PROBE_BYTES = 4 * 1024 * 1024
+PROBE_SECONDS = 3.0
+PROBE_TIMEOUT = 10
+# git aborts a transfer slower than this many bytes/s for this many seconds
+STALL_BYTES_PER_SECOND = 1024
+STALL_SECONDS = 60
+
+Probe = namedtuple("Probe", ["endpoint", "ok", "latency", "throughput", "error", "checked_at"])
+
+
+class EndpointError(Exception):
+    """Raised when no source endpoint can be used."""
+
+
+def parse_endpoints(spec) -> list:
+    """Endpoint base URLs from a comma-separated spec (or list); ``auto`` = origin + Xget."""
+    values = spec if isinstance(spec, (list, tuple)) else (spec or "").split(",")
+    endpoints = []
+    for value in values:
+        value = value.strip()
+        if not value:
+            continue
+        if value.lower() == "auto":
+            endpoints.extend(DEFAULT_ENDPOINTS)
+        else:
+            endpoints.append(ALIASES.get(value.lower(), value).rstrip("/"))
+    return list(dict.fromkeys(endpoints))
+
+
+def describe_error(exc: Exception) -> str:
+    """Short reason for a failed endpoint (request errors can be very long)."""
+    if isinstance(exc, requests.RequestException):
+        return type(exc).__name__
+    return str(exc)[:200]
+
+
+def stall_env() -> dict:
+    """Environment that makes git abort stalled HTTP transfers instead of hanging."""
+    return {"GIT_HTTP_LOW_SPEED_LIMIT": str(STALL_BYTES_PER_SECOND),
+            "GIT_HTTP_LOW_SPEED_TIME": str(STALL_SECONDS)}
+
+
+class ProbeCache:
+    """JSON file of recent probe results per endpoint, shared by concurrent transfers."""
+
+    def __init__(self, path: str = None, ttl: float = DEFAULT_TTL):
+        self.path = os.path.abspath(os.path.expanduser(
+            path or os.getenv("ENDPOINT_CACHE") or DEFAULT_CACHE))
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, encoding="utf-8") as handle:
+                return json.load(handle)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def get(self, kind: str, endpoint: str):
+        """A cached Probe that has not expired, or None."""
+        with self._lock, FileLock(f"{self.path}.lock", shared=True):
+            entry = self._load().get(f"{kind}|{endpoint}")
+        if not entry:
+            return None
+        ttl = self.ttl if entry["ok"] else min(self.ttl, FAILED_TTL)
+        if time.time() - entry["checked_at"] > ttl:
+            return None
+        return Probe(endpoint, **entry)
+
+    def put(self, kind: str, probe: Probe):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._lock, FileLock(f"{self.path}.lock"):
+            entries = self._load()
+            entries[f"{kind}|{probe.endpoint}"] = probe._asdict()
+            del entries[f"{kind}|{probe.endpoint}"]["endpoint"]
+            fd, tmp_path = tempfile.mkstemp(prefix=".endpoints-", dir=os.path.dirname(self.path))
+            with os.fdopen(fd, "w", encoding="utf-8") as handle:
+                json.dump(entries, handle, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+
+class EndpointSelector:
+    """Pick the fastest healthy endpoint for one source repository and fail over on errors."""
+
+    def __init__(self, source_url: str, endpoints: list, with_creds=None,
+                 cache: ProbeCache = None, session: requests.Session = None):
+        self.source_url = source_url.rstrip("/")
+        self.with_creds = with_creds or (lambda url: url)
+        self.cache = cache or ProbeCache()
+        self.session = session or rate_control.mount(requests.Session())
+        self.candidates = self._candidates(parse_endpoints(endpoints))
+        self.order = list(self.candidates)
+        self.index = 0
+
+    def _candidates(self, endpoints: list) -> dict:
+        """{endpoint: repository URL on that endpoint}; the source's own endpoint is always included."""
+        origin = next((endpoint for endpoint in endpoints
+                       if self.source_url.startswith(endpoint + "/")), None)
+        if origin is None and self.source_url.startswith(HF_ORIGIN + "/"):
+            origin = HF_ORIGIN
+            endpoints = [HF_ORIGIN] + endpoints
+        if origin is None:
+            # Not a repository the endpoints mirror; nothing to choose from
+            return {self.source_url: self.source_url}
+        path = self.source_url[len(origin):]
+        return {endpoint: endpoint + path for endpoint in endpoints}
+
+    @property
+    def current(self) -> str:
+        """Repository URL on the endpoint in use."""
+        return self.candidates[self.order[self.index]]
+
+    @property
+    def endpoint(self) -> str:
+        return self.order[self.index]
+
+    def has_alternatives(self) -> bool:
+        return len(self.candidates) > 1
+
+    # ------------------------------------------------------------------
+    # Probing
+    # ------------------------------------------------------------------
+
+    def _probe_git(self, endpoint: str) -> Probe:
+        url, auth = split_credentials(self.with_creds(self.candidates[endpoint]))
+        if not url.endswith(".git"):
+            url += ".git"
+        started = time.monotonic()
+        try:
+            with self.session.get(f"{url}/info/refs", params={"service": "git-upload-pack"},
+                                  auth=auth, stream=True, timeout=PROBE_TIMEOUT) as response:
+                latency = time.monotonic() - started
+                if response.status_code != 200:
+                    return Probe(endpoint, False, latency, None, f"HTTP {response.status_code}", time.time())
+                for _ in response.iter_content(chunk_size=65536):
+                    pass
+        except requests.RequestException as exc:
+            return Probe(endpoint, False, None, None, describe_error(exc), time.time())
+        return Probe(endpoint, True, round(latency, 4), None, None, time.time())
+
+    def _probe_lfs(self, endpoint: str, sample) -> Probe:
+        """Time a batch request and a short ranged read of sample through the endpoint."""
+        started = time.monotonic()
+        try:
+            client = LFSBatchClient(self.with_creds(self.candidates[endpoint]), session=self.session)
+            entry = client.batch("download", [sample])[0]
+            action = client._action(entry, "download")
+            latency = time.monotonic() - started
+            headers = dict(action.get("header", {}))
+            headers["Range"] = f"bytes=0-{min(PROBE_BYTES, sample.size) - 1}"
+            received = 0
+            read_start = time.monotonic()
+            with self.session.get(action["href"], headers=headers, stream=True,
+                                  timeout=PROBE_TIMEOUT) as response:
+                if response.status_code not in (200, 206):
+                    return Probe(endpoint, False, latency, None, f"HTTP {response.status_code}", time.time())
+                for chunk in response.iter_content(chunk_size=65536):
+                    received += len(chunk)
+                    if received >= PROBE_BYTES or time.monotonic() - read_start > PROBE_SECONDS:
+                        break
+            elapsed = max(time.monotonic() - read_start, 1e-6)
+        except (LFSError, requests.RequestException, IndexError) as exc:
+            return Probe(endpoint, False, None, None, describe_error(exc), time.time())
+        return Probe(endpoint, True, round(latency, 4), round(received / elapsed, 1), None, time.time())
+
+    def probe(self, sample=None, refresh: bool = False) -> list:
+        """Probe results of every candidate, from the cache when still fresh."""
+        kind = "lfs" if sample else "git"
+
+        def run(endpoint):
+            cached = None if refresh else self.cache.get(kind, endpoint)
+            if cached:
+                return cached
+            result = self._probe_lfs(endpoint, sample) if sample else self._probe_git(endpoint)
+            self.cache.put(kind, result)
+            return result
+
+        with ThreadPoolExecutor(max_workers=len(self.candidates)) as pool:
+            return list(pool.map(run, self.candidates))
+
+    def select(self, sample=None, refresh: bool = False) -> str:
+        """Rank the candidates and switch to the best one. Returns its repository URL.
+
+        Without sample, candidates are ranked by latency (clone); with an
+        LFS object, by throughput of a short read of it.
+        """
+        if not self.has_alternatives():
+            return self.current
+        results = self.probe(sample, refresh)
+
+        def score(result: Probe):
+            if not result.ok:
+                return (1, 0, 0)
+            return (0, -(result.throughput or 0), result.latency or 0)
+
+        ranked = sorted(results, key=score)
+        print(f"📡 Source endpoints ({'LFS throughput' if sample else 'latency'}):")
+        for result in ranked:
+            if not result.ok:
+                print(f"   ❌ {result.endpoint}: {result.error}")
+            elif sample:
+                print(f"   ✅ {result.endpoint}: {format_bytes(result.throughput)}/s, "
+                      f"{result.latency * 1000:.0f} ms")
+            else:
+                print(f"   ✅ {result.endpoint}: {result.latency * 1000:.0f} ms")
+        if not ranked[0].ok:
+            raise EndpointError(f"No source endpoint is reachable: {ranked[0].error}")
+        self.order = [result.endpoint for result in ranked]
+        self.index = 0
+        print(f"🏁 Using {self.endpoint}")
+        return self.current
+
+    def failover(self, reason: str = None):
+        """Mark the current endpoint unhealthy and switch to the next one. Returns its URL, or None."""
+        failed = self.endpoint
+        for kind in ("git", "lfs"):
+            self.cache.put(kind, Probe(failed, False, None, None, (reason or "failed")[:200], time.time()))
+        if self.index + 1 >= len(self.order):
+            return None
+        self.index += 1
+        print(f"🔀 Source endpoint {failed} failed{f' ({reason})' if reason else ''}; "
+              f"switching to {self.endpoint}")
+        return self.current
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+GitLab REST API client for mirror provisioning
+
+A thread-safe client with one pooled keep-alive session per GitLab instance.
+It follows ``Link: rel="next"`` pagination. Requests go through the shared
+per-host rate control (see rate_control.py), so GitLab's ``RateLimit-*`` and
+``Retry-After`` headers pause every thread. 429 and 5xx responses are retried
+with jittered exponential backoff. Resolved project IDs are cached on disk
+between runs.
+"""
+
+import os
+import json
+import time
+import tempfile
+import threading
+from urllib.parse import quote_plus
+
+import requests
+
+import rate_control
+from file_lock import FileLock
+
+DEFAULT_PROJECT_CACHE = os.path.join("~", ".cache", "hf_transfer", "gitlab_projects.json")
+DEFAULT_POOL_SIZE = 16
+PER_PAGE = 100
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class GitLabAPIError(Exception):
+    """Raised when a GitLab API call fails."""
+
+
+class GitLabClient:
+    """Pooled, rate-limit aware client for one GitLab API base URL."""
+
+    def __init__(self, api_base: str, token: str, pool_size: int = DEFAULT_POOL_SIZE,
+                 max_retries: int = 5, session: requests.Session = None):
+        self.api_base = api_base.rstrip("/")
+        self.max_retries = max_retries
+        if session is None:
+            session = rate_control.mount(requests.Session(), pool_connections=1, pool_maxsize=pool_size)
+        session.headers["PRIVATE-TOKEN"] = token
+        self.session = session
+
+    def _url(self, path: str) -> str:
+        return path if path.startswith(("http://", "https://")) else f"{self.api_base}/{path.lstrip('/')}"
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        """Send a request, retrying 429/5xx responses and connection errors."""
+        kwargs.setdefault("timeout", 30)
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.request(method, self._url(path), **kwargs)
+            except requests.RequestException as exc:
+                if attempt == self.max_retries:
+                    raise GitLabAPIError(f"{method} {path} failed: {exc}") from exc
+                time.sleep(rate_control.backoff_delay(attempt))
+                continue
+            if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                return response
+            # The host's limiter already pauses after 429/503
+            if response.status_code not in rate_control.THROTTLE_STATUSES:
+                time.sleep(rate_control.backoff_delay(attempt))
+        return response
+
+    def paginate(self, path: str, params: dict = None):
+        """Yield every item of a list endpoint, following Link headers."""
+        url, params = path, {"per_page": PER_PAGE, **(params or {})}
+        while url:
+            response = self.request("GET", url, params=params)
+            if response.status_code != 200:
+                raise GitLabAPIError(f"GET {path} failed: {response.status_code} {response.text}")
+            yield from response.json()
+            url = response.links.get("next", {}).get("url")
+            params = None  # the next link carries the query string
+
+    def project_id(self, project_path: str) -> int:
+        response = self.request("GET", f"projects/{quote_plus(project_path)}")
+        if response.status_code != 200:
+            raise GitLabAPIError(f"Failed to fetch GitLab project '{project_path}': "
+                                 f"{response.status_code} {response.text}")
+        return response.json()["id"]
+
+
+class ProjectIdCache:
+    """JSON file mapping (API base, project path) to project IDs, safe for concurrent writers."""
+
+    def __init__(self, path: str = None):
+        self.path = os.path.abspath(os.path.expanduser(
+            path or os.getenv("GITLAB_PROJECT_CACHE") or DEFAULT_PROJECT_CACHE
+        ))
+        self.lock_path = f"{self.path}.lock"
+        self._thread_lock = threading.Lock()
+        self._ids = None
+
+    @staticmethod
+    def _key(api_base: str, project_path: str) -> str:
+        return f"{api_base.rstrip('/')}|{project_path}"
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, encoding="utf-8") as handle:
+                return json.load(handle)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def get(self, api_base: str, project_path: str):
+        with self._thread_lock:
+            if self._ids is None:
+                with FileLock(self.lock_path, shared=True):
+                    self._ids = self._load()
+            return self._ids.get(self._key(api_base, project_path))
+
+    def put(self, api_base: str, project_path: str, project_id):
+        """Record (or with project_id None, forget) the ID of a project."""
+        key = self._key(api_base, project_path)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._thread_lock, FileLock(self.lock_path):
+            ids = self._load()
+            if project_id is None:
+                ids.pop(key, None)
+            else:
+                ids[key] = project_id
+            fd, tmp_path = tempfile.mkstemp(prefix=".gitlab_projects-", dir=os.path.dirname(self.path))
+            with os.fdopen(fd, "w", encoding="utf-8") as handle:
+                json.dump(ids, handle, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+            self._ids = ids
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+History-limited transfers
+
+A shallow clone cannot be pushed to an empty target: the receiving side
+rejects commits whose parents it never gets. These helpers turn the fetched
+window into a self-contained history by rewriting the shallow boundary
+commits into root commits, or collapse a single revision into one orphan
+snapshot commit. Author, committer, tree and message are kept; signatures
+are dropped because the rewritten objects no longer match them.
+"""
+
+import os
+import subprocess
+
+# Headers that sign or embed the original objects and become invalid on rewrite
+DROPPED_HEADERS = (b"gpgsig", b"gpgsig-sha256", b"mergetag")
+SIGNATURE_MARKERS = (b"-----BEGIN PGP SIGNATURE-----", b"-----BEGIN SSH SIGNATURE-----")
+
+
+def _git(repo_path: str, *args, input: bytes = None) -> bytes:
+    return subprocess.run(
+        ["git", *args], cwd=repo_path, check=True, capture_output=True, input=input
+    ).stdout
+
+
+def shallow_file(repo_path: str) -> str:
+    return os.path.join(repo_path, _git(repo_path, "rev-parse", "--git-path", "shallow").decode().strip())
+
+
+def is_shallow(repo_path: str) -> bool:
+    return os.path.exists(shallow_file(repo_path))
+
+
+def read_objects(repo_path: str, shas: list) -> dict:
+    """Return {sha: (type, raw bytes)} read through a single ``git cat-file --batch``."""
+    if not shas:
+        return {}
+    output = _git(repo_path, "cat-file", "--batch", input="\n".join(shas).encode() + b"\n")
+    objects = {}
+    pos = 0
+    while pos < len(output):
+        header_end = output.index(b"\n", pos)
+        sha, kind, size = output[pos:header_end].decode().split()
+        start = header_end + 1
+        objects[sha] = (kind, output[start:start + int(size)])
+        pos = start + int(size) + 1
+    return objects
+
+
+def split_object(raw: bytes):
+    """Split a commit or tag into ([(key, value)], message), joining continuation lines."""
+    head, _, message = raw.partition(b"\n\n")
+    headers = []
+    for line in head.split(b"\n"):
+        if line.startswith(b" ") and headers:
+            key, value = headers[-1]
+            headers[-1] = (key, value + b"\n" + line)
+        else:
+            key, _, value = line.partition(b" ")
+            headers.append((key, value))
+    return headers, message
+
+
+def join_object(headers: list, message: bytes) -> bytes:
+    return b"\n".join(key + b" " + value for key, value in headers) + b"\n\n" + message
+
+
+def write_object(repo_path: str, kind: str, raw: bytes) -> str:
+    return _git(repo_path, "hash-object", "-t", kind, "-w", "--stdin", input=raw).decode().strip()
+
+
+def _strip_signature(message: bytes) -> bytes:
+    for marker in SIGNATURE_MARKERS:
+        index = message.find(marker)
+        if index != -1:
+            return message[:index]
+    return message
+
+
+def _local_refs(repo_path: str) -> list:
+    """[(sha, type, ref)] of non-symbolic refs."""
+    output = _git(repo_path, "for-each-ref",
+                  "--format=%(objectname) %(objecttype) %(refname) %(symref)").decode()
+    refs = []
+    for line in output.splitlines():
+        parts = line.split(" ")
+        if parts[3]:
+            continue
+        refs.append((parts[0], parts[1], parts[2]))
+    return refs
+
+
+def _update_refs(repo_path: str, commands: list):
+    if commands:
+        _git(repo_path, "update-ref", "--stdin", input="".join(commands).encode())
+
+
+def rewrite_shallow_history(repo_path: str) -> int:
+    """Make a shallow repository pushable by turning boundary commits into roots.
+
+    Every commit reachable from a ref is rewritten in topological order with
+    its parents remapped; parents that were cut off by the shallow fetch are
+    dropped. Refs and annotated tags are moved to the new objects and the
+    repository stops being shallow. Returns the number of commits rewritten.
+    """
+    path = shallow_file(repo_path)
+    if not os.path.exists(path):
+        return 0
+    with open(path, encoding="utf-8") as handle:
+        boundary = {line.strip() for line in handle if line.strip()}
+
+    commits = _git(repo_path, "rev-list", "--reverse", "--topo-order", "--all").decode().split()
+    raw_commits = read_objects(repo_path, commits)
+    mapping = {}
+    for sha in commits:
+        headers, message = split_object(raw_commits[sha][1])
+        rewritten = []
+        for key, value in headers:
+            if key in DROPPED_HEADERS:
+                continue
+            if key == b"parent":
+                parent = value.decode()
+                if sha in boundary or parent not in mapping:
+                    continue
+                value = mapping[parent].encode()
+            rewritten.append((key, value))
+        mapping[sha] = write_object(repo_path, "commit", join_object(rewritten, message))
+
+    tags = {}
+
+    def rewrite_tag(sha: str) -> str:
+        if sha not in tags:
+            headers, message = split_object(read_objects(repo_path, [sha])[sha][1])
+            rewritten = []
+            for key, value in headers:
+                if key == b"object":
+                    target = value.decode()
+                    kind = dict(headers).get(b"type", b"").decode()
+                    target = mapping.get(target) or (rewrite_tag(target) if kind == "tag" else target)
+                    value = target.encode()
+                rewritten.append((key, value))
+            tags[sha] = write_object(repo_path, "tag", join_object(rewritten, _strip_signature(message)))
+        return tags[sha]
+
+    commands = []
+    for sha, kind, ref in _local_refs(repo_path):
+        if kind == "commit" and sha in mapping:
+            commands.append(f"update {ref} {mapping[sha]} {sha}\n")
+        elif kind == "tag":
+            commands.append(f"update {ref} {rewrite_tag(sha)} {sha}\n")
+    _update_refs(repo_path, commands)
+    os.remove(path)
+    return len(mapping)
+
+
+def squash_to_snapshot(repo_path: str, note: str) -> str:
+    """Replace the history of HEAD's branch with one orphan commit of its tree.
+
+    The snapshot keeps the original author, committer and message, with note
+    appended. Tags on the squashed commit are re-pointed to the snapshot as
+    lightweight tags; every other ref is deleted. Returns the new commit SHA.
+    """
+    branch = _git(repo_path, "symbolic-ref", "HEAD").decode().strip()
+    original = _git(repo_path, "rev-parse", "--verify", f"{branch}^{{commit}}").decode().strip()
+    headers, message = split_object(read_objects(repo_path, [original])[original][1])
+    kept = [(key, value) for key, value in headers
+            if key != b"parent" and key not in DROPPED_HEADERS]
+    message = message.rstrip(b"\n") + b"\n\n" + note.encode() + b"\n"
+    snapshot = write_object(repo_path, "commit", join_object(kept, message))
+
+    commands = [f"update {branch} {snapshot} {original}\n"]
+    for sha, kind, ref in _local_refs(repo_path):
+        if ref == branch:
+            continue
+        if ref.startswith("refs/tags/") and _git(
+                repo_path, "rev-parse", f"{ref}^{{commit}}").decode().strip() == original:
+            commands.append(f"update {ref} {snapshot} {sha}\n")
+        else:
+            commands.append(f"delete {ref} {sha}\n")
+    _update_refs(repo_path, commands)
+    if is_shallow(repo_path):
+        os.remove(shallow_file(repo_path))
+    return snapshot
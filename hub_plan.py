@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Clone-free transfer planning
+
+Lists the files of a HuggingFace repository revision through the Hub's tree
+API (``/api/<type>s/<repo>/tree/<revision>``) instead of cloning it. Each
+entry carries the file size and, for LFS files, the sha256 OID, which is all
+that is needed to size a transfer. The API host is ``$HF_ENDPOINT`` (e.g. a
+mirror), or the host of the source URL otherwise.
+
+The plan covers the files of one revision, so it is a lower bound for
+transfers that also move older LFS versions from the history.
+"""
+
+import os
+import sys
+import json
+import argparse
+from urllib.parse import quote, urlparse
+
+import requests
+from dotenv import load_dotenv
+
+import rate_control
+from lfs_api import format_bytes
+from path_filter import PathFilter, split_patterns
+
+HF_BASE_URL = "https://huggingface.co"
+REPO_TYPES = ("models", "datasets", "spaces")
+DEFAULT_BANDWIDTH_MBPS = 100.0
+# Pointer files, configs and git metadata on top of the files themselves
+GIT_OVERHEAD = 0.05
+
+
+class HubPlanError(Exception):
+    """Raised when repository metadata cannot be fetched from the Hub."""
+
+
+class HubFile:
+    """A file of a Hub repository revision."""
+
+    __slots__ = ("path", "size", "blob_oid", "lfs_oid")
+
+    def __init__(self, path: str, size: int, blob_oid: str = None, lfs_oid: str = None):
+        self.path = path
+        self.size = int(size)
+        self.blob_oid = blob_oid
+        self.lfs_oid = lfs_oid
+
+    @property
+    def is_lfs(self) -> bool:
+        return self.lfs_oid is not None
+
+    def to_json(self) -> dict:
+        return {"path": self.path, "size": self.size, "blob_oid": self.blob_oid, "lfs_oid": self.lfs_oid}
+
+
+def parse_repo_url(source: str):
+    """Return (api_base, repo_type, repo_id, url revision) for a source URL or "org/name".
+
+    Understands .../org/name(.git), .../datasets/org/name and
+    .../org/name/tree/<revision>.
+    """
+    if not source.startswith(("http://", "https://")):
+        source = f"{HF_BASE_URL}/{source.strip('/')}"
+    parsed = urlparse(source)
+    segments = [segment for segment in parsed.path.split("/") if segment]
+    repo_type = "models"
+    if segments and segments[0] in REPO_TYPES:
+        repo_type = segments.pop(0)
+    revision = None
+    if len(segments) > 3 and segments[2] == "tree":
+        revision = "/".join(segments[3:])
+    if len(segments) < 2:
+        raise HubPlanError(f"Cannot derive a Hub repository from {source}")
+    repo_id = "/".join(segments[:2])
+    repo_id = repo_id[:-4] if repo_id.endswith(".git") else repo_id
+    api_base = os.getenv("HF_ENDPOINT") or f"{parsed.scheme}://{parsed.hostname}" + (
+        f":{parsed.port}" if parsed.port else "")
+    return api_base.rstrip("/"), repo_type, repo_id, revision
+
+
+class HubClient:
+    """Minimal read-only client for the Hub's repository metadata endpoints."""
+
+    def __init__(self, api_base: str, token: str = None, session: requests.Session = None):
+        self.api_base = api_base.rstrip("/")
+        self.session = session or rate_control.mount(requests.Session())
+        token = token if token is not None else os.getenv("HF_TOKEN")
+        if token:
+            self.session.headers["Authorization"] = f"Bearer {token}"
+
+    def _get(self, url: str, **params) -> requests.Response:
+        try:
+            response = self.session.get(url, params=params or None, timeout=30)
+        except requests.RequestException as exc:
+            raise HubPlanError(f"Hub request failed: {exc}") from exc
+        if response.status_code in (401, 403):
+            raise HubPlanError(f"Access denied ({response.status_code}) for {url}; check HF_TOKEN")
+        if response.status_code == 404:
+            raise HubPlanError(f"Repository or revision not found: {url}")
+        if response.status_code != 200:
+            raise HubPlanError(f"Hub returned {response.status_code} for {url}: {response.text[:200]}")
+        return response
+
+    def _repo_url(self, repo_type: str, repo_id: str) -> str:
+        return f"{self.api_base}/api/{repo_type}/{repo_id}"
+
+    def revision_sha(self, repo_type: str, repo_id: str, revision: str) -> str:
+        """Commit SHA a branch, tag or commit resolves to."""
+        url = f"{self._repo_url(repo_type, repo_id)}/revision/{quote(revision, safe='')}"
+        return self._get(url).json().get("sha")
+
+    def list_files(self, repo_type: str, repo_id: str, revision: str) -> list:
+        """All files of a revision, following the tree API's Link pagination."""
+        url = f"{self._repo_url(repo_type, repo_id)}/tree/{quote(revision, safe='')}"
+        params = {"recursive": "true"}
+        files = []
+        while url:
+            response = self._get(url, **params)
+            for entry in response.json():
+                if entry.get("type") != "file":
+                    continue
+                lfs = entry.get("lfs") or {}
+                files.append(HubFile(entry["path"], lfs.get("size", entry.get("size", 0)),
+                                     blob_oid=entry.get("oid"), lfs_oid=lfs.get("oid")))
+            # The next-page URL already carries the query (including the cursor)
+            url, params = response.links.get("next", {}).get("url"), {}
+        return files
+
+
+def estimate_disk(lfs_bytes: int, regular_bytes: int, mode: str = "standard",
+                  max_disk_bytes: int = 10 * 1024 ** 3) -> int:
+    """Peak temp disk of a transfer mode.
+
+    standard: bare clone plus local LFS store. checkout: the working tree
+    duplicates every file. pipeline: at most the disk budget is staged.
+    stream: LFS objects never touch the disk.
+    """
+    git_bytes = int(regular_bytes * (1 + GIT_OVERHEAD))
+    if mode == "checkout":
+        return git_bytes + regular_bytes + 2 * lfs_bytes
+    if mode == "pipeline":
+        return git_bytes + min(lfs_bytes, max_disk_bytes)
+    if mode == "stream":
+        return git_bytes
+    return git_bytes + lfs_bytes
+
+
+def estimate_seconds(total_bytes: int, mode: str = "standard",
+                     bandwidth_mbps: float = DEFAULT_BANDWIDTH_MBPS) -> float:
+    """Transfer time at a given link speed; pipeline and stream overlap download and upload."""
+    rate = bandwidth_mbps * 1_000_000 / 8
+    passes = 1 if mode in ("pipeline", "stream") else 2
+    return passes * total_bytes / rate if rate else 0.0
+
+
+def build_plan(source: str, revision: str = None, path_filter: PathFilter = None,
+               mode: str = "standard", max_disk_bytes: int = 10 * 1024 ** 3,
+               bandwidth_mbps: float = DEFAULT_BANDWIDTH_MBPS, client: HubClient = None) -> dict:
+    """Query the Hub and return a size-sorted transfer plan for one source."""
+    api_base, repo_type, repo_id, url_revision = parse_repo_url(source)
+    revision = revision or url_revision or "main"
+    client = client or HubClient(api_base)
+    sha = client.revision_sha(repo_type, repo_id, revision)
+    files = sorted(client.list_files(repo_type, repo_id, sha or revision),
+                   key=lambda f: (-f.size, f.path))
+
+    excluded = []
+    if path_filter:
+        excluded = [f for f in files if not path_filter.keeps(f.path)]
+        files = [f for f in files if path_filter.keeps(f.path)]
+
+    lfs_objects = {}
+    for f in files:
+        if f.is_lfs:
+            lfs_objects[f.lfs_oid] = f.size
+    lfs_bytes = sum(lfs_objects.values())
+    regular_bytes = sum(f.size for f in files if not f.is_lfs)
+    total_bytes = lfs_bytes + regular_bytes
+    return {
+        "source": source,
+        "repo_type": repo_type,
+        "repo_id": repo_id,
+        "revision": revision,
+        "sha": sha,
+        "mode": mode,
+        "files": [f.to_json() for f in files],
+        "excluded": [f.path for f in excluded],
+        "totals": {
+            "files": len(files),
+            "lfs_files": sum(1 for f in files if f.is_lfs),
+            "lfs_objects": len(lfs_objects),
+            "lfs_bytes": lfs_bytes,
+            "regular_bytes": regular_bytes,
+            "bytes": total_bytes,
+            "excluded_files": len(excluded),
+            "excluded_bytes": sum(f.size for f in excluded),
+        },
+        "disk_bytes": estimate_disk(lfs_bytes, regular_bytes, mode, max_disk_bytes),
+        "estimated_seconds": estimate_seconds(total_bytes, mode, bandwidth_mbps),
+    }
+
+
+def lfs_oids(plan: dict) -> set:
+    """sha256 OIDs of the LFS files in a plan."""
+    return {f["lfs_oid"] for f in plan["files"] if f["lfs_oid"]}
+
+
+def format_duration(seconds: float) -> str:
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m" if hours else f"{minutes}m{secs:02d}s"
+
+
+def print_plan(plan: dict, top: int = 10):
+    totals = plan["totals"]
+    print(f"\n📋 {plan['repo_id']} @ {plan['revision']} ({(plan['sha'] or '?')[:12]})")
+    print(f"   Files:          {totals['files']} ({totals['lfs_files']} LFS, "
+          f"{totals['lfs_objects']} unique objects)")
+    print(f"   LFS bytes:      {format_bytes(totals['lfs_bytes'])}")
+    print(f"   Regular bytes:  {format_bytes(totals['regular_bytes'])}")
+    if totals["excluded_files"]:
+        print(f"   Excluded:       {totals['excluded_files']} files "
+              f"({format_bytes(totals['excluded_bytes'])})")
+    print(f"   Disk needed:    {format_bytes(plan['disk_bytes'])} ({plan['mode']} mode)")
+    print(f"   Estimated time: {format_duration(plan['estimated_seconds'])}")
+    for f in plan["files"][:top]:
+        marker = "LFS" if f["lfs_oid"] else "   "
+        print(f"     {marker} {format_bytes(f['size']):>10}  {f['path']}")
+    if len(plan["files"]) > top:
+        print(f"     … {len(plan['files']) - top} more files")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Plan transfers from HuggingFace Hub metadata without cloning',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Size and file list of one model
+  python hub_plan.py --source https://huggingface.co/internlm/Intern-S1
+
+  # Whole batch config, largest first, only safetensors weights, as JSON
+  python hub_plan.py --config batch_config.txt --exclude "*.bin,*.onnx" --json
+        """
+    )
+    parser.add_argument('-s', '--source', action='append', default=[],
+                        help='Source repository URL or org/name (repeatable)')
+    parser.add_argument('--config', help='Plan every source of a batch config file')
+    parser.add_argument('--revision', help='Branch, tag or commit (default: main)')
+    parser.add_argument('--include', action='append', metavar='GLOB', help='Only count matching paths')
+    parser.add_argument('--exclude', action='append', metavar='GLOB', help='Do not count matching paths')
+    parser.add_argument('--mode', choices=['standard', 'checkout', 'pipeline', 'stream'],
+                        default='standard', help='Transfer mode for the disk estimate (default: standard)')
+    parser.add_argument('--max-disk', type=float, default=10.0,
+                        help='Disk budget in GB of the pipeline mode (default: 10)')
+    parser.add_argument('--bandwidth-mbps', type=float, default=DEFAULT_BANDWIDTH_MBPS,
+                        help=f'Link speed for the duration estimate (default: {DEFAULT_BANDWIDTH_MBPS:g})')
+    parser.add_argument('--top', type=int, default=10, help='Largest files listed per repo (default: 10)')
+    parser.add_argument('--json', action='store_true', help='Print the plans as JSON')
+    parser.add_argument('--env-file', default='.env', help='Path to .env file (default: .env)')
+    args = parser.parse_args()
+
+    if os.path.exists(args.env_file):
+        load_dotenv(args.env_file)
+
+    sources = list(args.source)
+    if args.config:
+        from batch_engine import BatchConfigError, parse_batch_config
+        try:
+            # Targets do not matter for planning; any base keeps target-less lines
+            sources += [source for source, *_ in parse_batch_config(args.config, target_base="-")]
+        except BatchConfigError as exc:
+            print(f"❌ {exc}")
+            return 1
+    if not sources:
+        parser.error('give --source or --config')
+
+    path_filter = PathFilter(split_patterns(args.include), split_patterns(args.exclude))
+    plans, failed = [], 0
+    for source in sources:
+        try:
+            plans.append(build_plan(source, args.revision, path_filter, args.mode,
+                                    int(args.max_disk * 1024 ** 3), args.bandwidth_mbps))
+        except HubPlanError as exc:
+            failed += 1
+            print(f"❌ {source}: {exc}", file=sys.stderr)
+    plans.sort(key=lambda plan: -plan["totals"]["bytes"])
+
+    if args.json:
+        print(json.dumps(plans, indent=2))
+    else:
+        for plan in plans:
+            print_plan(plan, args.top)
+        print("\n" + "=" * 60)
+        print(f"📊 {len(plans)} repos, {format_bytes(sum(p['totals']['bytes'] for p in plans))} to move, "
+              f"largest needs {format_bytes(max((p['disk_bytes'] for p in plans), default=0))} of disk")
+        print(f"   Sequential estimate at {args.bandwidth_mbps:g} Mbit/s: "
+              f"{format_duration(sum(p['estimated_seconds'] for p in plans))}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Transfer integrity checks
+
+Object bytes are verified while they stream: downloads and the relay hash
+what they receive, uploads hash what they send (``lfs_api.HashingReader``),
+so nothing is read twice. After a transfer, :func:`audit` compares source
+and target through metadata only:
+
+- ref SHAs from ``git ls-remote`` of both remotes. Identical commits mean
+  identical trees and LFS pointers.
+- the LFS OIDs the source refs point to, from the Hub's tree API, checked
+  against the target with an LFS batch ``download`` request. The target
+  lists the objects it stores without sending any of them.
+
+Where local files must be re-hashed (parallel range downloads, files
+fetched by huggingface_hub, a shared LFS cache), :func:`hash_file` reads
+them through mmap so hashlib runs without the GIL, and :func:`hash_files`
+spreads many files across all cores.
+
+Audit a local LFS store (e.g. ``--lfs-cache-dir``)::
+
+    python integrity.py ~/.cache/hf_lfs --remove-corrupt
+"""
+
+import os
+import re
+import sys
+import mmap
+import json
+import hashlib
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from hub_plan import HubClient, HubPlanError, parse_repo_url
+from lfs_api import LFSBatchClient, LFSError, LFSObject, format_bytes, split_credentials
+from ref_push import DEFAULT_SKIP_REFS, is_skipped
+from sync_state import ls_remote
+
+HASH_CHUNK = 8 * 1024 * 1024
+OID_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+# Refs and objects listed per problem in printed reports
+REPORT_LIMIT = 5
+
+
+class IntegrityError(Exception):
+    """Raised when a target does not match its source."""
+
+
+# ----------------------------------------------------------------------
+# Local hashing
+# ----------------------------------------------------------------------
+
+def hash_file(path: str) -> str:
+    """sha256 of a file, read through mmap in large slices (hashlib releases the GIL)."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        size = os.fstat(handle.fileno()).st_size
+        if not size:
+            return digest.hexdigest()
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if hasattr(mapped, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+            view = memoryview(mapped)
+            try:
+                for offset in range(0, size, HASH_CHUNK):
+                    digest.update(view[offset:offset + HASH_CHUNK])
+            finally:
+                view.release()
+    return digest.hexdigest()
+
+
+def hash_files(paths: list, workers: int = None) -> dict:
+    """{path: sha256} of many files, hashed on one thread per core."""
+    if not paths:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(len(paths), workers or os.cpu_count() or 1)) as pool:
+        return dict(zip(paths, pool.map(hash_file, paths)))
+
+
+def audit_store(objects_dir: str, workers: int = None, remove_corrupt: bool = False) -> dict:
+    """Re-hash every object of a local LFS store (``<oid[:2]>/<oid[2:4]>/<oid>`` files)."""
+    paths = []
+    for dirpath, _, filenames in os.walk(objects_dir):
+        paths.extend(os.path.join(dirpath, name) for name in filenames if OID_PATTERN.match(name))
+    digests = hash_files(paths, workers)
+    corrupt = sorted(path for path, digest in digests.items() if digest != os.path.basename(path))
+    total = sum(os.path.getsize(path) for path in paths)
+    if remove_corrupt:
+        for path in corrupt:
+            os.remove(path)
+    return {"store": objects_dir, "checked": len(paths), "bytes": total,
+            "corrupt": corrupt, "removed": remove_corrupt}
+
+
+# ----------------------------------------------------------------------
+# Remote audit
+# ----------------------------------------------------------------------
+
+def default_branch(url: str) -> str:
+    """Ref the remote's HEAD points to, e.g. ``refs/heads/main`` (None if it has none)."""
+    result = subprocess.run(
+        ["git", "ls-remote", "--symref", url, "HEAD"],
+        check=True, capture_output=True, text=True,
+        env={**os.environ, "GIT_TERMINAL_PROMPT": "0"}
+    )
+    for line in result.stdout.splitlines():
+        if line.startswith("ref: ") and line.endswith("\tHEAD"):
+            return line[len("ref: "):].split("\t")[0]
+    return None
+
+
+def transferred_refs(refs: dict, mirror: bool = False, branch: str = None,
+                     skip_refs=DEFAULT_SKIP_REFS) -> dict:
+    """Refs a transfer copies: all of them in mirror mode, else the default branch and tags."""
+    return {ref: sha for ref, sha in refs.items()
+            if ref.startswith("refs/") and not is_skipped(ref, skip_refs)
+            and (mirror or ref == branch or ref.startswith("refs/tags/"))}
+
+
+def compare_refs(source: dict, target: dict, mirror: bool = False) -> dict:
+    """Diff two {ref: sha} maps. Extra target refs only count as a difference in mirror mode."""
+    return {
+        "checked": len(source),
+        "missing": sorted(ref for ref in source if ref not in target),
+        "different": sorted(ref for ref in source if ref in target and target[ref] != source[ref]),
+        "extra": sorted(ref for ref in target if ref not in source) if mirror else [],
+    }
+
+
+def revision_name(ref: str) -> str:
+    """Revision the Hub API understands for a ref (branch and tag names without their prefix)."""
+    for prefix in ("refs/heads/", "refs/tags/"):
+        if ref.startswith(prefix):
+            return ref[len(prefix):]
+    return ref
+
+
+def source_lfs_objects(source: str, revisions: list, path_filter=None,
+                       client: HubClient = None) -> list:
+    """Unique LFS objects of the given revisions of a Hub repository, from its tree API."""
+    api_base, repo_type, repo_id, _ = parse_repo_url(source)
+    client = client or HubClient(api_base)
+    objects = {}
+    for revision in revisions:
+        for f in client.list_files(repo_type, repo_id, revision):
+            if f.is_lfs and (not path_filter or path_filter.keeps(f.path)):
+                objects[f.lfs_oid] = f.size
+    return [LFSObject(oid, size) for oid, size in objects.items()]
+
+
+def missing_on_target(target_url: str, objects: list, client: LFSBatchClient = None) -> list:
+    """Objects the target's LFS server does not store, from a download batch (no bytes move)."""
+    client = client or LFSBatchClient(target_url)
+    present = {entry["oid"] for entry in client.batch("download", objects)
+               if not entry.get("error") and entry.get("actions", {}).get("download")}
+    return [obj for obj in objects if obj.oid not in present]
+
+
+def audit(source_url: str, target_url: str, hub_source: str = None, mirror: bool = False,
+          skip_refs=DEFAULT_SKIP_REFS, check_refs: bool = True, check_lfs: bool = True,
+          revisions: list = None, path_filter=None, objects: list = None,
+          scope: str = None) -> dict:
+    """Compare refs and LFS objects of source and target without downloading any blob.
+
+    source_url and target_url may carry credentials; hub_source is the Hub
+    repository URL used for the tree API (default: source_url). objects
+    are the LFS objects to check, e.g. those a transfer scanned in its
+    clone, described by scope. Without them, the Hub tree API lists the
+    objects at the tips of revisions (default: every transferred source
+    ref); older history is not covered. Returns a report whose ``ok``
+    tells whether the target matches.
+    """
+    report = {"source": split_credentials(source_url)[0], "target": split_credentials(target_url)[0],
+              "refs": None, "lfs": None, "errors": []}
+    try:
+        source_refs = ls_remote(source_url)
+        branch = None if mirror else default_branch(source_url)
+    except subprocess.CalledProcessError as exc:
+        raise IntegrityError(f"Cannot list the refs of {report['source']}: "
+                             f"{(exc.stderr or '').strip()[:200]}") from exc
+    source_refs = transferred_refs(source_refs, mirror, branch, skip_refs)
+
+    if check_refs:
+        try:
+            target_refs = ls_remote(target_url)
+        except subprocess.CalledProcessError:
+            target_refs = {}
+        target_refs = transferred_refs(target_refs, mirror=True, skip_refs=skip_refs)
+        report["refs"] = compare_refs(source_refs, target_refs, mirror)
+
+    if check_lfs:
+        try:
+            if objects is None:
+                if revisions is None:
+                    # One tree listing per distinct commit
+                    revisions = list({sha: revision_name(ref)
+                                      for ref, sha in sorted(source_refs.items())}.values())
+                objects = source_lfs_objects(hub_source or source_url, revisions, path_filter)
+                scope = f"tips of {len(revisions)} revision(s) only"
+            missing = missing_on_target(target_url, objects) if objects else []
+            report["lfs"] = {"checked": len(objects), "bytes": sum(obj.size for obj in objects),
+                             "scope": scope, "missing": [obj.to_json() for obj in missing]}
+        except (HubPlanError, LFSError) as exc:
+            report["errors"].append(str(exc))
+
+    refs, lfs = report["refs"], report["lfs"]
+    report["ok"] = (not report["errors"]
+                    and not (refs and (refs["missing"] or refs["different"] or refs["extra"]))
+                    and not (lfs and lfs["missing"]))
+    return report
+
+
+def print_report(report: dict):
+    print(f"{'✅' if report['ok'] else '❌'} {report['source']} → {report['target']}")
+    refs, lfs = report["refs"], report["lfs"]
+    if refs:
+        print(f"   Refs: {refs['checked']} checked, {len(refs['missing'])} missing, "
+              f"{len(refs['different'])} different"
+              + (f", {len(refs['extra'])} extra" if refs["extra"] else ""))
+        for label in ("missing", "different", "extra"):
+            for ref in refs[label][:REPORT_LIMIT]:
+                print(f"     {label}: {ref}")
+    if lfs:
+        print(f"   LFS objects: {lfs['checked']} checked ({format_bytes(lfs['bytes'])}"
+              + (f", {lfs['scope']}" if lfs.get("scope") else "")
+              + f"), {len(lfs['missing'])} missing on the target")
+        for obj in lfs["missing"][:REPORT_LIMIT]:
+            print(f"     missing: {obj['oid'][:12]}… ({format_bytes(obj['size'])})")
+    for error in report["errors"]:
+        print(f"   ⚠️  {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Re-hash local LFS object stores and report corrupt objects',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Check the shared LFS cache and drop corrupt objects so they are downloaded again
+  python integrity.py ~/.cache/hf_lfs --remove-corrupt
+
+  # Check the LFS store of a kept temp directory
+  python integrity.py /tmp/hf_transfer_abc/repo/.git/lfs/objects --json
+
+Source/target audits: python transfer.py --source ... --target ... --verify-only
+        """
+    )
+    parser.add_argument('stores', nargs='+', metavar='DIR',
+                        help='LFS store (a cache root or an lfs/objects directory)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Files hashed at once (default: one per CPU core)')
+    parser.add_argument('--remove-corrupt', action='store_true',
+                        help='Delete objects whose content does not match their OID')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+    args = parser.parse_args()
+
+    results = []
+    for store in args.stores:
+        store = os.path.abspath(os.path.expanduser(store))
+        objects_dir = os.path.join(store, "objects")
+        if not os.path.isdir(objects_dir):
+            objects_dir = store
+        if not os.path.isdir(objects_dir):
+            parser.error(f'{store} is not a directory')
+        results.append(audit_store(objects_dir, args.workers, args.remove_corrupt))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for result in results:
+            icon = "❌" if result["corrupt"] else "✅"
+            print(f"{icon} {result['store']}: {result['checked']} objects "
+                  f"({format_bytes(result['bytes'])}), {len(result['corrupt'])} corrupt")
+            for path in result["corrupt"]:
+                print(f"   {'removed' if result['removed'] else 'corrupt'}: {path}")
+    return 1 if any(result["corrupt"] for result in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,688 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Git LFS Batch API helpers
+
+Talks to the Git LFS Batch API of a remote directly (without git-lfs) and
+discovers LFS pointers in a local clone using plain git plumbing.
+"""
+
+import os
+import time
+import hashlib
+import queue
+import tempfile
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse, urlunparse, unquote
+
+import requests
+
+import rate_control
+
+LFS_MEDIA_TYPE = "application/vnd.git-lfs+json"
+LFS_POINTER_VERSION = "version https://git-lfs.github.com/spec/v1"
+LFS_POINTER_MAX_SIZE = 1024
+BATCH_SIZE = 100
+CHUNK_SIZE = 1024 * 1024
+DEFAULT_CONCURRENCY = 8
+OBJECT_RETRIES = 3
+
+
+class LFSError(Exception):
+    """Raised when an LFS Batch API request or object transfer fails."""
+
+
+class LFSObject:
+    """An LFS object identified by its sha256 OID and size in bytes."""
+
+    __slots__ = ("oid", "size")
+
+    def __init__(self, oid: str, size: int):
+        self.oid = oid
+        self.size = int(size)
+
+    def __eq__(self, other):
+        return isinstance(other, LFSObject) and (self.oid, self.size) == (other.oid, other.size)
+
+    def __hash__(self):
+        return hash((self.oid, self.size))
+
+    def __repr__(self):
+        return f"LFSObject(oid={self.oid[:12]}…, size={self.size})"
+
+    def to_json(self) -> dict:
+        return {"oid": self.oid, "size": self.size}
+
+
+class LFSPointer(LFSObject):
+    """An LFS object together with a path that references it."""
+
+    __slots__ = ("path",)
+
+    def __init__(self, oid: str, size: int, path: str):
+        super().__init__(oid, size)
+        self.path = path
+
+
+def parse_lfs_pointer(data: bytes):
+    """Return (oid, size) if data is an LFS pointer file, otherwise None."""
+    if len(data) > LFS_POINTER_MAX_SIZE:
+        return None
+    try:
+        text = data.decode("utf-8")
+    except UnicodeDecodeError:
+        return None
+    if not text.startswith(LFS_POINTER_VERSION):
+        return None
+
+    oid = size = None
+    for line in text.splitlines():
+        key, _, value = line.partition(" ")
+        if key == "oid" and value.startswith("sha256:"):
+            oid = value[len("sha256:"):].strip()
+        elif key == "size" and value.strip().isdigit():
+            size = int(value.strip())
+    if not oid or len(oid) != 64 or size is None:
+        return None
+    return oid, size
+
+
+def scan_lfs_pointers(repo_path: str, revs=("--all",)) -> list:
+    """List LFS pointers reachable from revs using git plumbing only.
+
+    Works in bare and non-bare repositories and does not require git-lfs.
+    """
+    rev_list = subprocess.run(
+        ["git", "rev-list", "--objects", *revs],
+        cwd=repo_path, check=True, capture_output=True, text=True
+    )
+    paths = {}
+    for line in rev_list.stdout.splitlines():
+        sha, _, path = line.partition(" ")
+        if path and sha not in paths:
+            paths[sha] = path
+    if not paths:
+        return []
+
+    check = subprocess.run(
+        ["git", "cat-file", "--batch-check=%(objectname) %(objecttype) %(objectsize)"],
+        cwd=repo_path, check=True, capture_output=True, text=True,
+        input="\n".join(paths) + "\n"
+    )
+    candidates = []
+    for line in check.stdout.splitlines():
+        parts = line.split()
+        if len(parts) == 3 and parts[1] == "blob" and int(parts[2]) <= LFS_POINTER_MAX_SIZE:
+            candidates.append(parts[0])
+    if not candidates:
+        return []
+
+    contents = subprocess.run(
+        ["git", "cat-file", "--batch"],
+        cwd=repo_path, check=True, capture_output=True,
+        input=("\n".join(candidates) + "\n").encode()
+    ).stdout
+
+    pointers = []
+    offset = 0
+    for sha in candidates:
+        header_end = contents.index(b"\n", offset)
+        size = int(contents[offset:header_end].split()[2])
+        data = contents[header_end + 1:header_end + 1 + size]
+        offset = header_end + 1 + size + 1
+        parsed = parse_lfs_pointer(data)
+        if parsed:
+            pointers.append(LFSPointer(parsed[0], parsed[1], paths[sha]))
+    return pointers
+
+
+def unique_objects(pointers) -> list:
+    """Deduplicate pointers into a list of LFSObject, preserving order."""
+    seen = {}
+    for pointer in pointers:
+        if pointer.oid not in seen:
+            seen[pointer.oid] = LFSObject(pointer.oid, pointer.size)
+    return list(seen.values())
+
+
+def format_bytes(num: float) -> str:
+    """Format a byte count for humans (e.g. 1.5 GB)."""
+    for unit in ("B", "KB", "MB", "GB", "TB"):
+        if abs(num) < 1024 or unit == "TB":
+            return f"{num:.1f} {unit}" if unit != "B" else f"{int(num)} B"
+        num /= 1024
+    return f"{num:.1f} TB"
+
+
+def split_credentials(url: str):
+    """Split user:token credentials out of a URL.
+
+    Returns (url_without_credentials, auth) where auth is a requests auth
+    tuple or None.
+    """
+    parsed = urlparse(url)
+    if "@" not in parsed.netloc:
+        return url, None
+    userinfo, _, host = parsed.netloc.rpartition("@")
+    username, _, password = userinfo.partition(":")
+    clean = urlunparse((parsed.scheme, host, parsed.path, parsed.params,
+                        parsed.query, parsed.fragment))
+    return clean, (unquote(username), unquote(password))
+
+
+def url_host(url: str) -> str:
+    """Lower-cased host of a URL, without credentials or port."""
+    return (urlparse(url).hostname or "").lower()
+
+
+def parse_concurrency(spec) -> dict:
+    """Parse ``N`` or ``host=N[,host=N]`` into {host: N} (``*`` is the default)."""
+    if spec is None or spec == "":
+        return {"*": DEFAULT_CONCURRENCY}
+    if isinstance(spec, int) or str(spec).strip().isdigit():
+        return {"*": max(1, int(spec))}
+    config = {"*": DEFAULT_CONCURRENCY}
+    for item in str(spec).split(","):
+        host, _, value = item.strip().partition("=")
+        if not host:
+            continue
+        try:
+            config[host.strip().lower()] = max(1, int(value))
+        except ValueError:
+            raise LFSError(f"Invalid LFS concurrency entry '{item}'")
+    return config
+
+
+def concurrency_for(config: dict, url: str) -> int:
+    """Concurrent object transfers allowed for the host of url."""
+    return config.get(url_host(url), config.get("*", DEFAULT_CONCURRENCY))
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def pooled_session(url: str, pool_size: int = DEFAULT_CONCURRENCY) -> requests.Session:
+    """Shared keep-alive session for the host of url.
+
+    Each host gets one session whose connection pools hold pool_size
+    connections, so concurrent transfers reuse connections instead of
+    opening (and TLS-handshaking) a new one per object. Requests pass
+    through the host's rate limiter.
+    """
+    key = (url_host(url), pool_size)
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = rate_control.mount(requests.Session(), pool_connections=8,
+                                         pool_maxsize=pool_size)
+            _sessions[key] = session
+        return session
+
+
+def lfs_endpoint(repo_url: str) -> str:
+    """Derive the LFS server endpoint from a repository URL."""
+    url = repo_url.rstrip("/")
+    if not url.endswith(".git"):
+        url = f"{url}.git"
+    return f"{url}/info/lfs"
+
+
+class LFSBatchClient:
+    """Client for the LFS Batch API of a single repository."""
+
+    def __init__(self, repo_url: str, session: requests.Session = None, ranged=None,
+                 concurrency: int = DEFAULT_CONCURRENCY):
+        clean_url, self.auth = split_credentials(repo_url)
+        self.endpoint = lfs_endpoint(clean_url)
+        self.concurrency = max(1, concurrency)
+        self.session = session or pooled_session(clean_url, self.concurrency)
+        # Optional RangedDownloader used for objects above its size threshold
+        self.ranged = ranged
+
+    def batch(self, operation: str, objects: list) -> list:
+        """Run a batch request, splitting it into BATCH_SIZE sized calls.
+
+        Returns the object entries of all responses.
+        """
+        results = []
+        for start in range(0, len(objects), BATCH_SIZE):
+            chunk = objects[start:start + BATCH_SIZE]
+            payload = {
+                "operation": operation,
+                "transfers": ["basic"],
+                "objects": [obj.to_json() for obj in chunk],
+                "hash_algo": "sha256",
+            }
+            response = self.session.post(
+                f"{self.endpoint}/objects/batch",
+                json=payload,
+                auth=self.auth,
+                headers={"Accept": LFS_MEDIA_TYPE, "Content-Type": LFS_MEDIA_TYPE},
+                timeout=60,
+            )
+            if response.status_code != 200:
+                raise LFSError(
+                    f"LFS batch {operation} failed at {self.endpoint}: "
+                    f"{response.status_code} {response.text[:200]}"
+                )
+            results.extend(response.json().get("objects", []))
+        return results
+
+    def missing_objects(self, objects: list) -> list:
+        """Return the objects this server does not have yet.
+
+        Uses an upload batch request: per the LFS spec, objects the server
+        already stores come back without an upload action.
+        """
+        entries = self.batch("upload", objects)
+        needed = {entry["oid"] for entry in entries
+                  if entry.get("error") or entry.get("actions", {}).get("upload")}
+        return [obj for obj in objects if obj.oid in needed]
+
+    def open_download(self, entry: dict) -> requests.Response:
+        """Open a streaming download for a batch response entry."""
+        action = self._action(entry, "download")
+        response = self.session.get(
+            action["href"], headers=action.get("header", {}), stream=True, timeout=60
+        )
+        if response.status_code != 200:
+            response.close()
+            raise LFSError(
+                f"Download of {entry['oid']} failed: {response.status_code}"
+            )
+        return response
+
+    def download_to(self, entry: dict, dest: str):
+        """Download an object to dest, verifying size and sha256 before the final rename."""
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        if self.ranged and self.ranged.should_use(entry["size"]):
+            action = self._action(entry, "download")
+            headers = action.get("header", {})
+            if self.ranged.supports_ranges(action["href"], headers):
+                self.ranged.download(action["href"], headers, dest, entry["size"],
+                                     entry["oid"], fallback_url=self.endpoint)
+                return
+        with self._slot(entry, "download"):
+            self._stream_to(entry, dest)
+
+    def _slot(self, entry: dict, name: str):
+        """AIMD-limited transfer slot on the host of the action URL (often a CDN)."""
+        href = entry.get("actions", {}).get(name, {}).get("href") or self.endpoint
+        return rate_control.limiter_for(href, self.concurrency).slot()
+
+    def _stream_to(self, entry: dict, dest: str):
+        response = self.open_download(entry)
+        fd, tmp_path = tempfile.mkstemp(prefix=".download-", dir=os.path.dirname(dest))
+        digest = hashlib.sha256()
+        received = 0
+        try:
+            with os.fdopen(fd, "wb") as handle, response:
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    digest.update(chunk)
+                    received += len(chunk)
+                    handle.write(chunk)
+            if received != entry["size"] or digest.hexdigest() != entry["oid"]:
+                raise LFSError(
+                    f"Integrity check failed for {entry['oid']}: "
+                    f"got {received} bytes with sha256 {digest.hexdigest()}"
+                )
+            os.replace(tmp_path, dest)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def upload(self, entry: dict, body):
+        """Upload body for a batch response entry and run the verify action."""
+        action = self._action(entry, "upload")
+        headers = {"Content-Type": "application/octet-stream"}
+        headers.update(action.get("header", {}))
+        with self._slot(entry, "upload"):
+            response = self.session.put(action["href"], data=body, headers=headers, timeout=300)
+        if response.status_code not in {200, 201}:
+            raise LFSError(
+                f"Upload of {entry['oid']} failed: {response.status_code} {response.text[:200]}"
+            )
+
+    def verify(self, entry: dict):
+        """Call the verify action of an uploaded object, if the server requested one."""
+        action = entry.get("actions", {}).get("verify")
+        if not action:
+            return
+        headers = {"Accept": LFS_MEDIA_TYPE, "Content-Type": LFS_MEDIA_TYPE}
+        headers.update(action.get("header", {}))
+        response = self.session.post(
+            action["href"],
+            json={"oid": entry["oid"], "size": entry["size"]},
+            headers=headers,
+            timeout=60,
+        )
+        if response.status_code != 200:
+            raise LFSError(f"Verify of {entry['oid']} failed: {response.status_code}")
+
+    def download_many(self, objects: list, path_for, retries: int = OBJECT_RETRIES,
+                      on_complete=None) -> int:
+        """Download objects concurrently to path_for(oid). Returns the bytes downloaded.
+
+        Failed objects are retried individually with a fresh download action;
+        an LFSError listing the failures is raised once all objects were tried.
+        on_complete(entry) is called for every verified object.
+        """
+        def transfer(entry):
+            self.download_to(entry, path_for(entry["oid"]))
+            return entry["size"]
+
+        return sum(self._run_concurrently("download", objects, transfer, retries, on_complete))
+
+    def upload_many(self, objects: list, path_for, retries: int = OBJECT_RETRIES,
+                    on_complete=None) -> dict:
+        """Upload local objects at path_for(oid) concurrently. Returns transfer statistics.
+
+        Objects the server already has (no upload action) are skipped.
+        on_complete(entry) is called for every object the server now stores.
+        """
+        def transfer(entry):
+            if not entry.get("error") and not entry.get("actions", {}).get("upload"):
+                return None
+            with open(path_for(entry["oid"]), "rb") as handle:
+                body = HashingReader(handle, entry["size"])
+                self.upload(entry, body)
+            # Hashed while sending: a corrupt local copy is never confirmed
+            body.check(entry["oid"], entry["size"])
+            self.verify(entry)
+            return entry["size"]
+
+        results = self._run_concurrently("upload", objects, transfer, retries, on_complete)
+        uploaded = [size for size in results if size is not None]
+        return {"total": len(objects), "skipped": len(objects) - len(uploaded),
+                "uploaded": len(uploaded), "bytes": sum(uploaded)}
+
+    def _run_concurrently(self, operation: str, objects: list, transfer, retries: int,
+                          on_complete=None) -> list:
+        """Run transfer(entry) for every object on a pool of self.concurrency threads."""
+        if not objects:
+            return []
+        entries = self.batch(operation, objects)
+        lock = threading.Lock()
+        done = [0]
+        failures = []
+
+        def run(entry):
+            for attempt in range(1, retries + 1):
+                try:
+                    if attempt > 1:
+                        # Actions may carry expiring URLs; ask for a fresh one
+                        entry = self.batch(operation, [LFSObject(entry["oid"], entry["size"])])[0]
+                    result = transfer(entry)
+                    break
+                except (LFSError, requests.RequestException, OSError) as exc:
+                    if attempt == retries:
+                        with lock:
+                            failures.append(f"{entry['oid'][:12]}…: {exc}")
+                        return None
+                    time.sleep(rate_control.backoff_delay(attempt - 1, cap=30))
+            with lock:
+                done[0] += 1
+                if on_complete:
+                    on_complete(entry)
+                if result is not None:
+                    arrow = "⬇️ " if operation == "download" else "⬆️ "
+                    print(f"   [{done[0]}/{len(entries)}] {arrow} {entry['oid'][:12]}… "
+                          f"({format_bytes(entry['size'])})")
+            return result
+
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(entries))) as pool:
+            results = list(pool.map(run, entries))
+        if failures:
+            raise LFSError(f"{len(failures)} LFS object {operation}s failed after {retries} attempts; "
+                           f"first: {failures[0]}")
+        return results
+
+    @staticmethod
+    def _action(entry: dict, name: str) -> dict:
+        if entry.get("error"):
+            error = entry["error"]
+            raise LFSError(
+                f"Object {entry['oid']}: {error.get('code')} {error.get('message')}"
+            )
+        action = entry.get("actions", {}).get(name)
+        if not action:
+            raise LFSError(f"Object {entry['oid']} has no '{name}' action")
+        return action
+
+
+class HashingReader:
+    """File-like request body that computes the sha256 of the bytes it hands out.
+
+    Wraps an open file so an upload is checked against its OID without
+    reading the file a second time.
+    """
+
+    def __init__(self, handle, size: int):
+        self.handle = handle
+        self.size = size
+        self.digest = hashlib.sha256()
+        self.bytes_read = 0
+
+    def __len__(self):
+        return self.size
+
+    def read(self, amt: int = -1) -> bytes:
+        data = self.handle.read(amt)
+        self.digest.update(data)
+        self.bytes_read += len(data)
+        return data
+
+    def hexdigest(self) -> str:
+        return self.digest.hexdigest()
+
+    def check(self, oid: str, size: int):
+        """Raise LFSError unless exactly size bytes hashing to oid were read."""
+        if self.bytes_read != size or self.hexdigest() != oid:
+            raise LFSError(
+                f"Integrity check failed for {oid}: sent {self.bytes_read} bytes "
+                f"with sha256 {self.hexdigest()}"
+            )
+
+
+class _RelayBody:
+    """File-like request body fed by a bounded queue of chunks.
+
+    Exposes __len__ so requests sends a Content-Length header instead of
+    chunked encoding (presigned upload URLs usually require it).
+    """
+
+    _DONE = object()
+
+    def __init__(self, size: int, max_chunks: int):
+        self.size = size
+        self.chunks = queue.Queue(maxsize=max_chunks)
+        self.cancelled = threading.Event()
+        self._pending = b""
+        self._finished = False
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        while True:
+            data = self.read(CHUNK_SIZE)
+            if not data:
+                return
+            yield data
+
+    def put(self, item):
+        while not self.cancelled.is_set():
+            try:
+                self.chunks.put(item, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def finish(self, error: Exception = None):
+        self.put(error or self._DONE)
+
+    def _next_chunk(self):
+        item = self.chunks.get()
+        if item is self._DONE:
+            self._finished = True
+        elif isinstance(item, Exception):
+            self._finished = True
+            raise item
+        else:
+            self._pending = memoryview(item)
+
+    def read(self, amt: int = -1) -> bytes:
+        if amt is None or amt < 0:
+            parts = [bytes(self._pending)]
+            self._pending = b""
+            while not self._finished:
+                self._next_chunk()
+                parts.append(bytes(self._pending))
+                self._pending = b""
+            return b"".join(parts)
+
+        # Short reads are fine for file-like bodies; avoid re-copying chunks.
+        while not self._pending and not self._finished:
+            self._next_chunk()
+        data = bytes(self._pending[:amt])
+        self._pending = self._pending[amt:]
+        return data
+
+
+class LFSRelay:
+    """Pipe LFS objects from a source remote to a target remote without touching disk.
+
+    Each object's download stream feeds the target upload request through a
+    bounded in-memory buffer, so memory use is capped at buffer_bytes per
+    object in flight and upload starts as soon as download starts. Up to
+    concurrency objects are relayed at once (default: the smaller of the two
+    clients' per-host concurrency).
+    """
+
+    def __init__(self, source: LFSBatchClient, target: LFSBatchClient,
+                 buffer_bytes: int = 64 * 1024 * 1024, concurrency: int = None):
+        self.source = source
+        self.target = target
+        self.max_chunks = max(1, buffer_bytes // CHUNK_SIZE)
+        self.concurrency = max(1, concurrency or min(source.concurrency, target.concurrency))
+
+    def pending_uploads(self, objects: list) -> list:
+        """Return the target batch entries that still need an upload."""
+        entries = self.target.batch("upload", objects)
+        return [entry for entry in entries if entry.get("actions", {}).get("upload")
+                or entry.get("error")]
+
+    def relay(self, objects: list, on_complete=None, retries: int = OBJECT_RETRIES) -> dict:
+        """Relay all objects missing on the target. Returns transfer statistics.
+
+        The first attempt of each object uses the entries of the initial
+        batch requests; every retry requests fresh actions, so expired
+        presigned URLs are replaced. on_complete(entry) is called after each
+        object was relayed.
+        """
+        pending = self.pending_uploads(objects)
+        stats = {"total": len(objects), "skipped": len(objects) - len(pending),
+                 "relayed": 0, "bytes": 0}
+        if not pending:
+            return stats
+        downloads = {entry["oid"]: entry for entry in self.source.batch(
+            "download", [LFSObject(entry["oid"], entry["size"]) for entry in pending])}
+        lock = threading.Lock()
+        started = [0]
+
+        def transfer(entry):
+            obj = LFSObject(entry["oid"], entry["size"])
+            with lock:
+                started[0] += 1
+                print(f"   [{started[0]}/{len(pending)}] {obj.oid[:12]}… ({format_bytes(obj.size)})")
+            relayed = self._relay_with_retries(obj, retries, entry, downloads.get(obj.oid))
+            with lock:
+                if relayed:
+                    stats["relayed"] += 1
+                    stats["bytes"] += obj.size
+                else:
+                    stats["skipped"] += 1
+                if on_complete:
+                    on_complete(entry)
+
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(pending))) as pool:
+            for future in [pool.submit(transfer, entry) for entry in pending]:
+                future.result()
+        return stats
+
+    def _relay_with_retries(self, obj: LFSObject, retries: int,
+                            upload: dict = None, download: dict = None) -> bool:
+        """Relay one object, with fresh actions on every retry. False if the target already had it."""
+        for attempt in range(1, retries + 1):
+            try:
+                if upload is None:
+                    upload = self.target.batch("upload", [obj])[0]
+                if not (upload.get("actions", {}).get("upload") or upload.get("error")):
+                    return False
+                if download is None:
+                    download = self.source.batch("download", [obj])[0]
+                self.relay_object(download, upload)
+                return True
+            except (LFSError, requests.RequestException, OSError) as exc:
+                if attempt == retries:
+                    raise LFSError(f"Relay of {obj.oid} failed after {retries} attempts: {exc}") from exc
+                print(f"   ⚠️  {obj.oid[:12]}…: {exc}; retrying")
+                upload = download = None
+                time.sleep(rate_control.backoff_delay(attempt - 1, cap=30))
+
+    def relay_object(self, download: dict, upload: dict):
+        """Stream a single object from source to target, verifying its sha256.
+
+        The last chunk is held back until size and sha256 match, so a
+        truncated or corrupt stream aborts the upload before the target
+        received a complete body.
+        """
+        response = self.source.open_download(download)
+        body = _RelayBody(download["size"], self.max_chunks)
+        digest = hashlib.sha256()
+        received = [0]
+
+        def produce():
+            try:
+                held = None
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    if not chunk:
+                        continue
+                    digest.update(chunk)
+                    received[0] += len(chunk)
+                    if held is not None and not body.put(held):
+                        return
+                    held = chunk
+                if received[0] != download["size"] or digest.hexdigest() != download["oid"]:
+                    body.finish(LFSError(
+                        f"Integrity check failed for {download['oid']}: "
+                        f"got {received[0]} bytes with sha256 {digest.hexdigest()}"
+                    ))
+                    return
+                if held is not None and not body.put(held):
+                    return
+                body.finish()
+            except Exception as exc:  # propagate into the upload request
+                body.finish(LFSError(f"Download of {download['oid']} interrupted: {exc}"))
+            finally:
+                response.close()
+
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+        try:
+            self.target.upload(upload, body)
+        finally:
+            body.cancelled.set()
+            producer.join()
+
+        if received[0] != download["size"] or digest.hexdigest() != download["oid"]:
+            raise LFSError(
+                f"Integrity check failed for {download['oid']}: "
+                f"got {received[0]} bytes with sha256 {digest.hexdigest()}"
+            )
+        self.target.verify(upload)
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Persistent LFS object cache
+
+Content-addressed store of LFS objects keyed by sha256 OID, shared between
+transfers so re-runs and related models only download the bytes that changed.
+Entries are added atomically (write to a temp file, then rename) and evicted
+least-recently-used first once the cache exceeds its byte budget. Readers
+that use an object in place hold a shared lease on it, which eviction skips.
+"""
+
+import os
+import shutil
+import tempfile
+
+from file_lock import FileLock
+
+
+def link_or_copy(src: str, dest: str):
+    """Hardlink src to dest, copying when a hardlink is not possible."""
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    tmp_fd, tmp_path = tempfile.mkstemp(prefix=".incoming-", dir=os.path.dirname(dest))
+    os.close(tmp_fd)
+    os.remove(tmp_path)
+    try:
+        os.link(src, tmp_path)
+    except OSError:
+        shutil.copyfile(src, tmp_path)
+    os.replace(tmp_path, dest)
+
+
+class LFSObjectCache:
+    """Size-bounded, LRU-evicted cache of LFS objects on local disk."""
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = os.path.abspath(os.path.expanduser(root))
+        self.max_bytes = max_bytes
+        self.objects_dir = os.path.join(self.root, "objects")
+        self.locks_dir = os.path.join(self.root, "locks")
+        os.makedirs(self.objects_dir, exist_ok=True)
+
+    def path_for(self, oid: str) -> str:
+        """Path of an object, using the same fan-out layout as git-lfs."""
+        return os.path.join(self.objects_dir, oid[0:2], oid[2:4], oid)
+
+    def has(self, oid: str, size: int = None) -> bool:
+        try:
+            stat = os.stat(self.path_for(oid))
+        except FileNotFoundError:
+            return False
+        return size is None or stat.st_size == size
+
+    def link_into(self, oid: str, size: int, dest: str) -> bool:
+        """Materialize a cached object at dest. Returns False on a cache miss."""
+        if not self.has(oid, size):
+            return False
+        path = self.path_for(oid)
+        try:
+            link_or_copy(path, dest)
+        except FileNotFoundError:
+            # Evicted by a concurrent transfer between the check and the link
+            return False
+        self._touch(path)
+        return True
+
+    def lease(self, oid: str) -> FileLock:
+        """Shared lock that keeps an object from being evicted while it is read in place.
+
+        Check has() after acquiring it: the object may have been evicted before.
+        """
+        return FileLock(os.path.join(self.locks_dir, f"{oid}.lock"), shared=True)
+
+    def store(self, src: str, oid: str):
+        """Add a verified object file to the cache (no-op if already present)."""
+        path = self.path_for(oid)
+        if os.path.exists(path):
+            self._touch(path)
+            return
+        link_or_copy(src, path)
+
+    def usage(self) -> int:
+        """Total bytes currently stored in the cache."""
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self) -> int:
+        """Evict least-recently-used objects until under budget. Returns bytes freed."""
+        lock = FileLock(os.path.join(self.root, ".evict.lock"))
+        if not lock.acquire(blocking=False):
+            return 0  # another transfer is already evicting
+        try:
+            entries = sorted(self._entries(), key=lambda entry: entry[2])
+            total = sum(size for _, size, _ in entries)
+            freed = 0
+            for path, size, _ in entries:
+                if total <= self.max_bytes:
+                    break
+                lease = FileLock(os.path.join(self.locks_dir, f"{os.path.basename(path)}.lock"))
+                if not lease.acquire(blocking=False):
+                    continue  # in use by a transfer
+                try:
+                    os.remove(path)
+                    os.remove(lease.path)
+                except FileNotFoundError:
+                    continue
+                finally:
+                    lease.release()
+                total -= size
+                freed += size
+            return freed
+        finally:
+            lock.release()
+
+    def _entries(self):
+        for dirpath, _, filenames in os.walk(self.objects_dir):
+            for name in filenames:
+                if name.startswith(".incoming-"):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    @staticmethod
+    def _touch(path: str):
+        try:
+            os.utime(path)
+        except OSError:
+            pass
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pipelined LFS download/upload
+
+Producers download and verify objects into a staging directory while
+consumers upload finished objects to the target and delete them once the
+target confirmed them. Each side runs as many workers as its client's
+concurrency, and every object is retried with fresh actions on errors. A disk budget bounds how many bytes may be staged at
+once, so peak disk stays near the budget and total time approaches
+max(download, upload) instead of their sum. With an object cache, staged
+files are hardlinked into it; the cache is trimmed after every upload and
+what it still holds from this run counts against the budget. Cache hits are
+uploaded in place under a lease, so eviction cannot remove them mid-upload.
+"""
+
+import os
+import time
+import queue
+import threading
+
+import requests
+
+import rate_control
+from lfs_api import OBJECT_RETRIES, HashingReader, LFSBatchClient, LFSError, LFSObject, format_bytes
+
+
+class LFSPipeline:
+    """Producer/consumer LFS transfer with a bounded on-disk window."""
+
+    _DONE = object()
+
+    def __init__(self, source: LFSBatchClient, target: LFSBatchClient, staging_dir: str,
+                 max_disk_bytes: int, cache=None, retries: int = OBJECT_RETRIES):
+        self.source = source
+        self.target = target
+        self.staging_dir = staging_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.cache = cache
+        self.retries = retries
+
+        self._window = threading.Condition()
+        self._staged_bytes = 0
+        # Objects of this run still held by the cache after their upload
+        self._cached = {}
+        self._cached_bytes = 0
+        self._peak_bytes = 0
+        self._pending = queue.Queue()
+        self._ready = queue.Queue()
+        self._stop = threading.Event()
+        self._errors = []
+        self._progress = threading.Lock()
+        self._uploaded = 0
+        self._on_complete = None
+
+    def run(self, objects: list, on_complete=None) -> dict:
+        """Transfer objects missing on the target. Returns transfer statistics.
+
+        on_complete(obj) is called after the target confirmed an object.
+        """
+        self._on_complete = on_complete
+        pending = self.target.missing_objects(objects)
+        stats = {"total": len(objects), "skipped": len(objects) - len(pending),
+                 "transferred": 0, "bytes": 0}
+        if not pending:
+            return stats
+
+        os.makedirs(self.staging_dir, exist_ok=True)
+        for obj in pending:
+            self._pending.put(obj)
+        producers = [threading.Thread(target=self._produce, daemon=True)
+                     for _ in range(min(max(1, self.source.concurrency), len(pending)))]
+        consumers = [threading.Thread(target=self._consume, args=(len(pending), stats), daemon=True)
+                     for _ in range(min(max(1, self.target.concurrency), len(pending)))]
+        for worker in producers + consumers:
+            worker.start()
+        for worker in producers:
+            worker.join()
+        for _ in consumers:
+            self._ready.put(self._DONE)
+        for worker in consumers:
+            worker.join()
+
+        if self._errors:
+            raise self._errors[0]
+        stats["peak_staged_bytes"] = self._peak_bytes
+        return stats
+
+    def _staging_path(self, oid: str) -> str:
+        return os.path.join(self.staging_dir, oid)
+
+    def _reserve(self, size: int) -> bool:
+        """Block until size bytes fit in the window (it always fits when nothing is staged)."""
+        with self._window:
+            while (self._staged_bytes
+                   and self._staged_bytes + self._cached_bytes + size > self.max_disk_bytes
+                   and not self._stop.is_set()):
+                self._window.wait(timeout=1)
+            if self._stop.is_set():
+                return False
+            self._staged_bytes += size
+            self._peak_bytes = max(self._peak_bytes, self._staged_bytes + self._cached_bytes)
+            return True
+
+    def _release(self, obj: LFSObject, size: int):
+        """Free a staged object's reservation, keeping what the cache still holds of this run."""
+        if self.cache:
+            kept = self.cache.has(obj.oid, obj.size)
+            self.cache.evict()
+            with self._window:
+                if kept:
+                    self._cached[obj.oid] = obj.size
+                self._cached = {oid: size for oid, size in self._cached.items()
+                                if self.cache.has(oid, size)}
+        with self._window:
+            self._staged_bytes -= size
+            self._cached_bytes = sum(self._cached.values())
+            self._window.notify_all()
+
+    def _fail(self, error: Exception):
+        self._errors.append(error)
+        self._stop.set()
+        with self._window:
+            self._window.notify_all()
+
+    def _with_retries(self, operation: str, obj: LFSObject, attempt_once):
+        """Run attempt_once() (which requests fresh actions) with backoff between attempts."""
+        for attempt in range(1, self.retries + 1):
+            try:
+                return attempt_once()
+            except (LFSError, requests.RequestException, OSError) as exc:
+                if attempt == self.retries or self._stop.is_set():
+                    raise LFSError(f"{operation.capitalize()} of {obj.oid} failed after "
+                                   f"{attempt} attempt(s): {exc}") from exc
+                print(f"   ⚠️  {operation} of {obj.oid[:12]}…: {exc}; retrying")
+                time.sleep(rate_control.backoff_delay(attempt - 1, cap=30))
+
+    def _cache_hit(self, obj: LFSObject):
+        """A held lease on obj if the cache has it, else None."""
+        if not self.cache:
+            return None
+        lease = self.cache.lease(obj.oid)
+        lease.acquire()
+        if self.cache.has(obj.oid, obj.size):
+            return lease
+        lease.release()
+        return None
+
+    def _produce(self):
+        while not self._stop.is_set():
+            try:
+                obj = self._pending.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                lease = self._cache_hit(obj)
+                if lease:
+                    # Already on local disk; upload straight from the cache
+                    self._ready.put((obj, self.cache.path_for(obj.oid), 0, lease))
+                    continue
+                if not self._reserve(obj.size):
+                    return
+                path = self._staging_path(obj.oid)
+                try:
+                    # Ask for the download action just in time so presigned URLs stay fresh
+                    self._with_retries("download", obj, lambda: self.source.download_to(
+                        self.source.batch("download", [obj])[0], path))
+                except BaseException:
+                    if os.path.exists(path):
+                        os.remove(path)
+                    self._release(obj, obj.size)
+                    raise
+                if self.cache:
+                    self.cache.store(path, obj.oid)
+                self._ready.put((obj, path, obj.size, None))
+            except Exception as exc:
+                self._fail(exc)
+
+    def _upload(self, obj: LFSObject, path: str):
+        entry = self.target.batch("upload", [LFSObject(obj.oid, obj.size)])[0]
+        if entry.get("actions", {}).get("upload") or entry.get("error"):
+            with open(path, "rb") as handle:
+                body = HashingReader(handle, obj.size)
+                self.target.upload(entry, body)
+            body.check(obj.oid, obj.size)
+            self.target.verify(entry)
+
+    def _consume(self, count: int, stats: dict):
+        while True:
+            item = self._ready.get()
+            if item is self._DONE:
+                return
+            obj, path, reserved, lease = item
+            try:
+                if not self._stop.is_set():
+                    self._with_retries("upload", obj, lambda: self._upload(obj, path))
+                    with self._progress:
+                        self._uploaded += 1
+                        stats["transferred"] += 1
+                        stats["bytes"] += obj.size
+                        if self._on_complete:
+                            self._on_complete(obj)
+                        print(f"   [{self._uploaded}/{count}] ⬆️  {obj.oid[:12]}… "
+                              f"({format_bytes(obj.size)}) — staged {format_bytes(self._staged_bytes)}"
+                              + (f", cached {format_bytes(self._cached_bytes)}"
+                                 if self._cached_bytes else ""))
+            except Exception as exc:
+                self._fail(exc)
+            finally:
+                if lease:
+                    lease.release()
+                if reserved:
+                    if os.path.exists(path):
+                        os.remove(path)
+                    self._release(obj, reserved)
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Persistent bare-mirror cache of source repositories
+
+Keeps one bare mirror per source URL on local disk. A transfer refreshes the
+mirror with an incremental ``git fetch`` under an exclusive per-entry lock
+and then clones from it locally, which hardlinks the object files instead of
+downloading them again. Borrowers hold a shared lease from before the refresh
+until they are done with the clone, so eviction (by age, then
+least-recently-used until under the byte budget) never removes a mirror that
+is being read. Credentials are passed on the
+command line only and never stored in the cache.
+"""
+
+import os
+import re
+import time
+import shutil
+import hashlib
+import subprocess
+from contextlib import contextmanager
+
+from file_lock import FileLock
+from lfs_api import split_credentials
+
+LAST_USED_FILE = "last_used"
+# Incremental fetches add one pack each; consolidate once there are this many
+MAX_PACKS = 20
+
+
+class MirrorCacheError(Exception):
+    """Raised when a cache entry cannot be created or refreshed."""
+
+
+class MirrorCache:
+    """Size- and age-bounded cache of bare source mirrors."""
+
+    def __init__(self, root: str, max_bytes: int, max_age_days: float = None):
+        self.root = os.path.abspath(os.path.expanduser(root))
+        self.max_bytes = max_bytes
+        self.max_age = max_age_days * 86400 if max_age_days else None
+        self.mirrors_dir = os.path.join(self.root, "mirrors")
+        self.locks_dir = os.path.join(self.root, "locks")
+        os.makedirs(self.mirrors_dir, exist_ok=True)
+
+    def key_for(self, source_url: str) -> str:
+        """Directory name of a source: readable repo name plus a hash of the clean URL."""
+        clean = split_credentials(source_url)[0].rstrip("/")
+        if clean.endswith(".git"):
+            clean = clean[:-4]
+        name = re.sub(r"[^A-Za-z0-9_.-]+", "_", "/".join(clean.split("/")[-2:])).strip("_")
+        return f"{name}-{hashlib.sha256(clean.encode()).hexdigest()[:12]}"
+
+    def path_for(self, source_url: str) -> str:
+        return os.path.join(self.mirrors_dir, self.key_for(source_url) + ".git")
+
+    def _lock(self, key: str, kind: str, shared: bool = False) -> FileLock:
+        return FileLock(os.path.join(self.locks_dir, f"{key}.{kind}.lock"), shared=shared)
+
+    def update(self, source_url: str, fetch_url: str, run_command=None, env: dict = None) -> str:
+        """Create or refresh the mirror of source_url by fetching from fetch_url.
+
+        source_url is the cache key (the canonical repository URL); fetch_url
+        is what is actually fetched (it may carry credentials or point to an
+        accelerating proxy). run_command(cmd, cwd=, env=) runs git and must
+        raise subprocess.CalledProcessError on failure. Returns the mirror path.
+        """
+        run = run_command or _run
+        key = self.key_for(source_url)
+        path = self.path_for(source_url)
+        with self._lock(key, "update"):
+            created = not os.path.exists(os.path.join(path, "HEAD"))
+            if created:
+                print(f"🗄️  Creating mirror cache entry {path}")
+                subprocess.run(["git", "init", "--bare", "--quiet", path], check=True, capture_output=True)
+                for name, value in (("remote.origin.url", split_credentials(source_url)[0]),
+                                    ("remote.origin.fetch", "+refs/*:refs/*"),
+                                    ("remote.origin.mirror", "true"),
+                                    ("gc.auto", "0")):
+                    _git(path, "config", name, value)
+            else:
+                print(f"🗄️  Refreshing mirror cache entry {path}")
+            try:
+                head = _remote_head(fetch_url, env)
+                run(["git", "fetch", "--prune", "--force", fetch_url, "+refs/*:refs/*"], cwd=path, env=env)
+            except subprocess.CalledProcessError as e:
+                if created:
+                    shutil.rmtree(path, ignore_errors=True)
+                raise MirrorCacheError(f"Could not fetch {split_credentials(source_url)[0]} "
+                                       f"into the mirror cache") from e
+            if head:
+                _git(path, "symbolic-ref", "HEAD", head)
+            self._touch(path)
+        return path
+
+    @contextmanager
+    def borrow(self, source_url: str, fetch_url: str, run_command=None, env: dict = None):
+        """Lease the entry of source_url, refresh it with update() and yield its path.
+
+        The lease is taken before the refresh and held until the block exits,
+        so another transfer's eviction cannot remove the entry in between.
+        Afterwards an entry with many packs is consolidated.
+        """
+        path = self.path_for(source_url)
+        with self.lease(path):
+            yield self.update(source_url, fetch_url, run_command, env)
+        self._maybe_repack(self.key_for(source_url), path)
+
+    def _maybe_repack(self, key: str, path: str):
+        """Repack an entry with many packs, unless a transfer is using it."""
+        pack_dir = os.path.join(path, "objects", "pack")
+        packs = [name for name in os.listdir(pack_dir) if name.endswith(".pack")] \
+            if os.path.isdir(pack_dir) else []
+        if len(packs) < MAX_PACKS:
+            return
+        update, use = self._lock(key, "update"), self._lock(key, "use")
+        if not update.acquire(blocking=False):
+            return
+        try:
+            if not use.acquire(blocking=False):
+                return
+            try:
+                print(f"🗜️  Repacking mirror cache entry ({len(packs)} packs)")
+                _git(path, "repack", "-a", "-d", "-q")
+            finally:
+                use.release()
+        finally:
+            update.release()
+
+    @contextmanager
+    def lease(self, path: str):
+        """Hold a shared lease on an entry so it is not evicted or repacked while in use.
+
+        The entry does not need to exist yet, so a lease can cover its creation.
+        """
+        lock = self._lock(os.path.basename(path)[:-4], "use", shared=True)
+        with lock:
+            if os.path.isdir(path):
+                self._touch(path)
+            yield path
+
+    def clone_args(self, path: str, depth: int = 0) -> list:
+        """Source argument(s) for ``git clone`` that borrow objects from an entry.
+
+        A local clone hardlinks the object files (or copies them across file
+        systems). Shallow clones need the pack protocol, so they use file://,
+        and --no-single-branch so they still get every branch and tag.
+        """
+        if depth:
+            return ["--depth", str(depth), "--no-single-branch", "file://" + path]
+        return ["--local", path]
+
+    def usage(self) -> int:
+        """Total bytes currently stored in the cache."""
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self, keep: str = None) -> int:
+        """Remove entries past the age limit, then LRU entries until under budget.
+
+        Entries being updated or leased are skipped. Returns bytes freed.
+        """
+        lock = FileLock(os.path.join(self.root, ".evict.lock"))
+        if not lock.acquire(blocking=False):
+            return 0  # another transfer is already evicting
+        try:
+            entries = sorted(self._entries(), key=lambda entry: entry[2])
+            total = sum(size for _, size, _ in entries)
+            now = time.time()
+            freed = 0
+            for path, size, last_used in entries:
+                expired = self.max_age is not None and now - last_used > self.max_age
+                if path == keep or not (expired or total > self.max_bytes):
+                    continue
+                if self._remove(path):
+                    print(f"🗑️  Evicted mirror cache entry {os.path.basename(path)} "
+                          f"({'unused for too long' if expired else 'over the size budget'})")
+                    total -= size
+                    freed += size
+            return freed
+        finally:
+            lock.release()
+
+    def _remove(self, path: str) -> bool:
+        key = os.path.basename(path)[:-4]
+        update, use = self._lock(key, "update"), self._lock(key, "use")
+        if not update.acquire(blocking=False):
+            return False
+        try:
+            if not use.acquire(blocking=False):
+                return False
+            try:
+                shutil.rmtree(path, ignore_errors=True)
+                return True
+            finally:
+                use.release()
+        finally:
+            update.release()
+
+    def _entries(self):
+        for name in os.listdir(self.mirrors_dir):
+            path = os.path.join(self.mirrors_dir, name)
+            if not name.endswith(".git") or not os.path.isdir(path):
+                continue
+            size = 0
+            for dirpath, _, filenames in os.walk(path):
+                for filename in filenames:
+                    try:
+                        size += os.lstat(os.path.join(dirpath, filename)).st_size
+                    except FileNotFoundError:
+                        continue
+            try:
+                last_used = os.stat(os.path.join(path, LAST_USED_FILE)).st_mtime
+            except FileNotFoundError:
+                last_used = os.stat(path).st_mtime
+            yield path, size, last_used
+
+    @staticmethod
+    def _touch(path: str):
+        with open(os.path.join(path, LAST_USED_FILE), "a", encoding="utf-8"):
+            pass
+        os.utime(os.path.join(path, LAST_USED_FILE))
+
+
+def _git(repo_path: str, *args) -> str:
+    return subprocess.run(["git", *args], cwd=repo_path, check=True,
+                          capture_output=True, text=True).stdout
+
+
+def _run(cmd: list, cwd: str = None, env: dict = None):
+    return subprocess.run(cmd, cwd=cwd, check=True, env={**os.environ, **(env or {})})
+
+
+def _remote_head(url: str, env: dict = None) -> str:
+    """Branch the remote HEAD points to, or None."""
+    result = subprocess.run(
+        ["git", "ls-remote", "--symref", url, "HEAD"], check=True, capture_output=True, text=True,
+        env={**os.environ, "GIT_TERMINAL_PROMPT": "0", **(env or {})}
+    )
+    for line in result.stdout.splitlines():
+        if line.startswith("ref: "):
+            return line[5:].split("\t")[0]
+    return None
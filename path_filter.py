@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Path filtering of repository history
+
+Rewrites every commit of a freshly cloned (pointer-only) repository so that
+files not selected by --include / --exclude globs disappear from the pushed
+trees. The history is streamed through ``git fast-export --no-data`` into
+``git fast-import`` in the same repository, so blobs are referenced by SHA
+and never copied, and the LFS objects of dropped files are never downloaded.
+Commits that lost files get trailers naming what was excluded.
+
+--ignore-lfs uses the same single pass over every ref: blobs that are LFS
+pointers are dropped and ``filter=lfs`` lines are removed from
+``.gitattributes`` files, without checking out a tree.
+"""
+
+import fnmatch
+import posixpath
+import subprocess
+
+from lfs_api import LFS_POINTER_MAX_SIZE, parse_lfs_pointer
+
+# Always kept: without it the target no longer knows which files are LFS pointers
+ALWAYS_KEPT = (".gitattributes",)
+MAX_LISTED_PATHS = 20
+
+
+class PathFilterError(Exception):
+    """Raised when the history rewrite fails."""
+
+
+class PathFilter:
+    """Decides which paths are transferred from include and exclude globs.
+
+    A pattern without "/" matches the file name in any directory, one with
+    "/" matches the whole path, and a trailing "/" selects a directory.
+    With includes, only matching paths are kept; excludes always win.
+    """
+
+    def __init__(self, includes=(), excludes=()):
+        self.includes = [p for p in includes if p]
+        self.excludes = [p for p in excludes if p]
+
+    def __bool__(self):
+        return bool(self.includes or self.excludes)
+
+    @staticmethod
+    def _matches(path: str, pattern: str) -> bool:
+        if pattern.endswith("/"):
+            return path.startswith(pattern) or fnmatch.fnmatchcase(path, pattern + "*")
+        if "/" not in pattern:
+            return fnmatch.fnmatchcase(posixpath.basename(path), pattern)
+        return fnmatch.fnmatchcase(path, pattern.lstrip("/"))
+
+    def keeps(self, path: str) -> bool:
+        if path in ALWAYS_KEPT:
+            return True
+        if any(self._matches(path, p) for p in self.excludes):
+            return False
+        return not self.includes or any(self._matches(path, p) for p in self.includes)
+
+    def describe(self) -> str:
+        parts = []
+        if self.includes:
+            parts.append("include=" + ",".join(self.includes))
+        if self.excludes:
+            parts.append("exclude=" + ",".join(self.excludes))
+        return "; ".join(parts)
+
+
+def split_patterns(values) -> list:
+    """Flatten repeated and comma-separated CLI values into a list of globs."""
+    patterns = []
+    for value in values or ():
+        patterns.extend(p.strip() for p in value.split(",") if p.strip())
+    return patterns
+
+
+def unquote_path(raw: bytes) -> str:
+    """Decode a path as written by fast-export (C-style quoted when needed)."""
+    if not raw.startswith(b'"'):
+        return raw.decode("utf-8", "surrogateescape")
+    body = raw[1:-1]
+    out = bytearray()
+    escapes = {b"n": b"\n", b"t": b"\t", b'"': b'"', b"\\": b"\\",
+               b"a": b"\a", b"b": b"\b", b"f": b"\f", b"r": b"\r", b"v": b"\v"}
+    i = 0
+    while i < len(body):
+        char = body[i:i + 1]
+        if char != b"\\":
+            out += char
+            i += 1
+        elif body[i + 1:i + 2].isdigit():
+            out.append(int(body[i + 1:i + 4], 8))
+            i += 4
+        else:
+            out += escapes.get(body[i + 1:i + 2], body[i + 1:i + 2])
+            i += 2
+    return bytes(out).decode("utf-8", "surrogateescape")
+
+
+def _trailers(removed: list, description: str) -> bytes:
+    lines = [f"Transfer-Filter: {description}"]
+    lines += [f"Excluded-Path: {path}" for path in removed[:MAX_LISTED_PATHS]]
+    if len(removed) > MAX_LISTED_PATHS:
+        lines.append(f"Excluded-Path: … and {len(removed) - MAX_LISTED_PATHS} more")
+    return ("\n".join(lines) + "\n").encode("utf-8", "surrogateescape")
+
+
+def rewrite_history(repo_path: str, keep, description: str, refs: list, edit=None) -> dict:
+    """Stream refs through fast-export/fast-import, dropping paths keep() rejects.
+
+    keep(path, blob_sha) returns whether a file stays. edit(path, blob_sha)
+    may return new content for a kept file (None leaves it unchanged).
+    Commits that lost files get a trailer with description and the excluded
+    paths. Returns {'commits', 'rewritten', 'removed_paths'}.
+    """
+    exporter = subprocess.Popen(
+        ["git", "fast-export", "--no-data", "--signed-tags=strip", "--reencode=no", *refs],
+        cwd=repo_path, stdout=subprocess.PIPE
+    )
+    importer = subprocess.Popen(
+        ["git", "fast-import", "--force", "--quiet"],
+        cwd=repo_path, stdin=subprocess.PIPE
+    )
+    stats = {"commits": 0, "rewritten": 0, "removed_paths": set()}
+    source, sink = exporter.stdout, importer.stdin
+    try:
+        commit = None
+        while True:
+            line = source.readline()
+            if not line:
+                break
+            if line.startswith(b"commit "):
+                # Buffer the commit header so its message can get a trailer
+                commit = {"head": [line], "message": None, "tail": [], "removed": []}
+                stats["commits"] += 1
+                continue
+            if commit is None:
+                sink.write(line)
+                if line.startswith(b"data "):
+                    sink.write(source.read(int(line[5:])))
+                continue
+            if commit["message"] is None:
+                if line.startswith(b"data "):
+                    commit["message"] = source.read(int(line[5:]))
+                else:
+                    commit["head"].append(line)
+                continue
+            if line == b"\n":
+                _write_commit(sink, commit, description, stats)
+                commit = None
+                continue
+            if line.startswith((b"M ", b"D ")):
+                if line.startswith(b"M "):
+                    _, _, dataref, raw_path = line.rstrip(b"\n").split(b" ", 3)
+                else:
+                    dataref, raw_path = b"", line.rstrip(b"\n")[2:]
+                path = unquote_path(raw_path)
+                if not keep(path, dataref.decode()):
+                    if line.startswith(b"M "):
+                        commit["removed"].append(path)
+                    continue
+                content = edit(path, dataref.decode()) if edit and dataref else None
+                if content is not None:
+                    mode = line.split(b" ", 2)[1]
+                    line = (b"M %s inline %s\n" % (mode, raw_path)
+                            + b"data %d\n" % len(content) + content + b"\n")
+            commit["tail"].append(line)
+        if commit is not None:
+            _write_commit(sink, commit, description, stats)
+        sink.close()
+    except BrokenPipeError:
+        pass
+    export_rc = exporter.wait()
+    import_rc = importer.wait()
+    if export_rc or import_rc:
+        raise PathFilterError(f"history rewrite failed (fast-export exit {export_rc}, "
+                              f"fast-import exit {import_rc})")
+    stats["removed_paths"] = sorted(stats["removed_paths"])
+    return stats
+
+
+def _write_commit(sink, commit: dict, description: str, stats: dict):
+    message = commit["message"] or b""
+    if commit["removed"]:
+        stats["rewritten"] += 1
+        stats["removed_paths"].update(commit["removed"])
+        if message and not message.endswith(b"\n"):
+            message += b"\n"
+        message += b"\n" + _trailers(sorted(set(commit["removed"])), description)
+    sink.write(b"".join(commit["head"]))
+    sink.write(b"data %d\n" % len(message) + message)
+    sink.write(b"".join(commit["tail"]))
+    sink.write(b"\n")
+
+
+def lfs_pointer_blobs(repo_path: str) -> set:
+    """SHAs of every blob in the object store that is an LFS pointer."""
+    check = subprocess.run(
+        ["git", "cat-file", "--batch-all-objects", "--unordered",
+         "--batch-check=%(objectname) %(objecttype) %(objectsize)"],
+        cwd=repo_path, check=True, capture_output=True, text=True
+    )
+    candidates = []
+    for line in check.stdout.splitlines():
+        sha, kind, size = line.split()
+        if kind == "blob" and int(size) <= LFS_POINTER_MAX_SIZE:
+            candidates.append(sha)
+    if not candidates:
+        return set()
+
+    contents = subprocess.run(
+        ["git", "cat-file", "--batch"], cwd=repo_path, check=True, capture_output=True,
+        input=("\n".join(candidates) + "\n").encode()
+    ).stdout
+    pointers = set()
+    offset = 0
+    for sha in candidates:
+        header_end = contents.index(b"\n", offset)
+        size = int(contents[offset:header_end].split()[2])
+        if parse_lfs_pointer(contents[header_end + 1:header_end + 1 + size]):
+            pointers.add(sha)
+        offset = header_end + 1 + size + 1
+    return pointers
+
+
+def strip_lfs_attributes(data: bytes) -> bytes:
+    """.gitattributes content without the lines that route paths through git-lfs."""
+    lines = data.splitlines(keepends=True)
+    return b"".join(line for line in lines if b"filter=lfs" not in line)
+
+
+def strip_lfs_history(repo_path: str, refs: list) -> dict:
+    """Drop LFS pointer files and filter=lfs attributes from every commit of refs.
+
+    One fast-export/fast-import pass; pointers are found by content, so a
+    file stays if its blob was committed without git-lfs. A .gitattributes
+    left without other lines is dropped. Returns rewrite_history()'s stats.
+    """
+    pointers = lfs_pointer_blobs(repo_path)
+    attributes = {}
+
+    def stripped(sha: str) -> bytes:
+        if sha not in attributes:
+            data = subprocess.run(["git", "cat-file", "blob", sha], cwd=repo_path,
+                                  check=True, capture_output=True).stdout
+            attributes[sha] = strip_lfs_attributes(data)
+            if attributes[sha] == data:
+                attributes[sha] = None
+        return attributes[sha]
+
+    def is_attributes(path: str) -> bool:
+        return posixpath.basename(path) == ".gitattributes"
+
+    def keep(path: str, blob: str) -> bool:
+        if blob in pointers:
+            return False
+        if blob and is_attributes(path):
+            content = stripped(blob)
+            return content is None or bool(content.strip())
+        return True
+
+    def edit(path: str, blob: str):
+        return stripped(blob) if is_attributes(path) else None
+
+    return rewrite_history(repo_path, keep, "ignore-lfs", refs, edit=edit)
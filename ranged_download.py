@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Multi-connection ranged downloads
+
+Splits a large object into byte ranges fetched in parallel with HTTP Range
+requests. Ranges are written into a preallocated file, progress is kept in a
+sidecar file so interrupted ranges resume where they stopped, and the sha256
+OID is verified before the file is moved into place.
+"""
+
+import os
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import requests
+
+import rate_control
+from integrity import hash_file
+
+MB = 1024 * 1024
+DEFAULT_PART_SIZE = 64 * MB
+DEFAULT_CONNECTIONS = 8
+PART_RETRIES = 3
+PROGRESS_EVERY = 8 * MB
+
+
+class RangeDownloadError(Exception):
+    """Raised when a ranged download cannot be completed or verified."""
+
+
+def parse_range_config(spec: str) -> dict:
+    """Parse ``host=part_mb:connections[,host=...]`` into {host: (part_size, connections)}.
+
+    Example: ``cdn-lfs.huggingface.co=128:16,xget.xi-xu.me=32:4,*=64:8``
+    (``*`` sets the default for all other hosts).
+    """
+    config = {}
+    for item in (spec or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        host, _, value = item.partition("=")
+        part_mb, _, connections = value.partition(":")
+        try:
+            config[host.strip().lower()] = (
+                int(float(part_mb) * MB) if part_mb else DEFAULT_PART_SIZE,
+                int(connections) if connections else DEFAULT_CONNECTIONS,
+            )
+        except ValueError:
+            raise RangeDownloadError(f"Invalid range config entry '{item}'")
+    return config
+
+
+class RangedDownloader:
+    """Download large files over several parallel Range connections."""
+
+    def __init__(self, session: requests.Session = None, part_size: int = DEFAULT_PART_SIZE,
+                 connections: int = DEFAULT_CONNECTIONS, host_config: dict = None,
+                 min_size: int = 256 * MB):
+        self.part_size = part_size
+        self.connections = connections
+        self.host_config = host_config or {}
+        self.min_size = min_size
+        if session is None:
+            # Pool enough keep-alive connections for the widest host setting
+            pool_size = max([connections] + [conns for _, conns in self.host_config.values()])
+            session = rate_control.mount(requests.Session(), pool_maxsize=pool_size)
+        self.session = session
+
+    def settings_for(self, url: str, fallback_url: str = None):
+        """Return (part_size, connections) for the host of url (or fallback_url)."""
+        for candidate in (url, fallback_url):
+            host = (urlparse(candidate).hostname or "").lower() if candidate else ""
+            if host in self.host_config:
+                return self.host_config[host]
+        return self.host_config.get("*", (self.part_size, self.connections))
+
+    def should_use(self, size: int) -> bool:
+        return size >= self.min_size
+
+    def download(self, url: str, headers: dict, dest: str, size: int, oid: str,
+                 fallback_url: str = None):
+        """Download url into dest with parallel ranges and verify the sha256 OID."""
+        part_size, connections = self.settings_for(url, fallback_url)
+        partial = f"{dest}.part"
+        state_path = f"{dest}.parts.json"
+        os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+
+        ranges = [(start, min(start + part_size, size) - 1) for start in range(0, size, part_size)]
+        progress = self._load_progress(state_path, partial, oid, size, part_size)
+        if progress is None:
+            progress = {str(index): 0 for index in range(len(ranges))}
+            with open(partial, "wb") as handle:
+                handle.truncate(size)
+        done = sum(1 for index, (start, end) in enumerate(ranges)
+                   if progress.get(str(index), 0) >= end - start + 1)
+        if done:
+            print(f"   ↻ Resuming {oid[:12]}…: {done}/{len(ranges)} ranges already complete")
+
+        lock = threading.Lock()
+        limiter = rate_control.limiter_for(url, connections)
+
+        def save_progress():
+            tmp_path = f"{state_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as handle:
+                json.dump({"oid": oid, "size": size, "part_size": part_size,
+                           "progress": progress}, handle)
+            os.replace(tmp_path, state_path)
+
+        def fetch(index: int):
+            start, end = ranges[index]
+            for attempt in range(1, PART_RETRIES + 1):
+                written = progress.get(str(index), 0)
+                if written >= end - start + 1:
+                    return
+                try:
+                    with limiter.slot():
+                        self._fetch_range(url, headers, partial, start + written, end,
+                                          index, progress, lock, save_progress)
+                    return
+                except (requests.RequestException, RangeDownloadError) as exc:
+                    if attempt == PART_RETRIES:
+                        raise RangeDownloadError(
+                            f"Range {index} of {oid[:12]}… failed after {attempt} attempts: {exc}"
+                        )
+                    time.sleep(rate_control.backoff_delay(attempt - 1, cap=30))
+
+        with ThreadPoolExecutor(max_workers=max(1, connections)) as pool:
+            for future in [pool.submit(fetch, index) for index in range(len(ranges))]:
+                future.result()
+        save_progress()
+
+        # Parts arrive out of order, so the hash needs one pass over the (page-cached) file
+        digest = hash_file(partial)
+        if digest != oid:
+            os.remove(partial)
+            os.remove(state_path)
+            raise RangeDownloadError(
+                f"Integrity check failed for {oid}: got sha256 {digest}"
+            )
+        os.replace(partial, dest)
+        os.remove(state_path)
+
+    def _fetch_range(self, url, headers, partial, start, end, index, progress, lock, save_progress):
+        range_headers = dict(headers or {})
+        range_headers["Range"] = f"bytes={start}-{end}"
+        with self.session.get(url, headers=range_headers, stream=True, timeout=60) as response:
+            if response.status_code != 206:
+                raise RangeDownloadError(
+                    f"server did not honour Range request (HTTP {response.status_code})"
+                )
+            remaining = end - start + 1
+            unsaved = 0
+            with open(partial, "r+b") as handle:
+                handle.seek(start)
+                for chunk in response.iter_content(chunk_size=MB):
+                    if len(chunk) > remaining:
+                        raise RangeDownloadError("server returned more data than requested")
+                    handle.write(chunk)
+                    remaining -= len(chunk)
+                    unsaved += len(chunk)
+                    if unsaved >= PROGRESS_EVERY:
+                        handle.flush()
+                        with lock:
+                            progress[str(index)] += unsaved
+                            save_progress()
+                        unsaved = 0
+                handle.flush()
+            with lock:
+                progress[str(index)] += unsaved
+                save_progress()
+            if remaining:
+                raise RangeDownloadError(f"range ended early, {remaining} bytes missing")
+
+    @staticmethod
+    def _load_progress(state_path, partial, oid, size, part_size):
+        try:
+            with open(state_path, encoding="utf-8") as handle:
+                state = json.load(handle)
+        except (FileNotFoundError, ValueError):
+            return None
+        if (state.get("oid"), state.get("size"), state.get("part_size")) != (oid, size, part_size):
+            return None
+        if not os.path.exists(partial) or os.path.getsize(partial) != size:
+            return None
+        return state.get("progress")
+
+    def supports_ranges(self, url: str, headers: dict = None) -> bool:
+        """Probe whether the server answers Range requests with 206."""
+        probe_headers = dict(headers or {})
+        probe_headers["Range"] = "bytes=0-0"
+        try:
+            with self.session.get(url, headers=probe_headers, stream=True, timeout=30) as response:
+                return response.status_code == 206
+        except requests.RequestException:
+            return False
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Adaptive per-host rate control
+
+Every HTTP session of the tool and every git command that talks to a remote
+goes through one limiter per host. Each limiter keeps:
+
+- a token bucket for the request rate. It is unlimited unless configured
+  (``--rate-limit`` / ``RATE_LIMITS``) or until the host pushes back.
+- an AIMD concurrency limit for object transfers. The limit halves on
+  throttling or errors and grows by one slot per window of successful
+  transfers, up to the configured concurrency.
+- a pause. ``Retry-After`` on 429/503 responses and GitLab's
+  ``RateLimit-Remaining``/``RateLimit-Reset`` headers stop every thread from
+  sending to that host until the deadline.
+
+When an unconfigured host throttles, its bucket starts at half the rate
+observed over the last few seconds and probes upwards again, so throughput
+stays close to what the host actually allows.
+"""
+
+import os
+import time
+import random
+import threading
+from collections import deque
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+from requests.adapters import HTTPAdapter
+
+# Responses that mean "slow down" rather than "failed"
+THROTTLE_STATUSES = {429, 503}
+# Pause every thread once this few requests remain in the host's window
+RATE_LIMIT_FLOOR = 5
+MAX_WAIT_SECONDS = 60.0
+MIN_RATE = 0.2
+# Sliding window (seconds) used to measure the request rate of a host
+RATE_WINDOW = 10.0
+# Simultaneous failures count as one congestion signal
+DECREASE_COOLDOWN = 1.0
+DEFAULT_MAX_CONCURRENCY = 64
+THROTTLE_MARKERS = ("429", "too many requests", "rate limit", "slow down")
+
+
+class RateControlError(Exception):
+    """Raised for an invalid rate limit configuration."""
+
+
+def parse_rate_limits(spec: str) -> dict:
+    """Parse ``host=rps[:burst][,host=...]`` into {host: (rate, burst)}.
+
+    ``*`` sets the default for all other hosts and a rate of 0 means
+    unlimited. Example: ``huggingface.co=10:20,xget.xi-xu.me=5,*=0``
+    """
+    config = {}
+    for item in (spec or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        host, _, value = item.partition("=")
+        rate, _, burst = value.partition(":")
+        try:
+            rate = float(rate)
+            burst = float(burst) if burst else None
+        except ValueError:
+            raise RateControlError(f"Invalid rate limit entry '{item}'")
+        if rate < 0 or (burst is not None and burst < 1):
+            raise RateControlError(f"Invalid rate limit entry '{item}'")
+        config[host.strip().lower()] = (rate or None, burst)
+    return config
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = MAX_WAIT_SECONDS) -> float:
+    """Exponential backoff with full jitter for the given (0-based) retry attempt."""
+    return random.uniform(0, min(cap, base * 2 ** max(0, attempt)))
+
+
+def retry_after(headers) -> float:
+    """Seconds requested by a ``Retry-After`` header (delta or HTTP date), or None."""
+    value = (headers or {}).get("Retry-After", "").strip()
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def rate_limit_reset(headers) -> float:
+    """Seconds until the current window resets, when the host is almost out of requests."""
+    remaining = (headers or {}).get("RateLimit-Remaining", "").strip()
+    reset = (headers or {}).get("RateLimit-Reset", "").strip()
+    if not remaining.isdigit() or not reset.isdigit() or int(remaining) > RATE_LIMIT_FLOOR:
+        return None
+    reset = float(reset)
+    # GitLab sends an epoch timestamp, the IETF draft a delta in seconds
+    return max(0.0, reset - time.time()) if reset > 1e9 else reset
+
+
+def looks_throttled(output: str) -> bool:
+    """Whether git / git-lfs output reports an HTTP 429 or rate limit."""
+    text = (output or "").lower()
+    return any(marker in text for marker in THROTTLE_MARKERS)
+
+
+class HostLimiter:
+    """Token bucket, AIMD concurrency limit and pause for one host."""
+
+    def __init__(self, host: str, rate: float = None, burst: float = None,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY):
+        self.host = host
+        self.configured_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst or max(1.0, rate or 1.0)
+        self.max_concurrency = max(1, max_concurrency)
+        self.limit = float(self.max_concurrency)
+        self.in_flight = 0
+        self.throttles = 0
+        self.errors = 0
+        self._resume_at = 0.0
+        self._refilled = time.monotonic()
+        self._last_decrease = 0.0
+        self._streak = 0
+        self._sent = deque()
+        self._cond = threading.Condition()
+
+    # ------------------------------------------------------------------
+    # Admission
+    # ------------------------------------------------------------------
+
+    def _refill(self, now: float):
+        if self.rate:
+            capacity = self.burst or max(1.0, self.rate)
+            self.tokens = min(capacity, self.tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+
+    def _observed_rate(self, now: float) -> float:
+        while self._sent and now - self._sent[0] > RATE_WINDOW:
+            self._sent.popleft()
+        return len(self._sent) / RATE_WINDOW
+
+    def wait_turn(self):
+        """Block until the host is not paused and a request token is available."""
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                delay = self._resume_at - now
+                if delay <= 0:
+                    self._refill(now)
+                    if not self.rate or self.tokens >= 1:
+                        break
+                    delay = (1 - self.tokens) / self.rate
+                self._cond.wait(min(delay, MAX_WAIT_SECONDS))
+            if self.rate:
+                self.tokens -= 1
+            self._sent.append(now)
+            self._observed_rate(now)
+
+    @contextmanager
+    def slot(self):
+        """Hold one of the host's concurrent transfer slots (AIMD-sized)."""
+        with self._cond:
+            while self.in_flight >= max(1, int(self.limit)):
+                self._cond.wait()
+            self.in_flight += 1
+        try:
+            yield self
+        finally:
+            with self._cond:
+                self.in_flight -= 1
+                self._cond.notify_all()
+
+    def raise_ceiling(self, max_concurrency: int):
+        with self._cond:
+            if max_concurrency > self.max_concurrency:
+                self.limit += max_concurrency - self.max_concurrency
+                self.max_concurrency = max_concurrency
+                self._cond.notify_all()
+
+    def paused_for(self) -> float:
+        """Seconds the host is still paused for (0 when requests may be sent)."""
+        with self._cond:
+            return max(0.0, self._resume_at - time.monotonic())
+
+    # ------------------------------------------------------------------
+    # Feedback
+    # ------------------------------------------------------------------
+
+    def observe(self, status: int, headers=None):
+        """Adapt to a response: throttle on 429/503, back off on 5xx, grow otherwise."""
+        reset = rate_limit_reset(headers)
+        if reset:
+            self.pause(reset)
+        if status in THROTTLE_STATUSES:
+            self.throttled(retry_after(headers))
+        elif status >= 500:
+            self.record_error()
+        else:
+            self.record_success()
+
+    def pause(self, seconds: float):
+        with self._cond:
+            until = time.monotonic() + min(seconds, MAX_WAIT_SECONDS)
+            self._resume_at = max(self._resume_at, until)
+
+    def throttled(self, delay: float = None):
+        """The host asked us to slow down; pause for delay (or a jittered backoff)."""
+        with self._cond:
+            self.throttles += 1
+            self._streak += 1
+            self._decrease(time.monotonic(), throttled=True)
+            streak = self._streak
+        self.pause(delay if delay is not None else backoff_delay(streak))
+
+    def record_error(self):
+        with self._cond:
+            self.errors += 1
+            self._decrease(time.monotonic(), throttled=False)
+
+    def record_success(self):
+        with self._cond:
+            self._streak = 0
+            if self.limit < self.max_concurrency:
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+                self._cond.notify_all()
+            if self.rate:
+                self.rate += 1 / self.rate
+                if self.configured_rate:
+                    self.rate = min(self.configured_rate, self.rate)
+
+    def _decrease(self, now: float, throttled: bool):
+        if now - self._last_decrease < DECREASE_COOLDOWN:
+            return
+        self._last_decrease = now
+        self.limit = max(1.0, self.limit / 2)
+        if throttled:
+            current = self.rate or self._observed_rate(now)
+            if current:
+                self._refill(now)
+                self.rate = max(MIN_RATE, current / 2)
+                self.tokens = min(self.tokens, 1.0)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {"rate": round(self.rate, 2) if self.rate else None,
+                    "concurrency": int(self.limit), "throttles": self.throttles,
+                    "errors": self.errors}
+
+
+class RateController:
+    """Registry of per-host limiters shared by every session and git command."""
+
+    def __init__(self, config: dict = None):
+        self.config = dict(config or {})
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def configure(self, config: dict):
+        """Apply {host: (rate, burst)} settings, also to existing limiters."""
+        if not config:
+            return
+        with self._lock:
+            self.config.update(config)
+            for host, limiter in self._limiters.items():
+                rate, burst = self.config.get(host, self.config.get("*", (None, None)))
+                with limiter._cond:
+                    limiter.configured_rate = limiter.rate = rate
+                    limiter.burst = burst
+
+    def limiter(self, url: str, max_concurrency: int = None) -> HostLimiter:
+        """Limiter of the host of url; max_concurrency raises its AIMD ceiling."""
+        host = (urlparse(url).hostname or "").lower()
+        with self._lock:
+            limiter = self._limiters.get(host)
+            if limiter is None:
+                rate, burst = self.config.get(host, self.config.get("*", (None, None)))
+                limiter = HostLimiter(host, rate, burst,
+                                      max_concurrency or DEFAULT_MAX_CONCURRENCY)
+                self._limiters[host] = limiter
+                return limiter
+        if max_concurrency:
+            limiter.raise_ceiling(max_concurrency)
+        return limiter
+
+    def stats(self) -> dict:
+        """{host: limiter stats} of hosts that throttled or failed."""
+        with self._lock:
+            limiters = list(self._limiters.values())
+        return {limiter.host: limiter.stats() for limiter in limiters
+                if limiter.throttles or limiter.errors}
+
+
+_default = RateController(parse_rate_limits(os.getenv("RATE_LIMITS", "")))
+
+
+def default_controller() -> RateController:
+    return _default
+
+
+def limiter_for(url: str, max_concurrency: int = None) -> HostLimiter:
+    return _default.limiter(url, max_concurrency)
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    """HTTPAdapter that waits for the host's limiter before sending and feeds it every response."""
+
+    def __init__(self, controller: RateController = None, **kwargs):
+        self.controller = controller or _default
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        limiter = self.controller.limiter(request.url)
+        limiter.wait_turn()
+        try:
+            response = super().send(request, **kwargs)
+        except Exception:
+            limiter.record_error()
+            raise
+        limiter.observe(response.status_code, response.headers)
+        return response
+
+
+def mount(session, pool_connections: int = 10, pool_maxsize: int = 10,
+          controller: RateController = None):
+    """Route a session's http(s) traffic through a RateLimitedAdapter."""
+    adapter = RateLimitedAdapter(controller, pool_connections=pool_connections,
+                                 pool_maxsize=pool_maxsize)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def configure(spec: str):
+    """Apply a ``host=rps[:burst],...`` spec to the shared controller."""
+    _default.configure(parse_rate_limits(spec))
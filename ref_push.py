@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Ref-diff pushes
+
+Instead of ``git push --mirror`` followed by fallback pushes per namespace,
+the local refs are compared with a ``git ls-remote`` of the target and only
+refs that changed are sent, in one atomic push. Refs matching the skip
+patterns (by default HuggingFace's ``refs/pr/*`` and the namespaces GitLab
+reserves for itself) are left alone on both sides. Every update carries a
+``--force-with-lease`` on the SHA seen by ls-remote, and ``--porcelain``
+output gives a status per ref.
+"""
+
+import fnmatch
+from collections import namedtuple
+
+DEFAULT_SKIP_REFS = (
+    "refs/pr/*",
+    "refs/merge-requests/*",
+    "refs/keep-around/*",
+    "refs/pipelines/*",
+    "refs/environments/*",
+    "refs/tmp/*",
+)
+
+# old is None for a ref the target does not have, new is None for a deletion
+RefUpdate = namedtuple("RefUpdate", ["ref", "old", "new"])
+RefStatus = namedtuple("RefStatus", ["ref", "flag", "summary"])
+
+# git push --porcelain flags of refs that were not updated
+FAILED_FLAGS = ("!",)
+
+
+class RefPushError(Exception):
+    """Raised when refs that must reach the target were rejected."""
+
+
+def parse_skip_refs(values) -> list:
+    """Patterns from repeated/comma-separated values; 'none' disables skipping."""
+    patterns = []
+    for value in values or ():
+        patterns.extend(p.strip() for p in value.split(",") if p.strip())
+    if not patterns:
+        return list(DEFAULT_SKIP_REFS)
+    return [p for p in patterns if p.lower() != "none"]
+
+
+def is_skipped(ref: str, patterns) -> bool:
+    return any(fnmatch.fnmatchcase(ref, pattern) for pattern in patterns)
+
+
+def plan_ref_updates(local: dict, remote: dict, skip_patterns=DEFAULT_SKIP_REFS, prune: bool = False):
+    """Diff {ref: sha} maps. Returns (updates, unchanged, skipped).
+
+    With prune, target refs missing locally are deleted (mirror semantics).
+    Skipped refs are neither pushed nor deleted.
+    """
+    remote = {ref: sha for ref, sha in remote.items() if ref.startswith("refs/")}
+    updates, unchanged, skipped = [], [], []
+    for ref in sorted(local):
+        if is_skipped(ref, skip_patterns):
+            skipped.append(ref)
+        elif remote.get(ref) == local[ref]:
+            unchanged.append(ref)
+        else:
+            updates.append(RefUpdate(ref, remote.get(ref), local[ref]))
+    if prune:
+        for ref in sorted(set(remote) - set(local)):
+            if is_skipped(ref, skip_patterns):
+                skipped.append(ref)
+            else:
+                updates.append(RefUpdate(ref, remote[ref], None))
+    return updates, unchanged, skipped
+
+
+def push_command(url: str, updates: list, atomic: bool = True) -> list:
+    """git push of exactly these updates, each leased on the SHA the target had."""
+    cmd = ["git", "push", "--porcelain"]
+    if atomic:
+        cmd.append("--atomic")
+    refspecs = []
+    for update in updates:
+        cmd.append(f"--force-with-lease={update.ref}:{update.old or ''}")
+        refspecs.append(f"{update.ref}:{update.ref}" if update.new else f":{update.ref}")
+    return cmd + [url] + refspecs
+
+
+def parse_porcelain(output: str) -> dict:
+    """{ref: RefStatus} from ``git push --porcelain`` output."""
+    statuses = {}
+    for line in (output or "").splitlines():
+        parts = line.split("\t")
+        if len(parts) < 3 or len(parts[0]) != 1:
+            continue
+        ref = parts[1].rpartition(":")[2]
+        statuses[ref] = RefStatus(ref, parts[0], parts[2])
+    return statuses
+
+
+def failed(status: RefStatus) -> bool:
+    return status.flag in FAILED_FLAGS
+
+
+def collateral(status: RefStatus) -> bool:
+    """Whether a ref only failed because another ref broke the atomic push."""
+    return failed(status) and "atomic" in status.summary
@@ -11,6 +11,8 @@ import tempfile
 import shutil
 from urllib.parse import urlparse, urlunparse
 
+from command_runner import default_runner, with_progress_flag
+
 
 def inject_credentials(url, username=None, token=None):
     """Inject credentials into Git URL."""
@@ -51,11 +53,14 @@ def run_git_command(cmd, cwd=None, show_progress=True):
     
     if show_progress:
         # For commands with progress (git clone, git lfs push, etc.)
-        # Don't capture output - let it stream to terminal
-        result = subprocess.run(cmd, cwd=cwd, text=True)
+        # Output is a pipe, so ask git / git-lfs for progress and echo it as it arrives
+        result = default_runner().run(
+            with_progress_flag(cmd), cwd=cwd, echo=True, check=False,
+            env={**os.environ, 'GIT_LFS_FORCE_PROGRESS': '1'}
+        )
     else:
         # For commands we need to parse
-        result = subprocess.run(cmd, cwd=cwd, capture_output=True, text=True)
+        result = default_runner().run(cmd, cwd=cwd, capture_stdout=True, check=False)
         if result.stdout:
             print(result.stdout)
     
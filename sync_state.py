@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Incremental sync state
+
+Persists, per (source, target) pair, the ref SHAs and LFS OIDs of the last
+successful transfer so later runs can skip unchanged pairs after a cheap
+``git ls-remote`` and only move what is new.
+"""
+
+import os
+import json
+import subprocess
+import tempfile
+from datetime import datetime, timezone
+
+from file_lock import FileLock
+from lfs_api import split_credentials
+
+DEFAULT_STATE_FILE = os.path.join("~", ".cache", "hf_transfer", "sync_state.json")
+
+
+def ls_remote(url: str) -> dict:
+    """Return {ref: sha} advertised by a remote (peeled tag entries excluded)."""
+    result = subprocess.run(
+        ["git", "ls-remote", url],
+        check=True, capture_output=True, text=True,
+        env={**os.environ, "GIT_TERMINAL_PROMPT": "0"}
+    )
+    refs = {}
+    for line in result.stdout.splitlines():
+        sha, _, ref = line.partition("\t")
+        if ref and not ref.endswith("^{}"):
+            refs[ref] = sha
+    return refs
+
+
+def state_key(source_url: str, target_url: str) -> str:
+    """Credential-free key identifying a transfer pair."""
+    return f"{split_credentials(source_url)[0]}|{split_credentials(target_url)[0]}"
+
+
+class SyncStateStore:
+    """JSON file of per-pair sync records, safe for concurrent writers."""
+
+    def __init__(self, path: str = None):
+        self.path = os.path.abspath(os.path.expanduser(
+            path or os.getenv("SYNC_STATE_FILE") or DEFAULT_STATE_FILE
+        ))
+        self.lock_path = f"{self.path}.lock"
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, encoding="utf-8") as handle:
+                return json.load(handle)
+        except FileNotFoundError:
+            return {}
+
+    def get(self, source_url: str, target_url: str):
+        """Return the last sync record of a pair, or None."""
+        with FileLock(self.lock_path, shared=True):
+            return self._load().get(state_key(source_url, target_url))
+
+    def put(self, source_url: str, target_url: str, source_refs: dict,
+            target_refs: dict, lfs_oids):
+        """Record a successful sync of a pair."""
+        record = {
+            "source_refs": source_refs,
+            "target_refs": target_refs,
+            "lfs_oids": sorted(set(lfs_oids)),
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        }
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with FileLock(self.lock_path):
+            states = self._load()
+            states[state_key(source_url, target_url)] = record
+            fd, tmp_path = tempfile.mkstemp(prefix=".sync_state-", dir=os.path.dirname(self.path))
+            with os.fdopen(fd, "w", encoding="utf-8") as handle:
+                json.dump(states, handle, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        return record
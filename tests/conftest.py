@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""Shared fixtures: local Git + LFS + Hub API servers from benchmarks/fake_server.py."""
+
+import os
+import sys
+import socket
+import subprocess
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from fake_server import BenchServer  # noqa: E402
+from synthetic_repo import generate_repo  # noqa: E402
+
+
+def git(*args, cwd=None) -> str:
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True,
+                          text=True).stdout
+
+
+def closed_port_url() -> str:
+    """Base URL of a local port nothing listens on."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+
+def git_lfs_available() -> bool:
+    try:
+        version = git("lfs", "version")
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return False
+    return version.startswith("git-lfs/") and "shim" not in version
+
+
+@pytest.fixture
+def server(tmp_path):
+    """A started BenchServer; stopped after the test."""
+    created = []
+
+    def start(name: str = "server", **kwargs) -> BenchServer:
+        instance = BenchServer(str(tmp_path / name), **kwargs).start()
+        created.append(instance)
+        return instance
+
+    yield start
+    for instance in created:
+        instance.stop()
+
+
+@pytest.fixture
+def source(server):
+    """Server hosting o/model: 3 LFS shards, 3 commits, one shard replaced per commit."""
+    hub = server("source")
+    generate_repo(os.path.join(hub.repos_dir, "o/model.git"), hub.lfs_store("o/model"),
+                  lfs_files=3, lfs_size=20_000, small_files=4, history=3, lfs_updates=1)
+    return hub
+
+
+@pytest.fixture(autouse=True)
+def isolated_env(monkeypatch, tmp_path):
+    """Keep the caller's credentials and caches out of transfers."""
+    for name in ("HF_USERNAME", "HF_TOKEN", "TARGET_USERNAME", "TARGET_TOKEN",
+                 "GIT_LFS_SKIP_SMUDGE", "GIT_CONFIG_COUNT"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("ENDPOINT_CACHE", str(tmp_path / "endpoints.json"))
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""Command runner: prompting, timeouts and cancellation."""
+
+import os
+import sys
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from command_runner import (CommandCancelled, CommandNeedsCredentials, CommandRunner,
+                            CommandTimeout)
+
+PROBE = ("import os; print(os.getsid(0) == {sid}, os.environ.get('GIT_TERMINAL_PROMPT'), "
+         "os.environ.get('GIT_SSH_COMMAND'))")
+
+
+@pytest.fixture
+def runner():
+    return CommandRunner()
+
+
+def probe(runner, **kwargs) -> list:
+    result = runner.run([sys.executable, "-c", PROBE.format(sid=os.getsid(0))],
+                        capture_stdout=True, **kwargs)
+    return result.stdout.split()
+
+
+def test_without_timeouts_commands_keep_the_session(runner):
+    assert probe(runner) == ["True", "None", "None"]
+
+
+def test_with_a_timeout_prompts_are_disabled(runner):
+    assert probe(runner, timeout=30) == ["False", "0", "ssh", "-o", "BatchMode=yes"]
+
+
+def test_credential_prompt_fails_with_a_clear_error(runner):
+    class Unauthorized(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(401)
+            self.send_header("WWW-Authenticate", 'Basic realm="test"')
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Unauthorized)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    try:
+        with pytest.raises(CommandNeedsCredentials, match="credentials required"):
+            runner.run(["git", "ls-remote", f"http://127.0.0.1:{httpd.server_address[1]}/x.git"],
+                       idle_timeout=30)
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def test_timeouts_stop_the_process_group(runner):
+    started = time.monotonic()
+    with pytest.raises(CommandTimeout, match="timed out"):
+        runner.run(["sh", "-c", "sleep 30 & wait"], timeout=1)
+    with pytest.raises(CommandTimeout, match="no output"):
+        runner.run(["sh", "-c", "sleep 30 & wait"], idle_timeout=1)
+    assert time.monotonic() - started < 10
+
+
+def test_cancel_stops_interactive_commands(runner):
+    future = runner.submit(["sleep", "30"])
+    time.sleep(0.5)
+    runner.cancel()
+    with pytest.raises(CommandCancelled):
+        future.result(timeout=10)
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""Download backend selection, the Hub backend and its fallbacks."""
+
+import os
+import sys
+import types
+
+import pytest
+
+import transfer
+from conftest import git
+from download_backends import (DownloadBackendError, GitLFSBackend, HubBackend, NativeBackend,
+                               locate_lfs_objects)
+from integrity import hash_file
+from lfs_api import LFSBatchClient, scan_lfs_pointers, unique_objects
+
+
+@pytest.fixture
+def clone(source, tmp_path):
+    path = str(tmp_path / "clone.git")
+    git("clone", "--bare", "--quiet", f"{source.url}/o/model", path)
+    return path
+
+
+@pytest.fixture
+def objects(clone):
+    return unique_objects(scan_lfs_pointers(clone))
+
+
+def store_path(tmp_path):
+    return lambda oid: str(tmp_path / "store" / oid[:2] / oid[2:4] / oid)
+
+
+def hub_backend(source, clone, tmp_path):
+    return HubBackend(f"{source.url}/o/model", clone, str(tmp_path / "hub-staging"),
+                      {"refs/heads/main": "main"},
+                      fallback=NativeBackend(LFSBatchClient(f"{source.url}/o/model")))
+
+
+@pytest.mark.parametrize("kwargs, subset, expected", [
+    ({}, False, GitLFSBackend),
+    ({}, True, NativeBackend),
+    ({"download_backend": "git-lfs", "lfs_client": "native"}, False, GitLFSBackend),
+    ({"lfs_client": "native"}, False, NativeBackend),
+    ({"parallel_ranges": True}, False, NativeBackend),
+    ({"download_backend": "native"}, False, NativeBackend),
+    ({"download_backend": "hub"}, True, HubBackend),
+])
+def test_backend_selection(source, kwargs, subset, expected):
+    if expected is HubBackend:
+        pytest.importorskip("huggingface_hub")
+    job = transfer.ModelTransfer(f"{source.url}/o/model", f"{source.url}/o/copy.git", **kwargs)
+    git("clone", "--bare", "--quiet", f"{source.url}/o/model", job.repo_path)
+    backend = job._make_download_backend(subset)
+    assert type(backend) is expected
+    assert backend.fetches_subsets or not subset
+    if expected is HubBackend:
+        assert isinstance(backend.fallback, NativeBackend)
+
+
+def test_unknown_backend_is_rejected(source):
+    with pytest.raises(ValueError, match="Unknown download backend"):
+        transfer.ModelTransfer(f"{source.url}/o/model", f"{source.url}/o/copy.git",
+                               download_backend="rsync")
+
+
+def test_hub_backend_requires_huggingface_hub(source, clone, tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, "huggingface_hub", None)
+    with pytest.raises(DownloadBackendError, match="pip install huggingface_hub"):
+        hub_backend(source, clone, tmp_path)
+
+
+def test_hub_backend_downloads_tip_files_and_falls_back_for_history(source, clone, objects, tmp_path):
+    pytest.importorskip("huggingface_hub")
+    backend = hub_backend(source, clone, tmp_path)
+    by_path = []
+    real_download = backend._hub.hf_hub_download
+    backend._hub = types.SimpleNamespace(
+        hf_hub_download=lambda repo_id, path, **kwargs: by_path.append(path) or
+        real_download(repo_id, path, **kwargs))
+    fallback = []
+    real_fallback = backend.fallback.download
+    backend.fallback.download = lambda objs, *args, **kwargs: fallback.extend(objs) or \
+        real_fallback(objs, *args, **kwargs)
+
+    path_for = store_path(tmp_path)
+    completed = []
+    moved = backend.download(objects, path_for, on_complete=completed.append)
+
+    at_tip = locate_lfs_objects(clone, {"refs/heads/main": "main"})
+    assert sorted(by_path) == sorted(path for _, path in at_tip.values())
+    assert {obj.oid for obj in fallback} == {obj.oid for obj in objects} - set(at_tip)
+    assert moved == sum(obj.size for obj in objects)
+    assert sorted(entry["oid"] for entry in completed) == sorted(obj.oid for obj in objects)
+    assert all(hash_file(path_for(obj.oid)) == obj.oid for obj in objects)
+    assert not os.listdir(tmp_path / "hub-staging")
+
+
+def test_hub_backend_rejects_mismatching_files(source, clone, objects, tmp_path):
+    pytest.importorskip("huggingface_hub")
+    backend = hub_backend(source, clone, tmp_path)
+
+    def corrupt_download(repo_id, path, local_dir, **kwargs):
+        local = os.path.join(local_dir, path)
+        os.makedirs(os.path.dirname(local), exist_ok=True)
+        with open(local, "wb") as handle:
+            handle.write(b"not the weights")
+        return local
+
+    backend._hub = types.SimpleNamespace(hf_hub_download=corrupt_download)
+    path_for = store_path(tmp_path)
+    backend.download(objects, path_for)
+    assert all(hash_file(path_for(obj.oid)) == obj.oid for obj in objects)
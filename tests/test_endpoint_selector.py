@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""Endpoint ranking, probe caching and failover across local mirror endpoints."""
+
+import os
+import glob
+import shutil
+
+import pytest
+
+import transfer
+from conftest import closed_port_url
+from endpoint_selector import EndpointError, EndpointSelector, ProbeCache
+from lfs_api import scan_lfs_pointers, unique_objects
+
+
+def mirror(source, server, name, **kwargs):
+    """A server serving a copy of the source's o/model."""
+    copy = server(name, **kwargs)
+    shutil.copytree(os.path.join(source.repos_dir, "o/model.git"),
+                    os.path.join(copy.repos_dir, "o/model.git"))
+    shutil.copytree(source.lfs_store("o/model"), copy.lfs_store("o/model"))
+    return copy
+
+
+def stored_oids(server, repo: str) -> set:
+    return {os.path.basename(path)
+            for path in glob.glob(os.path.join(server.lfs_store(repo), "**", "*"), recursive=True)
+            if os.path.isfile(path)}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ProbeCache(str(tmp_path / "probes.json"))
+
+
+@pytest.fixture
+def largest(source):
+    objects = unique_objects(scan_lfs_pointers(os.path.join(source.repos_dir, "o/model.git")))
+    return max(objects, key=lambda obj: obj.size)
+
+
+def test_select_ranks_by_latency_and_skips_dead_endpoints(source, server, cache):
+    slow = mirror(source, server, "slow", latency_ms=300)
+    dead = closed_port_url()
+    selector = EndpointSelector(f"{slow.url}/o/model", [dead, slow.url, source.url], cache=cache)
+
+    assert selector.select() == f"{source.url}/o/model"
+    assert selector.order == [source.url, slow.url, dead]
+    probes = {probe.endpoint: probe for probe in selector.probe()}
+    assert not probes[dead].ok
+    assert probes[slow.url].latency > probes[source.url].latency
+
+
+def test_select_ranks_lfs_by_throughput(source, server, cache, largest):
+    throttled = mirror(source, server, "throttled", bandwidth_mbps=0.5)
+    selector = EndpointSelector(f"{throttled.url}/o/model", [throttled.url, source.url], cache=cache)
+
+    assert selector.select(sample=largest) == f"{source.url}/o/model"
+    probes = {probe.endpoint: probe for probe in selector.probe(sample=largest)}
+    assert probes[source.url].throughput > probes[throttled.url].throughput
+
+
+def test_probes_are_cached_and_shared(source, server, cache, monkeypatch):
+    other = mirror(source, server, "other")
+    EndpointSelector(f"{source.url}/o/model", [source.url, other.url], cache=cache).select()
+
+    def no_probe(self, endpoint):
+        raise AssertionError(f"probed {endpoint} again")
+
+    monkeypatch.setattr(EndpointSelector, "_probe_git", no_probe)
+    selector = EndpointSelector(f"{source.url}/o/model", [source.url, other.url], cache=cache)
+    assert selector.select() in (f"{source.url}/o/model", f"{other.url}/o/model")
+
+
+def test_no_reachable_endpoint(cache):
+    dead = [closed_port_url(), closed_port_url()]
+    selector = EndpointSelector(f"{dead[0]}/o/model", dead, cache=cache)
+    with pytest.raises(EndpointError, match="No source endpoint is reachable"):
+        selector.select()
+
+
+def test_failover_marks_endpoint_unhealthy(source, server, cache):
+    other = mirror(source, server, "other", latency_ms=100)
+    selector = EndpointSelector(f"{source.url}/o/model", [source.url, other.url], cache=cache)
+    selector.select()
+    assert selector.endpoint == source.url
+
+    assert selector.failover("HTTP 500") == f"{other.url}/o/model"
+    for kind in ("git", "lfs"):
+        assert not cache.get(kind, source.url).ok
+    # A new transfer ranks the failed endpoint last without probing it
+    fresh = EndpointSelector(f"{source.url}/o/model", [source.url, other.url], cache=cache)
+    assert fresh.select() == f"{other.url}/o/model"
+    assert selector.failover("HTTP 500") is None
+
+
+def test_transfer_fails_over_mid_download(source, server, monkeypatch):
+    backup = mirror(source, server, "backup", latency_ms=100)
+    target = server("target")
+    target.create_empty_repo("o/copy")
+    job = transfer.ModelTransfer(f"{source.url}/o/model", f"{target.url}/o/copy.git",
+                                 lfs_client="native", source_endpoints=[source.url, backup.url])
+
+    select_lfs_endpoint = job._select_lfs_endpoint
+
+    def select_then_fail(objects):
+        select_lfs_endpoint(objects)
+        assert job.endpoints.endpoint == source.url
+        source.stop()
+
+    monkeypatch.setattr(job, "_select_lfs_endpoint", select_then_fail)
+    job.transfer()
+
+    assert job.endpoints.endpoint == backup.url
+    assert stored_oids(backup, "o/model") <= stored_oids(target, "o/copy")
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""Clone-free planning against the fake server's Hub tree API."""
+
+import os
+
+import pytest
+
+from conftest import git
+from fake_server import TREE_PAGE_SIZE
+from hub_plan import HubClient, HubPlanError, build_plan, lfs_oids, parse_repo_url
+from path_filter import PathFilter
+from synthetic_repo import generate_repo
+
+
+@pytest.fixture(autouse=True)
+def no_hub_endpoint(monkeypatch):
+    monkeypatch.delenv("HF_ENDPOINT", raising=False)
+
+
+@pytest.fixture
+def git_dir(source):
+    return os.path.join(source.repos_dir, "o/model.git")
+
+
+def tree_lfs_oids(git_dir: str, rev: str) -> set:
+    """OIDs of the LFS pointers in the tree of rev (not its history)."""
+    oids = set()
+    for path in git("ls-tree", "-r", "--name-only", rev, cwd=git_dir).split():
+        if path.endswith(".safetensors"):
+            pointer = git("cat-file", "blob", f"{rev}:{path}", cwd=git_dir)
+            oids.add(pointer.split("oid sha256:", 1)[1].split()[0])
+    return oids
+
+
+def test_parse_repo_url(monkeypatch):
+    assert parse_repo_url("org/name") == ("https://huggingface.co", "models", "org/name", None)
+    assert parse_repo_url("http://127.0.0.1:8080/datasets/org/data.git") == (
+        "http://127.0.0.1:8080", "datasets", "org/data", None)
+    assert parse_repo_url("https://hf.co/org/name/tree/refs/pr/1")[2:] == ("org/name", "refs/pr/1")
+    monkeypatch.setenv("HF_ENDPOINT", "https://mirror.example/")
+    assert parse_repo_url("https://huggingface.co/org/name")[0] == "https://mirror.example"
+    with pytest.raises(HubPlanError):
+        parse_repo_url("https://huggingface.co/org")
+
+
+def test_list_files_follows_pagination(server):
+    hub = server("hub")
+    generate_repo(os.path.join(hub.repos_dir, "o/big.git"), hub.lfs_store("o/big"),
+                  lfs_files=2, lfs_size=1000, small_files=2 * TREE_PAGE_SIZE + 5, history=1)
+    files = HubClient(hub.url).list_files("models", "o/big", "main")
+    expected = git("ls-tree", "-r", "--name-only", "main",
+                   cwd=os.path.join(hub.repos_dir, "o/big.git")).split()
+    assert len(expected) > 2 * TREE_PAGE_SIZE
+    assert sorted(f.path for f in files) == sorted(expected)
+
+
+def test_plan_separates_lfs_and_regular_files(source, git_dir):
+    plan = build_plan(f"{source.url}/o/model.git")
+    totals = plan["totals"]
+    assert plan["sha"] == git("rev-parse", "main", cwd=git_dir).strip()
+    assert lfs_oids(plan) == tree_lfs_oids(git_dir, "main")
+    assert totals["lfs_files"] == totals["lfs_objects"] == 3
+    assert totals["lfs_bytes"] == 3 * 20_000
+    regular = [f for f in plan["files"] if not f["lfs_oid"]]
+    assert {f["path"] for f in regular} >= {"README.md", ".gitattributes", "config_0.json"}
+    assert totals["regular_bytes"] == sum(f["size"] for f in regular)
+    assert [f["size"] for f in plan["files"]] == sorted((f["size"] for f in plan["files"]), reverse=True)
+
+
+def test_plan_path_filter(source):
+    plan = build_plan(f"{source.url}/o/model", path_filter=PathFilter(excludes=["*.safetensors"]))
+    assert plan["totals"]["lfs_files"] == 0
+    assert plan["totals"]["excluded_files"] == 3
+    assert plan["totals"]["excluded_bytes"] == 3 * 20_000
+
+
+def test_plan_resolves_revisions(source, git_dir):
+    first = git("rev-list", "--max-parents=0", "main", cwd=git_dir).strip()
+    head = build_plan(f"{source.url}/o/model")
+    tagged = build_plan(f"{source.url}/o/model", revision="v1.0")
+    old = build_plan(f"{source.url}/o/model/tree/{first}")
+    assert tagged["sha"] == head["sha"] and tagged["revision"] == "v1.0"
+    assert old["sha"] == first and old["revision"] == first
+    assert lfs_oids(old) == tree_lfs_oids(git_dir, first)
+    assert lfs_oids(old) != lfs_oids(head)
+
+
+def test_plan_unknown_revision_or_repo(source):
+    with pytest.raises(HubPlanError, match="not found"):
+        build_plan(f"{source.url}/o/model", revision="no-such-branch")
+    with pytest.raises(HubPlanError, match="not found"):
+        build_plan(f"{source.url}/o/missing")
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""Pipelined LFS transfer: retries, concurrency, disk window and cache leases."""
+
+import os
+import time
+import threading
+
+import pytest
+
+import rate_control
+from lfs_api import LFSBatchClient, LFSError, scan_lfs_pointers, unique_objects
+from lfs_cache import LFSObjectCache
+from lfs_pipeline import LFSPipeline
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(rate_control, "backoff_delay", lambda *args, **kwargs: 0.01)
+
+
+@pytest.fixture
+def objects(source):
+    return unique_objects(scan_lfs_pointers(os.path.join(source.repos_dir, "o/model.git")))
+
+
+def make_pipeline(source, server, tmp_path, **kwargs):
+    target = server("target")
+    target.create_empty_repo("o/copy")
+    pipeline = LFSPipeline(LFSBatchClient(f"{source.url}/o/model", concurrency=4),
+                           LFSBatchClient(f"{target.url}/o/copy.git", concurrency=4),
+                           str(tmp_path / "staging"), **kwargs)
+    return pipeline, target
+
+
+def test_transient_errors_are_retried(source, server, tmp_path, objects):
+    pipeline, _ = make_pipeline(source, server, tmp_path, max_disk_bytes=10 ** 6)
+    failures = {"download": 1, "upload": 1}
+
+    def flaky(kind, real):
+        def call(*args, **kwargs):
+            if failures[kind]:
+                failures[kind] -= 1
+                raise LFSError(f"transient {kind} error")
+            return real(*args, **kwargs)
+        return call
+
+    pipeline.source.download_to = flaky("download", pipeline.source.download_to)
+    pipeline.target.upload = flaky("upload", pipeline.target.upload)
+    stats = pipeline.run(objects)
+    assert stats["transferred"] == len(objects)
+    assert failures == {"download": 0, "upload": 0}
+
+
+def test_persistent_errors_stop_the_pipeline(source, server, tmp_path, objects):
+    pipeline, _ = make_pipeline(source, server, tmp_path, max_disk_bytes=10 ** 6, retries=2)
+
+    def broken(*args, **kwargs):
+        raise LFSError("target down")
+
+    pipeline.target.upload = broken
+    with pytest.raises(LFSError, match="after 2 attempt"):
+        pipeline.run(objects)
+    assert not os.listdir(tmp_path / "staging")
+
+
+def test_uploads_run_concurrently(source, server, tmp_path, objects):
+    pipeline, _ = make_pipeline(source, server, tmp_path, max_disk_bytes=10 ** 6)
+    active, peak, lock = [0], [0], threading.Lock()
+    real_upload = pipeline.target.upload
+
+    def slow_upload(entry, body):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.3)
+        try:
+            return real_upload(entry, body)
+        finally:
+            with lock:
+                active[0] -= 1
+
+    pipeline.target.upload = slow_upload
+    pipeline.run(objects)
+    assert peak[0] > 1
+
+
+def test_cache_stays_within_budget_and_window(source, server, tmp_path, objects):
+    cache = LFSObjectCache(str(tmp_path / "cache"), max_bytes=25_000)
+    pipeline, _ = make_pipeline(source, server, tmp_path, max_disk_bytes=50_000, cache=cache)
+    stats = pipeline.run(objects)
+    assert stats["transferred"] == len(objects)
+    assert cache.usage() <= 25_000
+
+
+def test_leased_cache_hits_survive_eviction(source, server, tmp_path, objects):
+    cache = LFSObjectCache(str(tmp_path / "cache"), max_bytes=0)
+    store = source.lfs_store("o/model")
+    for obj in objects:
+        cache.store(os.path.join(store, obj.oid[0:2], obj.oid[2:4], obj.oid), obj.oid)
+    pipeline, target = make_pipeline(source, server, tmp_path, max_disk_bytes=10 ** 6, cache=cache)
+    real_upload = pipeline.target.upload
+
+    def evict_then_upload(entry, body):
+        cache.evict()  # a concurrent transfer trimming the cache mid-upload
+        return real_upload(entry, body)
+
+    pipeline.target.upload = evict_then_upload
+    stats = pipeline.run(objects)
+    assert stats["transferred"] == len(objects)
+    cache.evict()
+    assert cache.usage() == 0
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""Disk-less LFS relay: concurrency, batch reuse, retries and integrity checks."""
+
+import os
+import time
+import threading
+
+import pytest
+
+import rate_control
+from lfs_api import LFSBatchClient, LFSError, LFSRelay, scan_lfs_pointers, unique_objects
+from synthetic_repo import lfs_object_path
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(rate_control, "backoff_delay", lambda *args, **kwargs: 0.01)
+
+
+@pytest.fixture
+def objects(source):
+    return unique_objects(scan_lfs_pointers(os.path.join(source.repos_dir, "o/model.git")))
+
+
+@pytest.fixture
+def relay(source, server):
+    target = server("target")
+    target.create_empty_repo("o/copy")
+    relay = LFSRelay(LFSBatchClient(f"{source.url}/o/model", concurrency=4),
+                     LFSBatchClient(f"{target.url}/o/copy.git", concurrency=4))
+    relay.target_server = target
+    return relay
+
+
+def stored_on_target(relay, obj) -> bool:
+    return os.path.exists(lfs_object_path(relay.target_server.lfs_store("o/copy"), obj.oid))
+
+
+def count_batches(client):
+    calls = []
+    real_batch = client.batch
+
+    def batch(operation, objects):
+        calls.append((operation, len(objects)))
+        return real_batch(operation, objects)
+
+    client.batch = batch
+    return calls
+
+
+def test_relay_reuses_initial_batch_entries(relay, objects):
+    source_calls, target_calls = count_batches(relay.source), count_batches(relay.target)
+    stats = relay.relay(objects)
+    assert stats["relayed"] == len(objects)
+    assert all(stored_on_target(relay, obj) for obj in objects)
+    assert source_calls == [("download", len(objects))]
+    assert target_calls == [("upload", len(objects))]
+    assert relay.relay(objects)["skipped"] == len(objects)
+
+
+def test_relay_runs_objects_concurrently(relay, objects):
+    active, peak, lock = [0], [0], threading.Lock()
+    real_upload = relay.target.upload
+
+    def slow_upload(entry, body):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.3)
+        try:
+            return real_upload(entry, body)
+        finally:
+            with lock:
+                active[0] -= 1
+
+    relay.target.upload = slow_upload
+    assert relay.relay(objects)["relayed"] == len(objects)
+    assert peak[0] > 1
+
+
+def test_relay_retries_with_fresh_actions(relay, objects):
+    target_calls = count_batches(relay.target)
+    failures = [1]
+    real_upload = relay.target.upload
+
+    def flaky_upload(entry, body):
+        if failures[0]:
+            failures[0] -= 1
+            raise LFSError("transient upload error")
+        return real_upload(entry, body)
+
+    relay.target.upload = flaky_upload
+    assert relay.relay(objects)["relayed"] == len(objects)
+    assert target_calls == [("upload", len(objects)), ("upload", 1)]
+
+
+def test_corrupt_stream_aborts_upload(relay, objects):
+    obj = objects[0]
+    real_open = relay.source.open_download
+
+    def corrupt_download(entry):
+        response = real_open(entry)
+        real_iter = response.iter_content
+
+        def iter_content(chunk_size):
+            for chunk in real_iter(chunk_size=chunk_size):
+                yield bytes(len(chunk))
+
+        response.iter_content = iter_content
+        return response
+
+    sent = []
+
+    def reading_upload(entry, body):
+        data = bytearray()
+        try:
+            while True:
+                chunk = body.read(64 * 1024)
+                if not chunk:
+                    break
+                data.extend(chunk)
+        finally:
+            sent.append(len(data))
+
+    relay.source.open_download = corrupt_download
+    relay.target.upload = reading_upload
+    with pytest.raises(LFSError, match="Integrity check failed"):
+        relay.relay([obj], retries=2)
+    assert sent and all(size < obj.size for size in sent)
+    assert not stored_on_target(relay, obj)
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""Mirror cache leases: entries in use survive concurrent eviction."""
+
+import os
+
+import mirror_cache
+import transfer
+from conftest import git
+from mirror_cache import MirrorCache
+
+
+def test_borrowed_entry_survives_eviction(source, tmp_path):
+    root = str(tmp_path / "cache")
+    url = f"{source.url}/o/model"
+    cache, other = MirrorCache(root, 10 ** 12), MirrorCache(root, 0)
+
+    with cache.borrow(url, url) as path:
+        assert other.evict() == 0
+        assert os.path.exists(os.path.join(path, "HEAD"))
+    assert other.evict() > 0
+    assert not os.path.exists(path)
+
+
+def test_entry_is_repacked_after_the_lease(source, tmp_path, monkeypatch):
+    monkeypatch.setattr(mirror_cache, "MAX_PACKS", 0)
+    url = f"{source.url}/o/model"
+    with MirrorCache(str(tmp_path / "cache"), 10 ** 12).borrow(url, url) as path:
+        pass
+    packs = [name for name in os.listdir(os.path.join(path, "objects", "pack")) if name.endswith(".pack")]
+    assert len(packs) == 1
+
+
+def test_transfer_keeps_its_entry_between_refresh_and_clone(source, server, tmp_path, monkeypatch):
+    target = server("target")
+    target.create_empty_repo("o/copy")
+    root = str(tmp_path / "cache")
+    update = MirrorCache.update
+
+    def update_then_evict(self, *args, **kwargs):
+        path = update(self, *args, **kwargs)
+        # Another transfer with a tiny budget trims the cache right after the refresh
+        MirrorCache(root, 0).evict()
+        return path
+
+    monkeypatch.setattr(MirrorCache, "update", update_then_evict)
+    transfer.ModelTransfer(f"{source.url}/o/model", f"{target.url}/o/copy.git", lfs_client="native",
+                           mirror_cache_dir=root).transfer()
+
+    assert git("rev-parse", "main", cwd=os.path.join(target.repos_dir, "o/copy.git")) == \
+        git("rev-parse", "main", cwd=os.path.join(source.repos_dir, "o/model.git"))
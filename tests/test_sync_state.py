@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""Incremental sync records: only refs the target received count as synced."""
+
+import os
+
+import transfer
+from conftest import git
+from sync_state import SyncStateStore
+
+
+def incremental_job(source, target, state_file):
+    return transfer.ModelTransfer(f"{source.url}/o/model", f"{target.url}/o/copy.git",
+                                  lfs_client="native", incremental=True, state_file=state_file)
+
+
+def test_sync_state_records_pushed_refs_only(source, server, tmp_path):
+    bare = os.path.join(source.repos_dir, "o/model.git")
+    git("branch", "side", "main~1", cwd=bare)
+    target = server("target")
+    target.create_empty_repo("o/copy")
+    state_file = str(tmp_path / "sync_state.json")
+
+    job = incremental_job(source, target, state_file)
+    job.transfer()
+    record = SyncStateStore(state_file).get(job.source_url, job.target_url)
+    assert record["source_refs"] == {
+        "refs/heads/main": git("rev-parse", "main", cwd=bare).strip(),
+        "refs/tags/v1.0": git("rev-parse", "v1.0", cwd=bare).strip(),
+    }
+
+    # Standard mode does not transfer other branches, so moving one changes nothing
+    git("branch", "-f", "side", "main", cwd=bare)
+    assert incremental_job(source, target, state_file).check_sync_state()
+
+    git("tag", "v2.0", "main~1", cwd=bare)
+    assert not incremental_job(source, target, state_file).check_sync_state()
+
+    job = incremental_job(source, target, state_file)
+    job.transfer()
+    record = SyncStateStore(state_file).get(job.source_url, job.target_url)
+    assert record["source_refs"]["refs/tags/v2.0"] == git("rev-parse", "main~1", cwd=bare).strip()
+    assert "refs/heads/side" not in record["source_refs"]
+    assert incremental_job(source, target, state_file).check_sync_state()
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""End-to-end transfers against the local fake server."""
+
+import os
+import sys
+import glob
+
+import pytest
+
+import transfer
+import batch_engine
+from conftest import closed_port_url, git, git_lfs_available
+from lfs_api import scan_lfs_pointers, unique_objects
+
+
+def stored_oids(server, repo: str) -> set:
+    return {os.path.basename(path)
+            for path in glob.glob(os.path.join(server.lfs_store(repo), "**", "*"), recursive=True)
+            if os.path.isfile(path)}
+
+
+def history_oids(server, repo: str) -> set:
+    bare = os.path.join(server.repos_dir, f"{repo}.git")
+    return {obj.oid for obj in unique_objects(scan_lfs_pointers(bare, ["--all"]))}
+
+
+def test_bare_clone_pushes_lfs_objects_before_refs(source, server, monkeypatch):
+    """A bare clone has no git-lfs pre-push hook, so objects must be pushed explicitly."""
+    target = server("target")
+    target.create_empty_repo("o/copy")
+    job = transfer.ModelTransfer(f"{source.url}/o/model", f"{target.url}/o/copy.git")
+    assert job.lfs_client == "git-lfs" and not job.needs_worktree()
+    git("clone", "--bare", "--quiet", f"{source.url}/o/model", job.repo_path)
+
+    calls = []
+    monkeypatch.setattr(job, "_push_lfs_objects", lambda url: calls.append("lfs"))
+    monkeypatch.setattr(job, "push_ref_diff", lambda refs, prune=False: calls.append("refs") or {})
+    job.push_to_target()
+    assert calls == ["lfs", "refs"]
+
+
+@pytest.mark.skipif(not git_lfs_available(), reason="needs git-lfs")
+def test_default_client_transfers_lfs_objects(source, server):
+    target = server("target")
+    target.create_empty_repo("o/copy")
+    transfer.ModelTransfer(f"{source.url}/o/model", f"{target.url}/o/copy.git").transfer()
+
+    assert git("rev-parse", "main", cwd=os.path.join(target.repos_dir, "o/copy.git")) == \
+        git("rev-parse", "main", cwd=os.path.join(source.repos_dir, "o/model.git"))
+    assert history_oids(source, "o/model") <= stored_oids(target, "o/copy")
+
+
+def test_native_client_transfers_lfs_objects(source, server):
+    target = server("target")
+    target.create_empty_repo("o/copy")
+    transfer.ModelTransfer(f"{source.url}/o/model", f"{target.url}/o/copy.git",
+                           lfs_client="native").transfer()
+
+    assert history_oids(source, "o/model") <= stored_oids(target, "o/copy")
+
+
+def test_ref_push_shows_progress_and_parses_statuses(source, server, capfd):
+    target = server("target")
+    target.create_empty_repo("o/copy")
+    job = transfer.ModelTransfer(f"{source.url}/o/model", f"{target.url}/o/copy.git",
+                                 lfs_client="native")
+    git("clone", "--bare", "--quiet", f"{source.url}/o/model", job.repo_path)
+
+    failures = job.push_ref_diff(job._local_refs("refs/heads/"))
+    out, err = capfd.readouterr()
+    assert failures == {}
+    assert "git push --progress --porcelain" in out
+    assert "Writing objects" in err
+    assert git("rev-parse", "main", cwd=os.path.join(target.repos_dir, "o/copy.git")) == \
+        git("rev-parse", "main", cwd=job.repo_path)
+
+
+@pytest.mark.parametrize("unreachable", [False, True])
+def test_verify_only_reports_failures_without_traceback(source, server, monkeypatch, capsys, unreachable):
+    """An incomplete or unreachable target is a failed verification, not a crash."""
+    target = server("target")
+    target.create_empty_repo("o/copy")
+    monkeypatch.setattr(sys, "argv", ["transfer.py", "--verify-only", "-s", f"{source.url}/o/model",
+                                      "-t", f"{closed_port_url() if unreachable else target.url}/o/copy.git"])
+    with pytest.raises(SystemExit) as exit_info:
+        transfer.main()
+    assert exit_info.value.code == 1
+    assert "❌ Verification failed" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("entry_point", ["transfer", "batch_engine"])
+def test_invalid_lfs_concurrency_is_a_usage_error(entry_point, monkeypatch, capsys, tmp_path):
+    config = tmp_path / "batch.txt"
+    config.write_text("o/model|http://127.0.0.1/o/copy.git\n")
+    main, args = {
+        "transfer": (transfer.main, ["-s", "o/model", "-t", "http://127.0.0.1/o/copy.git"]),
+        "batch_engine": (batch_engine.main, ["--config", str(config)]),
+    }[entry_point]
+
+    monkeypatch.setattr(sys, "argv", ["prog", *args, "--lfs-concurrency", "fast"])
+    with pytest.raises(SystemExit) as exit_info:
+        main()
+    assert exit_info.value.code == 2
+    assert "--lfs-concurrency: Invalid LFS concurrency entry 'fast'" in capsys.readouterr().err
+
+    monkeypatch.setattr(sys, "argv", ["prog", *args])
+    monkeypatch.setenv("LFS_CONCURRENCY", "hf.co=many")
+    with pytest.raises(SystemExit) as exit_info:
+        main()
+    assert exit_info.value.code == 2
+    assert "LFS_CONCURRENCY: Invalid LFS concurrency entry 'hf.co=many'" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize("lfs_client, backends, ignore_lfs, checkout, expected", [
+    ("git-lfs", {None}, False, False, True),
+    ("native", {None}, False, False, False),
+    ("native", {"git-lfs"}, False, False, True),
+    ("native", {"native", "git-lfs"}, False, False, True),
+    ("native", {"hub"}, False, False, False),
+    ("git-lfs", {"git-lfs"}, True, False, False),
+    ("native", {None}, True, True, True),
+])
+def test_uses_git_lfs(lfs_client, backends, ignore_lfs, checkout, expected):
+    assert transfer.uses_git_lfs(lfs_client, backends, ignore_lfs, checkout) is expected
+
+
+def test_git_lfs_download_backend_requires_git_lfs(monkeypatch, capsys):
+    monkeypatch.setattr(transfer, "check_git_lfs", lambda: False)
+    monkeypatch.setattr(sys, "argv", ["transfer.py", "-s", "o/model", "-t", "http://127.0.0.1/o/copy.git",
+                                      "--lfs-client", "native", "--download-backend", "git-lfs"])
+    with pytest.raises(SystemExit) as exit_info:
+        transfer.main()
+    assert exit_info.value.code == 1
+    assert "git-lfs is not installed" in capsys.readouterr().out
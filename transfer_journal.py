@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Checkpoint journal for resumable transfers
+
+An append-only JSON-lines file in the transfer's temp directory records
+completed steps, downloaded (verified) and uploaded LFS OIDs and pushed refs.
+A retry or ``--resume <dir>`` replays it to reuse the existing clone and
+continue where the previous run stopped. A torn last line from a crash is
+ignored. When one download is pushed to several targets, each target gets a
+scoped view whose steps, uploads and pushed refs are tagged with its URL.
+"""
+
+import os
+import json
+import threading
+from datetime import datetime, timezone
+
+from lfs_api import split_credentials
+
+JOURNAL_FILE = "transfer_journal.jsonl"
+JOURNAL_VERSION = 1
+
+
+class TransferJournal:
+    """Append-only record of transfer progress inside a temp directory."""
+
+    def __init__(self, temp_dir: str, target: str = None, lock=None):
+        self.path = os.path.join(temp_dir, JOURNAL_FILE)
+        self.target = split_credentials(target)[0] if target else None
+        self._lock = lock or threading.Lock()
+        self.header = None
+        self.steps = {}
+        self.downloaded = set()
+        self.uploaded = set()
+        self.pushed_refs = {}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as handle:
+                lines = handle.readlines()
+        except FileNotFoundError:
+            return
+        for line in lines:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            kind = event.get("type")
+            if kind == "start" and self.header is None:
+                self.header = event
+            elif kind == "downloaded":
+                self.downloaded.update(event["oids"])
+            elif event.get("target") != self.target:
+                continue
+            elif kind == "step":
+                self.steps[event["name"]] = event.get("data") or {}
+            elif kind == "uploaded":
+                self.uploaded.update(event["oids"])
+            elif kind == "pushed":
+                self.pushed_refs.update(event["refs"])
+
+    def _append(self, event: dict):
+        event["ts"] = datetime.now(timezone.utc).isoformat()
+        if self.target and event["type"] != "downloaded":
+            event["target"] = self.target
+        line = json.dumps(event, sort_keys=True) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as handle:
+                handle.write(line)
+                handle.flush()
+                os.fsync(handle.fileno())
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def matches(self, source_url: str, target_url: str, mirror_mode: bool) -> bool:
+        """Whether the journal belongs to the same transfer."""
+        return bool(self.header) and (
+            self.header.get("version"), self.header.get("source"),
+            self.header.get("target"), self.header.get("mirror"),
+        ) == (JOURNAL_VERSION, split_credentials(source_url)[0],
+              split_credentials(target_url)[0], mirror_mode)
+
+    def start(self, source_url: str, target_url: str, mirror_mode: bool):
+        """Begin a fresh journal (discarding any previous one)."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.header = None
+        self.steps, self.downloaded, self.uploaded, self.pushed_refs = {}, set(), set(), {}
+        self._append({"type": "start", "version": JOURNAL_VERSION,
+                      "source": split_credentials(source_url)[0],
+                      "target": split_credentials(target_url)[0],
+                      "mirror": mirror_mode})
+        self._load()
+
+    def scoped(self, target: str):
+        """A view of the same journal whose records belong to one of several targets."""
+        return TransferJournal(os.path.dirname(self.path), target=target, lock=self._lock)
+
+    # ------------------------------------------------------------------
+    # Records
+    # ------------------------------------------------------------------
+
+    def step_done(self, name: str) -> bool:
+        return name in self.steps
+
+    def step_data(self, name: str) -> dict:
+        return self.steps.get(name, {})
+
+    def mark_step(self, name: str, **data):
+        self.steps[name] = data
+        self._append({"type": "step", "name": name, "data": data})
+
+    def mark_downloaded(self, oids):
+        oids = list(oids)
+        if oids:
+            self.downloaded.update(oids)
+            self._append({"type": "downloaded", "oids": oids})
+
+    def mark_uploaded(self, oids):
+        oids = list(oids)
+        if oids:
+            self.uploaded.update(oids)
+            self._append({"type": "uploaded", "oids": oids})
+
+    def mark_pushed(self, refs: dict):
+        if refs:
+            self.pushed_refs.update(refs)
+            self._append({"type": "pushed", "refs": refs})
+
+    def refs_pushed(self, refs: dict) -> bool:
+        """Whether every ref in refs was already pushed at the same SHA."""
+        return bool(refs) and all(self.pushed_refs.get(ref) == sha for ref, sha in refs.items())
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Transfer metrics and progress events
+
+Times every transfer phase and subprocess, turns git / git-lfs progress output
+into byte counts and rates, and emits JSON-lines events plus a final
+per-transfer record. Optionally writes a Prometheus textfile-collector file.
+"""
+
+import os
+import re
+import json
+import time
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from lfs_api import split_credentials
+
+UNITS = {
+    "B": 1, "bytes": 1,
+    "KB": 1000, "MB": 1000 ** 2, "GB": 1000 ** 3, "TB": 1000 ** 4,
+    "KiB": 1024, "MiB": 1024 ** 2, "GiB": 1024 ** 3, "TiB": 1024 ** 4,
+}
+
+# "Receiving objects:  45% (123/456), 1.23 GiB | 10.00 MiB/s"
+# "Downloading LFS objects: 100% (3/3), 1.2 GB | 20 MB/s, done."
+PROGRESS_RE = re.compile(
+    r"(?P<label>[A-Za-z][A-Za-z ]+?):\s+(?P<percent>\d+)%\s+\((?P<done>\d+)/(?P<total>\d+)\)"
+    r"(?:,\s+(?P<amount>[\d.]+)\s*(?P<unit>[KMGT]i?B|B|bytes))?"
+    r"(?:\s+\|\s+(?P<rate>[\d.]+)\s*(?P<rate_unit>[KMGT]i?B|B)/s)?"
+)
+
+DOWNLOAD_LABELS = ("Receiving objects", "Downloading LFS objects", "Downloading")
+UPLOAD_LABELS = ("Writing objects", "Uploading LFS objects", "Uploading")
+
+
+def _to_bytes(amount: str, unit: str) -> int:
+    return int(float(amount) * UNITS.get(unit, 1))
+
+
+class GitProgressParser:
+    """Parse git / git-lfs progress lines (as split on \\r and \\n by the command runner)."""
+
+    def __init__(self, on_progress):
+        self.on_progress = on_progress
+        self.last = {}
+
+    def parse_line(self, line: str):
+        match = PROGRESS_RE.search(line)
+        if not match or not match.group("amount"):
+            return
+        label = match.group("label").strip().split("remote: ")[-1]
+        info = {
+            "label": label,
+            "percent": int(match.group("percent")),
+            "done": int(match.group("done")),
+            "total": int(match.group("total")),
+            "bytes": _to_bytes(match.group("amount"), match.group("unit")),
+        }
+        if match.group("rate"):
+            info["rate_bytes_per_s"] = _to_bytes(match.group("rate"), match.group("rate_unit"))
+        self.last[label] = info
+        self.on_progress(info)
+
+
+class TransferMetrics:
+    """Collects phase timings, command timings and byte counts for one transfer."""
+
+    def __init__(self, source: str, target: str, events_path: str = None,
+                 prometheus_path: str = None):
+        self.source = split_credentials(source)[0]
+        self.target = split_credentials(target)[0]
+        self.events_path = events_path
+        self.prometheus_path = prometheus_path
+        self.started = time.time()
+        self.phases = {}
+        self.commands = []
+        self.bytes = {"download": 0, "upload": 0}
+        self.targets = {}
+        self.current_phase = None
+        self._lock = threading.Lock()
+        self._last_progress_emit = {}
+
+    # ------------------------------------------------------------------
+    # Events
+    # ------------------------------------------------------------------
+
+    def emit(self, event: str, **fields):
+        """Append a JSON event line to the events file (if configured)."""
+        if not self.events_path:
+            return
+        record = {
+            "ts": datetime.now(timezone.utc).isoformat(),
+            "event": event,
+            "source": self.source,
+            "target": self.target,
+        }
+        record.update(fields)
+        line = json.dumps(record, sort_keys=True) + "\n"
+        with self._lock:
+            with open(self.events_path, "a", encoding="utf-8") as handle:
+                handle.write(line)
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time a transfer phase."""
+        previous, self.current_phase = self.current_phase, name
+        self.emit("phase_start", phase=name)
+        start = time.monotonic()
+        status = "ok"
+        try:
+            yield
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            elapsed = time.monotonic() - start
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed
+            self.emit("phase_end", phase=name, seconds=round(elapsed, 3), status=status)
+            self.current_phase = previous
+
+    def record_command(self, cmd: list, seconds: float, returncode: int, progress: dict = None):
+        """Record a finished subprocess and the byte counts parsed from its progress."""
+        name = cmd[0]
+        if cmd[:1] == ["git"] and len(cmd) > 1:
+            name = " ".join(cmd[:3] if cmd[1] == "lfs" else cmd[:2])
+        moved = {"download": 0, "upload": 0}
+        for label, info in (progress or {}).items():
+            if label.startswith(DOWNLOAD_LABELS):
+                moved["download"] += info["bytes"]
+            elif label.startswith(UPLOAD_LABELS):
+                moved["upload"] += info["bytes"]
+        for direction, count in moved.items():
+            self.add_bytes(direction, count)
+        entry = {"command": name, "phase": self.current_phase,
+                 "seconds": round(seconds, 3), "returncode": returncode, **moved}
+        self.commands.append(entry)
+        self.emit("command", **entry)
+
+    def add_bytes(self, direction: str, count: int):
+        with self._lock:
+            self.bytes[direction] += count
+
+    def progress_callback(self, info: dict):
+        """Throttled progress events (at most one per label per second)."""
+        now = time.monotonic()
+        key = info["label"]
+        if info["percent"] < 100 and now - self._last_progress_emit.get(key, 0) < 1.0:
+            return
+        self._last_progress_emit[key] = now
+        self.emit("progress", phase=self.current_phase, **info)
+
+    def record_target(self, target: str, status: str, seconds: float, error: str = None):
+        """Record the push to one of several targets."""
+        entry = {"status": status, "seconds": round(seconds, 3)}
+        if error:
+            entry["error"] = error
+        target = split_credentials(target)[0]
+        with self._lock:
+            self.targets[target] = entry
+        self.emit("target_complete", push_target=target, **entry)
+
+    # ------------------------------------------------------------------
+    # Final record
+    # ------------------------------------------------------------------
+
+    def summary(self, status: str, error: str = None) -> dict:
+        duration = time.time() - self.started
+        record = {
+            "status": status,
+            "duration_seconds": round(duration, 3),
+            "phases": {name: round(seconds, 3) for name, seconds in self.phases.items()},
+            "commands": len(self.commands),
+            "bytes": dict(self.bytes),
+            "throughput_bytes_per_s": {
+                direction: round(count / duration, 1) if duration else 0.0
+                for direction, count in self.bytes.items()
+            },
+        }
+        if self.targets:
+            record["targets"] = dict(self.targets)
+        if error:
+            record["error"] = error
+        return record
+
+    def finish(self, status: str, error: str = None) -> dict:
+        """Emit the final per-transfer record and write the Prometheus file."""
+        record = self.summary(status, error)
+        self.emit("transfer_complete", **record)
+        if self.prometheus_path:
+            self.write_prometheus(record)
+        return record
+
+    def write_prometheus(self, record: dict):
+        path = self.prometheus_path
+        if os.path.isdir(path):
+            name = re.sub(r"[^A-Za-z0-9_.-]+", "_", self.source.split("://")[-1]).strip("_")
+            path = os.path.join(path, f"hf_transfer_{name}.prom")
+        labels = f'source="{self._escape(self.source)}",target="{self._escape(self.target)}"'
+        lines = [
+            "# HELP hf_transfer_duration_seconds Wall time of the last transfer.",
+            "# TYPE hf_transfer_duration_seconds gauge",
+            f"hf_transfer_duration_seconds{{{labels}}} {record['duration_seconds']}",
+            "# HELP hf_transfer_success Whether the last transfer succeeded.",
+            "# TYPE hf_transfer_success gauge",
+            f"hf_transfer_success{{{labels}}} {1 if record['status'] == 'success' else 0}",
+            "# HELP hf_transfer_phase_seconds Time spent per transfer phase.",
+            "# TYPE hf_transfer_phase_seconds gauge",
+        ]
+        for phase, seconds in record["phases"].items():
+            lines.append(f'hf_transfer_phase_seconds{{{labels},phase="{phase}"}} {seconds}')
+        lines += [
+            "# HELP hf_transfer_bytes Bytes moved by the last transfer.",
+            "# TYPE hf_transfer_bytes gauge",
+        ]
+        for direction, count in record["bytes"].items():
+            lines.append(f'hf_transfer_bytes{{{labels},direction="{direction}"}} {count}')
+        if record.get("targets"):
+            lines += [
+                "# HELP hf_transfer_target_success Whether the push to each fan-out target succeeded.",
+                "# TYPE hf_transfer_target_success gauge",
+            ]
+            for target, entry in record["targets"].items():
+                lines.append(f'hf_transfer_target_success{{source="{self._escape(self.source)}",'
+                             f'target="{self._escape(target)}"}} {1 if entry["status"] == "success" else 0}')
+        lines.append(f"hf_transfer_last_run_timestamp_seconds{{{labels}}} {int(time.time())}")
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            handle.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _escape(value: str) -> str:
+        return value.replace("\\", "\\\\").replace('"', '\\"')